@@ -5,29 +5,77 @@ import uuid
 from uuid import UUID
 
 import time
+import json
+import asyncio
 import logging
 import hashlib
+import hmac
+import contextlib
+from urllib.parse import unquote_plus
 
 # 外部ライブラリ
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import StreamingResponse
 import sqlalchemy as sa
 from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # プロジェクト内のモジュール
 from app.schemas import (
+    VoiceTranscribeBatchRequest,
     VoiceTranscribeRequest,
     VoiceTranscribeResponse,
+    VoiceTranscribeJobResponse,
+    VoiceUploadCompleteResponse,
     VoiceUploadRequest,
     VoiceSaveRequest,
+    WhisperModelSwapRequest,
+    WhisperModelSwapResponse,
+)
+from app.services.whisper import (
+    WhisperModelSwapError,
+    WhisperService,
+    WhisperTranscriptionError,
+)
+from app.services.admission import (
+    DEFAULT_QUEUE_DEADLINE_SECONDS,
+    TranscriptionOverloadedError,
+)
+from app.services.fair_scheduler import PriorityClass, priority_for_subscription
+from app.services.transcription_limits import (
+    AudioLimitExceededError,
+    limits_for_priority,
 )
-from app.services.whisper import WhisperService
+from app.services.whisper_stream import (
+    StreamingTranscriptionSession,
+    StreamLimitExceededError,
+)
+from app.services.single_flight import default_single_flight, flight_key
+from app.services.transcription_jobs import (
+    SPECULATIVE_ENABLED,
+    TranscriptionJob,
+    TranscriptionJobManager,
+    TranscriptionQueueFullError,
+)
+from app import crud
 from app.config.database import get_db
 from app.models import EmotionLog
 from app.services.voice.file_ops import VoiceFileService
 from app.utils.constants import (
     INTENSITY_MAPPING,
     ERROR_MESSAGES,
+    S3_EVENT_WEBHOOK_TOKEN,
+    S3_UPLOAD_FOLDER,
+    WHISPER_ADMIN_TOKEN,
 )
 
 # -------------------------------------------------
@@ -161,12 +209,66 @@ class WhisperServiceManager:
             logger.info("WhisperServiceの初期化完了（シングルトン）")
         return cls._instance
 
+    @classmethod
+    def peek(cls) -> Optional[WhisperService]:
+        """初期化済みならサービスを返す（未初期化なら作らずにNone）"""
+        return cls._instance
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """ワーカープロセスとスレッドを停止する（アプリ終了時）"""
+        if cls._instance is not None:
+            service, cls._instance = cls._instance, None
+            await service.aclose()
+
 
 def get_whisper_service() -> WhisperService:
     """WhisperServiceを取得する関数（後方互換性のため）"""
     return WhisperServiceManager.get_service()
 
 
+# 同じ音声の同時リクエストを1回の処理にまとめる（無効ならNone）
+_transcribe_flights = default_single_flight()
+
+
+class TranscriptionJobManagerHolder:
+    """TranscriptionJobManagerのシングルトン管理クラス"""
+
+    _instance: Optional[TranscriptionJobManager] = None
+
+    @classmethod
+    def get_manager(cls) -> TranscriptionJobManager:
+        """
+        音声認識ジョブ管理を取得する関数
+
+        説明：
+        - 音声認識ジョブのキューはアプリ全体で1つだけ持つ
+        - 初回だけ作成して、2回目以降は同じものを使い回す
+
+        Returns:
+            TranscriptionJobManager: 音声認識ジョブ管理
+        """
+        if cls._instance is None:
+            cls._instance = TranscriptionJobManager(WhisperServiceManager.get_service())
+        return cls._instance
+
+    @classmethod
+    def peek(cls) -> Optional[TranscriptionJobManager]:
+        """作成済みならジョブ管理を返す（未作成なら作らずにNone）"""
+        return cls._instance
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """ジョブランナーを停止する（アプリ終了時）"""
+        if cls._instance is not None:
+            await cls._instance.shutdown()
+            cls._instance = None
+
+
+def get_job_manager() -> TranscriptionJobManager:
+    return TranscriptionJobManagerHolder.get_manager()
+
+
 def get_file_service() -> VoiceFileService:
     return VoiceFileService()
 
@@ -193,18 +295,91 @@ async def health_check():
 
     s3_status = "configured" if S3_BUCKET_NAME else "not_configured"
 
+    # 音声認識キャッシュのヒット・ミス統計（サービス初期化済みの場合のみ）
+    whisper_service = WhisperServiceManager.peek()
+    cache_stats = whisper_service.cache_stats() if whisper_service else None
+    admission_stats = whisper_service.admission_stats() if whisper_service else None
+    job_manager = TranscriptionJobManagerHolder.peek()
+    job_stats = job_manager.stats() if job_manager else None
+
     logger.info("Health check completed - S3: %s", s3_status)
     return {
         "status": "healthy",
         "service": "voice-api",
+        "whisper_ready": bool(whisper_service and whisper_service.is_ready),
+        "whisper_model": whisper_service.model_name if whisper_service else None,
         "s3_bucket": S3_BUCKET_NAME,
         "s3_status": s3_status,
+        "transcription_cache": cache_stats,
+        "transcription_admission": admission_stats,
+        "transcription_jobs": job_stats,
+        "transcription_single_flight": (
+            _transcribe_flights.stats() if _transcribe_flights else {"enabled": False}
+        ),
     }
 
 
+@router.get(
+    "/ready",
+    summary="音声認識レディネスチェック",
+    description=(
+        "Whisperモデルの事前読み込みとダミー推論が完了していれば200、"
+        "未完了なら503を返す（ロードバランサのレディネスプローブ用）"
+    ),
+)
+async def readiness_check(response: Response):
+    """音声認識を処理できる状態かどうかを返す"""
+    whisper_service = WhisperServiceManager.peek()
+    ready = bool(whisper_service and whisper_service.is_ready)
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready}
+
+
 # -------------------------------------------------
 # Transcribe
 # -------------------------------------------------
+async def _transcribe_priority(db: AsyncSession, user_id: UUID) -> PriorityClass:
+    """
+    音声認識の優先クラスを決める
+
+    説明：
+    - 有料プランのユーザーは、混雑時に先に処理されやすくなる
+    - 無料・トライアルのユーザーも一定の割合で必ず処理される
+    - 調べ終えたらDB接続をすぐプールに返す（受付待ちや推論の間、リクエストの
+      セッションが接続を持ち続けて、429を返す前に接続プールが尽きないように）
+    - user_idはリクエスト本文の値をそのまま使う。音声APIはまだ認証していないため、
+      優先クラスは参考値として扱う（他人のIDを送れば有料の扱いを受けられる）。
+      認証を導入したら、トークンから得たユーザーIDで判定すること
+    """
+    try:
+        return priority_for_subscription(await crud.is_paid_user(db, user_id))
+    finally:
+        await db.close()
+
+
+def _to_transcribe_response(result: dict, language: str) -> VoiceTranscribeResponse:
+    """
+    音声認識結果をレスポンス形式に変換する
+
+    Args:
+        result: WhisperServiceの音声認識結果
+        language: リクエストされた言語（結果に言語がない場合に使用）
+
+    Returns:
+        VoiceTranscribeResponse: フロントエンド向けの音声認識結果
+    """
+    return VoiceTranscribeResponse(
+        success=True,  # 成功したかどうか
+        transcription_id=0,  # 変換ID（今は使わない）
+        text=result.get("text", "") or "",  # 変換された文字
+        confidence=result.get("confidence_score", 0.0),  # 信頼度（どれくらい確実か）
+        language=result.get("language", language),  # 言語
+        duration=result.get("duration", 0.0),  # 音声の長さ
+        processed_at=datetime.now(timezone.utc),  # 処理した時刻
+    )
+
+
 @router.post(
     "/transcribe",
     response_model=VoiceTranscribeResponse,
@@ -212,12 +387,17 @@ async def health_check():
     description=(
         "S3に置いた音声ファイルをWhisperで文字起こし\n"
         "- `audio_file_path`: S3キー（例: `audio/<uuid>/xxx.webm`）\n"
-        "- HTTP(S)直URLは未対応"
+        "- HTTP(S)直URLは未対応\n"
+        "- 混雑時は429（`Retry-After` 秒後に再試行）\n"
+        "- プランごとの長さ・サイズの上限を超える音声は切り詰めるか413\n"
+        "- `upload-complete` で先行実行済みなら、その結果を返す\n"
+        "- 同じ音声の同時リクエストは1回の処理にまとめる"
     ),
 )
 async def transcribe_voice(
     request: VoiceTranscribeRequest,
     whisper_service: WhisperService = Depends(get_whisper_service),
+    db: AsyncSession = Depends(get_db),
 ) -> VoiceTranscribeResponse:
     """
     音声を文字に変換する機能
@@ -230,16 +410,19 @@ async def transcribe_voice(
     Args:
         request: 音声ファイルの情報
         whisper_service: 音声認識サービス
+        db: データベースセッション（優先度・上限の判定に使用）
 
     Returns:
         VoiceTranscribeResponse: 変換された文字とその情報
 
     Raises:
-        HTTPException: 変換に失敗した場合
+        HTTPException: 変換に失敗した場合、混雑で受け付けられない場合（429）、
+            音声が長すぎる・大きすぎる場合（413）
     """
     logger.info(
         "音声認識開始: ファイル=%s, 言語=%s", request.audio_file_path, request.language
     )
+    admission = whisper_service.admission
 
     try:
         if request.audio_file_path.startswith(("http://", "https://")):
@@ -249,27 +432,88 @@ async def transcribe_voice(
 
         # S3から音声ファイルをダウンロードして音声認識を実行（非同期処理）
         # 説明：S3に保存された音声ファイルを一時的にダウンロードして、AIが音声を聞いて文字に変換する
-        result = await whisper_service.transcribe_async(
-            audio_file_path=request.audio_file_path, language=request.language or "ja"
-        )
+        # 混雑していて待ち時間が長くなる場合は、処理を始める前に断る
+        # 待ち行列ではユーザーごとに順番を回し、有料プランを優先する
+        priority = await _transcribe_priority(db, request.user_id)
+
+        def slot():
+            if admission is None:
+                return contextlib.nullcontext()
+            return admission.slot(user_key=str(request.user_id), priority=priority)
+
+        # アップロード完了時に先行して始めた音声認識があれば、その結果を使う
+        # 説明：録音をアップロードした時点で文字起こしを始めているので、
+        #       ここでは終わるのを待つだけで済むことが多い
+        result = None
+        job_manager = TranscriptionJobManagerHolder.peek()
+        if job_manager is not None:
+            result = await job_manager.join(
+                request.audio_file_path,
+                request.language or "ja",
+                user_id=str(request.user_id),
+                priority=priority,
+                slot=slot,
+            )
+        if result is None:
+            # 長すぎる音声がワーカーを占有しないよう、プランごとの上限を適用する
+            limits = limits_for_priority(priority)
+            key = flight_key(
+                request.audio_file_path,
+                whisper_service.model_identity,
+                request.language or "ja",
+                limits,
+            )
+            deadline_seconds = (
+                admission.deadline_seconds
+                if admission is not None
+                else DEFAULT_QUEUE_DEADLINE_SECONDS
+            )
+
+            async def run():
+                queued_at = time.monotonic()
+                async with slot():
+                    # 他のプロセスが同じ音声を処理中なら、その終了を待ってキャッシュを使う。
+                    # ロックは枠を得てから取り（待ち行列の間はDB接続を使わない）、
+                    # 待つのは受付制御の期限の残りまで
+                    lock = (
+                        contextlib.nullcontext()
+                        if _transcribe_flights is None
+                        else _transcribe_flights.lock(
+                            key,
+                            timeout_seconds=deadline_seconds
+                            - (time.monotonic() - queued_at),
+                        )
+                    )
+                    async with lock:
+                        return await whisper_service.transcribe_async(
+                            audio_file_path=request.audio_file_path,
+                            language=request.language or "ja",
+                            limits=limits,
+                        )
+
+            if _transcribe_flights is None:
+                result = await run()
+            else:
+                # ダブルタップやリトライで同じ音声が同時に届いた場合は、
+                # 先に始まった処理の結果を待つ（受付制御の枠も1つだけ使う）
+                result = await _transcribe_flights.do(key, run)
 
         # 結果を整理して返す
         # 説明：AIが変換した結果を、フロントエンドが使いやすい形に整理する
-        resp = VoiceTranscribeResponse(
-            success=True,  # 成功したかどうか
-            transcription_id=0,  # 変換ID（今は使わない）
-            text=result.get("text", "") or "",  # 変換された文字
-            confidence=result.get(
-                "confidence_score", 0.0
-            ),  # 信頼度（どれくらい確実か）
-            language=result.get("language", request.language or "ja"),  # 言語
-            duration=result.get("duration", 0.0),  # 音声の長さ
-            processed_at=datetime.now(timezone.utc),  # 処理した時刻
-        )
+        resp = _to_transcribe_response(result, request.language or "ja")
 
         logger.info("音声認識完了")
         return resp
 
+    except TranscriptionOverloadedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=e.message,
+            headers={"Retry-After": str(e.retry_after)},
+        ) from e
+    except AudioLimitExceededError as e:
+        logger.warning("音声認識拒否: %s", e.message)
+        raise HTTPException(status_code=413, detail=e.message) from e
     except (ValueError, RuntimeError, ConnectionError, OSError) as e:
         # ログ記録とエラーメッセージ変換を行ってから再発生
         logger.exception("Transcription failed")
@@ -279,6 +523,517 @@ async def transcribe_voice(
         ) from e
 
 
+@router.post(
+    "/transcribe/batch",
+    summary="音声認識の一括実行",
+    description=(
+        "複数のS3キーをまとめて文字起こしし、終わった順に1件ずつ返す\n"
+        "- レスポンスはNDJSON（1行1件: `audio_file_path`, `success`, `result`, `error`）\n"
+        "- 短い音声はまとめて1回の推論に通す\n"
+        "- 1件の失敗は他の件に影響しない（その行の `success` がfalseになる）\n"
+        "- 混雑時は429（`Retry-After` 秒後に再試行）"
+    ),
+)
+async def transcribe_voice_batch(
+    request: VoiceTranscribeBatchRequest,
+    whisper_service: WhisperService = Depends(get_whisper_service),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """
+    複数の音声をまとめて文字に変換する機能
+
+    説明：
+    - 溜まった録音（オフライン中の録音など）を1回のリクエストで文字にする
+    - ダウンロードは全件同時に始め、短い音声はまとめてAIに渡すので速い
+    - 終わったものから順に返すので、全件を待たずに表示できる
+
+    Args:
+        request: 音声ファイルの一覧
+        whisper_service: 音声認識サービス
+        db: データベースセッション（優先度・上限の判定に使用）
+
+    Returns:
+        StreamingResponse: 1件ごとの結果（NDJSON）
+
+    Raises:
+        HTTPException: 混雑で受け付けられない場合（429）
+    """
+    language = request.language or "ja"
+    priority = await _transcribe_priority(db, request.user_id)
+    admission = whisper_service.admission
+    logger.info(
+        "一括音声認識開始: %s件, 言語=%s", len(request.audio_file_paths), language
+    )
+
+    # 混雑していれば応答を始める前に429を返す（枠の確保はストリームの中で行う）
+    if admission is not None:
+        try:
+            admission.precheck()
+        except TranscriptionOverloadedError as e:
+            raise HTTPException(
+                status_code=429,
+                detail=e.message,
+                headers={"Retry-After": str(e.retry_after)},
+            ) from e
+
+    async def lines():
+        # 一括処理全体で1リクエスト分として受け付ける（推論の同時実行数はサービス側で制限）。
+        # 枠はストリームの中で確保し、応答を送らずに終わった場合に枠が残らないようにする
+        async with contextlib.AsyncExitStack() as stack:
+            if admission is not None:
+                try:
+                    await stack.enter_async_context(
+                        admission.slot(user_key=str(request.user_id), priority=priority)
+                    )
+                except TranscriptionOverloadedError as e:
+                    # 事前確認の後に混雑した場合は、全件を失敗として返す
+                    for key in dict.fromkeys(request.audio_file_paths):
+                        yield json.dumps(
+                            {
+                                "audio_file_path": key,
+                                "success": False,
+                                "result": None,
+                                "error": e.message,
+                            },
+                            ensure_ascii=False,
+                        ) + "\n"
+                    return
+            async for key, result in whisper_service.transcribe_batch_async(
+                request.audio_file_paths,
+                language=language,
+                limits=limits_for_priority(priority),
+            ):
+                if isinstance(result, Exception):
+                    error = (
+                        result.message
+                        if isinstance(result, AudioLimitExceededError)
+                        else f"{ERROR_MESSAGES['TRANSCRIPTION_FAILED']}: "
+                        f"{type(result).__name__}: {result}"
+                    )
+                    item = {"success": False, "result": None, "error": error}
+                else:
+                    item = {
+                        "success": True,
+                        "result": _to_transcribe_response(result, language).model_dump(
+                            mode="json"
+                        ),
+                        "error": None,
+                    }
+                yield json.dumps(
+                    {"audio_file_path": key, **item}, ensure_ascii=False
+                ) + "\n"
+            logger.info("一括音声認識完了")
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# -------------------------------------------------
+# Transcribe jobs (submit / poll / result)
+# -------------------------------------------------
+# 結果待機の上限（プロキシの30秒タイムアウトより短くする）
+MAX_JOB_WAIT_SECONDS = 25.0
+
+
+def _to_job_response(job: TranscriptionJob) -> VoiceTranscribeJobResponse:
+    """ジョブの状態をレスポンス形式に変換する"""
+    return VoiceTranscribeJobResponse(
+        success=job.status.value != "failed",
+        job_id=job.job_id,
+        status=job.status.value,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        result=(
+            _to_transcribe_response(job.result, job.language)
+            if job.result is not None
+            else None
+        ),
+        error=job.error,
+    )
+
+
+def _get_own_job(
+    job_manager: TranscriptionJobManager, job_id: str, user_id: UUID
+) -> TranscriptionJob:
+    """
+    ユーザーが投入したジョブを取得する
+
+    Raises:
+        HTTPException: ジョブがない場合、他のユーザーのジョブの場合（404）
+    """
+    job = job_manager.get(job_id)
+    if job is None or job.user_id != str(user_id):
+        # 他のユーザーのジョブは存在も明かさない
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+    return job
+
+
+@router.post(
+    "/transcribe/jobs",
+    response_model=VoiceTranscribeJobResponse,
+    status_code=202,
+    summary="音声認識ジョブ投入",
+    description=(
+        "音声認識をジョブとして投入し、ジョブIDを即座に返す\n"
+        "- 状態は `GET /voice/transcribe/jobs/{job_id}?user_id=` で確認\n"
+        "- 結果は `GET /voice/transcribe/jobs/{job_id}/result?user_id=&wait=秒` "
+        "で待機して取得"
+    ),
+)
+async def submit_transcribe_job(
+    request: VoiceTranscribeRequest,
+    job_manager: TranscriptionJobManager = Depends(get_job_manager),
+    db: AsyncSession = Depends(get_db),
+) -> VoiceTranscribeJobResponse:
+    """
+    音声認識ジョブを投入する機能
+
+    説明：
+    - 音声を文字に変換する処理を「予約」して、すぐに予約番号（ジョブID）を返す
+    - 変換そのものは裏側で順番に実行される
+    - 長い処理でもHTTP接続を待たせないので、タイムアウトしにくい
+
+    Raises:
+        HTTPException: キューが満杯の場合（503）
+    """
+    if request.audio_file_path.startswith(("http://", "https://")):
+        raise HTTPException(
+            status_code=400, detail=ERROR_MESSAGES["HTTP_URL_NOT_SUPPORTED"]
+        )
+    try:
+        job = await job_manager.submit(
+            request.audio_file_path,
+            language=request.language or "ja",
+            user_id=str(request.user_id),
+            priority=await _transcribe_priority(db, request.user_id),
+        )
+    except TranscriptionQueueFullError as e:
+        logger.warning("音声認識ジョブ投入拒否: %s", e.message)
+        raise HTTPException(status_code=503, detail=e.message) from e
+    return _to_job_response(job)
+
+
+@router.get(
+    "/transcribe/jobs/{job_id}",
+    response_model=VoiceTranscribeJobResponse,
+    summary="音声認識ジョブ状態取得",
+    description=(
+        "ジョブの状態を返す（完了していれば結果も含む）\n"
+        "- `user_id` はジョブを投入したユーザー（違えば404）"
+    ),
+)
+async def get_transcribe_job(
+    job_id: str,
+    user_id: UUID = Query(..., description="ジョブを投入したユーザーID"),
+    job_manager: TranscriptionJobManager = Depends(get_job_manager),
+) -> VoiceTranscribeJobResponse:
+    """音声認識ジョブの状態を取得する"""
+    return _to_job_response(_get_own_job(job_manager, job_id, user_id))
+
+
+@router.get(
+    "/transcribe/jobs/{job_id}/result",
+    response_model=VoiceTranscribeJobResponse,
+    summary="音声認識ジョブ結果取得",
+    description=(
+        "ジョブの終了を最大 `wait` 秒待って結果を返す\n"
+        "- `user_id` はジョブを投入したユーザー（違えば404）\n"
+        "- 終了していれば200、待機しても未完了なら202を返す"
+    ),
+)
+async def get_transcribe_job_result(
+    job_id: str,
+    response: Response,
+    user_id: UUID = Query(..., description="ジョブを投入したユーザーID"),
+    wait: float = Query(
+        default=10.0, ge=0.0, le=MAX_JOB_WAIT_SECONDS, description="最大待機秒数"
+    ),
+    job_manager: TranscriptionJobManager = Depends(get_job_manager),
+) -> VoiceTranscribeJobResponse:
+    """音声認識ジョブの結果を待機して取得する"""
+    _get_own_job(job_manager, job_id, user_id)
+    job = await job_manager.wait(job_id, timeout=wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+    if not job.is_finished:
+        response.status_code = 202
+    return _to_job_response(job)
+
+
+# -------------------------------------------------
+# Upload complete (speculative transcription)
+# -------------------------------------------------
+async def _schedule_speculative(
+    job_manager: TranscriptionJobManager,
+    db: AsyncSession,
+    user_id: UUID,
+    audio_file_path: str,
+    language: str,
+) -> VoiceUploadCompleteResponse:
+    """
+    アップロード済みの音声の認識を先行して開始する
+
+    説明：
+    - 混雑している場合は先行実行をやめる（エラーにはしない）
+    - 後から /voice/transcribe が呼ばれたら、この結果を待って返す
+    """
+    if not SPECULATIVE_ENABLED:
+        return VoiceUploadCompleteResponse(success=True, scheduled=False)
+    try:
+        job = await job_manager.submit(
+            audio_file_path,
+            language=language,
+            user_id=str(user_id),
+            priority=await _transcribe_priority(db, user_id),
+            speculative=True,
+        )
+    except TranscriptionQueueFullError as e:
+        logger.info("音声認識の先行実行を見送り: %s", e.message)
+        return VoiceUploadCompleteResponse(success=True, scheduled=False)
+    return VoiceUploadCompleteResponse(
+        success=True, scheduled=True, job_id=job.job_id, status=job.status.value
+    )
+
+
+@router.post(
+    "/upload-complete",
+    response_model=VoiceUploadCompleteResponse,
+    status_code=202,
+    summary="音声アップロード完了通知",
+    description=(
+        "Presigned URLでのアップロード完了を通知し、音声認識を先行して開始する\n"
+        "- 後から `POST /voice/transcribe` を呼ぶと、先行実行の結果を返す\n"
+        "- 混雑時は先行実行せず `scheduled: false` を返す（transcribeは通常どおり使える）"
+    ),
+)
+async def upload_complete(
+    request: VoiceTranscribeRequest,
+    job_manager: TranscriptionJobManager = Depends(get_job_manager),
+    db: AsyncSession = Depends(get_db),
+) -> VoiceUploadCompleteResponse:
+    """
+    アップロード完了を受け取って音声認識を先に始める機能
+
+    説明：
+    - 録音をS3に置いた直後に呼んでもらう
+    - 文字起こしを裏側で始めておき、あとで結果をすぐ返せるようにする
+    """
+    return await _schedule_speculative(
+        job_manager,
+        db,
+        request.user_id,
+        request.audio_file_path,
+        request.language or "ja",
+    )
+
+
+def _user_id_from_audio_key(s3_key: str) -> Optional[UUID]:
+    """音声のS3キー（<フォルダ>/audio/<user_id>/...）からユーザーIDを取り出す"""
+    parts = s3_key.split("/")
+    if len(parts) < 4 or parts[0] != S3_UPLOAD_FOLDER or parts[1] != "audio":
+        return None
+    try:
+        return UUID(parts[2])
+    except ValueError:
+        return None
+
+
+@router.post(
+    "/s3-events",
+    summary="S3イベント通知受信",
+    description=(
+        "S3のObjectCreatedイベント通知（SNS/SQS/Lambda経由で転送）を受け取り、"
+        "アップロードされた音声の認識を先行して開始する\n"
+        "- `X-Webhook-Token` ヘッダを `S3_EVENT_WEBHOOK_TOKEN` と照合する"
+        "（未設定なら403）"
+    ),
+)
+async def receive_s3_events(
+    request: Request,
+    job_manager: TranscriptionJobManager = Depends(get_job_manager),
+    db: AsyncSession = Depends(get_db),
+):
+    """S3イベント通知から音声認識を先行して開始する"""
+    # 未設定なら受け付けない（誰でも任意のキーの認識を起動できてしまうため）
+    if not S3_EVENT_WEBHOOK_TOKEN:
+        raise HTTPException(status_code=403, detail="S3 event webhook is disabled")
+    if not hmac.compare_digest(
+        request.headers.get("x-webhook-token", ""), S3_EVENT_WEBHOOK_TOKEN
+    ):
+        raise HTTPException(status_code=401, detail="Invalid webhook token")
+    try:
+        payload = await request.json()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid payload") from e
+
+    scheduled = []
+    for record in payload.get("Records", []):
+        if not str(record.get("eventName", "")).startswith("ObjectCreated"):
+            continue
+        # イベントのキーはURLエンコードされている
+        s3_key = unquote_plus(record.get("s3", {}).get("object", {}).get("key", ""))
+        user_id = _user_id_from_audio_key(s3_key)
+        if user_id is None:
+            continue
+        resp = await _schedule_speculative(job_manager, db, user_id, s3_key, "ja")
+        if resp.scheduled:
+            scheduled.append(resp.job_id)
+    return {"success": True, "scheduled": len(scheduled), "job_ids": scheduled}
+
+
+# -------------------------------------------------
+# Admin: Whisper model swap
+# -------------------------------------------------
+def _require_admin_token(request: Request) -> None:
+    """管理用APIのトークンを確認する（WHISPER_ADMIN_TOKEN未設定なら管理用APIは無効）"""
+    if not WHISPER_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not hmac.compare_digest(
+        request.headers.get("x-admin-token", ""), WHISPER_ADMIN_TOKEN
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.get(
+    "/admin/model",
+    response_model=WhisperModelSwapResponse,
+    summary="Whisperモデル切り替え状態",
+    description="現在のモデルと、切り替えの進み具合を返す（`X-Admin-Token` ヘッダが必要）",
+)
+async def get_model_swap_status(
+    request: Request,
+    whisper_service: WhisperService = Depends(get_whisper_service),
+) -> WhisperModelSwapResponse:
+    """モデル切り替えの状態を返す"""
+    _require_admin_token(request)
+    return WhisperModelSwapResponse(success=True, **whisper_service.model_swap_status())
+
+
+@router.post(
+    "/admin/model",
+    response_model=WhisperModelSwapResponse,
+    status_code=202,
+    summary="Whisperモデル切り替え",
+    description=(
+        "既定のWhisperモデルを再起動せずに切り替える（ブルーグリーン）\n"
+        "- 新しいモデルを裏で読み込み・ウォームアップしてから、新しいリクエストを切り替える\n"
+        "- 切り替え前に始まったリクエストは旧モデルで処理を終え、その後に旧モデルを解放する\n"
+        "- 進み具合は `GET /voice/admin/model` で確認する\n"
+        "- `X-Admin-Token` ヘッダが必要（`WHISPER_ADMIN_TOKEN` 未設定なら403）"
+    ),
+)
+async def swap_model(
+    request: Request,
+    body: WhisperModelSwapRequest,
+    whisper_service: WhisperService = Depends(get_whisper_service),
+) -> WhisperModelSwapResponse:
+    """
+    Whisperモデルを無停止で切り替える機能
+
+    説明：
+    - モデルを変えるたびにサーバーを再起動すると、その間は処理が遅くなる
+    - 新しいモデルの準備が終わるまで古いモデルで処理を続け、準備ができたら
+      新しいリクエストから順に新しいモデルに切り替える
+
+    Raises:
+        HTTPException: トークン不正（401/403）、許可されていないモデル（400）、
+            切り替え中の場合（409）
+    """
+    _require_admin_token(request)
+    try:
+        status = whisper_service.start_model_swap(body.model_name)
+    except WhisperModelSwapError as e:
+        code = 409 if e.error_code == "WHISPER_MODEL_SWAP_IN_PROGRESS" else 400
+        raise HTTPException(status_code=code, detail=e.message) from e
+    logger.info("モデル切り替え要求: %s", body.model_name)
+    return WhisperModelSwapResponse(success=True, **status)
+
+
+# -------------------------------------------------
+# Streaming transcribe (WebSocket)
+# -------------------------------------------------
+@router.websocket("/transcribe/stream")
+async def transcribe_stream(
+    websocket: WebSocket,
+    language: str = Query(default="ja", pattern="^(ja|en)$"),
+):
+    """
+    録音しながら文字起こしするWebSocket
+
+    説明：
+    - 録音中の音声を少しずつ（バイナリのチャンクで）送ってもらう
+    - 届いた分をその場で文字にして、途中結果を返す
+    - 録音が終わったら `{"type": "end"}` を送ってもらい、最終結果を返す
+
+    送信メッセージ（サーバー → クライアント）：
+    - `{"type": "partial", "text": "...", "duration": 秒}`
+    - `{"type": "final", ...VoiceTranscribeResponseと同じ項目}`
+    - `{"type": "error", "detail": "..."}`
+    """
+    await websocket.accept()
+    session = StreamingTranscriptionSession(get_whisper_service(), language=language)
+    partial_task: Optional[asyncio.Task] = None
+
+    async def send_partial() -> None:
+        try:
+            partial = await session.partial()
+            if partial is not None:
+                await websocket.send_json({"type": "partial", **partial})
+        except (WhisperTranscriptionError, RuntimeError, OSError) as e:
+            # 途中結果の失敗は致命的ではないので、最終結果まで処理を続ける
+            logger.warning("ストリーミング途中結果の計算に失敗: %s", e)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes"):
+                session.add_chunk(message["bytes"])
+                # 前の途中結果の計算中は新しい計算を始めない（チャンクは溜めておく）
+                if (partial_task is None or partial_task.done()) and (
+                    session.partial_due()
+                ):
+                    partial_task = asyncio.create_task(send_partial())
+                continue
+
+            if message.get("text") and json.loads(message["text"]).get("type") == "end":
+                break
+
+        # 途中結果の計算が残っていれば待ってから最終結果を出す
+        if partial_task is not None:
+            await asyncio.gather(partial_task, return_exceptions=True)
+        result = await session.final()
+        resp = _to_transcribe_response(result, language)
+        await websocket.send_json({"type": "final", **resp.model_dump(mode="json")})
+        await websocket.close()
+        logger.info(
+            "ストリーミング音声認識完了: bytes=%s, duration=%.1fs",
+            session.received_bytes,
+            resp.duration,
+        )
+
+    except WebSocketDisconnect:
+        logger.info("ストリーミング音声認識: クライアント切断")
+        if partial_task is not None:
+            partial_task.cancel()
+    except StreamLimitExceededError as e:
+        await websocket.send_json({"type": "error", "detail": e.message})
+        await websocket.close(code=1009)
+    except (WhisperTranscriptionError, ValueError, RuntimeError, OSError) as e:
+        logger.exception("Streaming transcription failed")
+        await websocket.send_json(
+            {
+                "type": "error",
+                "detail": f"{ERROR_MESSAGES['TRANSCRIPTION_FAILED']}: {type(e).__name__}",
+            }
+        )
+        await websocket.close(code=1011)
+    finally:
+        # 最終結果を出さずに終わった場合も、セッションのFFmpegを残さない
+        session.close()
+
+
 # -------------------------------------------------
 # Helper functions for save_record
 # -------------------------------------------------
@@ -286,6 +286,20 @@ async def get_subscription_by_user_id(
         return None
 
 
+# 有料プランかどうかだけを取得（音声認識の優先度判定用）
+async def is_paid_user(db: AsyncSession, user_id: uuid.UUID) -> bool:
+    """有料プランのユーザーかどうか（サブスクリプションがなければFalse）"""
+    try:
+        stmt = select(models.Subscription.is_paid).where(
+            models.Subscription.user_id == user_id
+        )
+        res = await db.execute(stmt)
+        return bool(res.scalar_one_or_none())
+    except SQLAlchemyError as e:
+        logger.error("is_paid_user failed", exc_info=e)
+        return False
+
+
 # Childrenテーブルにデータを挿入
 async def create_child(
     db: AsyncSession,
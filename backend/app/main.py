@@ -41,10 +41,11 @@ stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 async def lifespan(_: FastAPI):
     # データベース初期化は本番環境ではAlembicマイグレーションで実行
     # Whisperモデルの事前読み込み（高速化）
+    # リクエストと同じシングルトンを使い、モデルを二重に読み込まない
     try:
-        from app.services.whisper import WhisperService
+        from app.api.v1.endpoints.voice import WhisperServiceManager
 
-        whisper_service = WhisperService()
+        whisper_service = WhisperServiceManager.get_service()
         await whisper_service.warm_up()
         logger.info("Whisperモデル事前読み込み完了")
     except (ImportError, ValueError, RuntimeError) as e:
@@ -53,6 +54,16 @@ async def lifespan(_: FastAPI):
 
     yield
 
+    # 音声認識ジョブのランナーを停止してから、Whisperのワーカーを停止
+    # （リロード時やテストでワーカープロセスを残さない）
+    from app.api.v1.endpoints.voice import (
+        TranscriptionJobManagerHolder,
+        WhisperServiceManager,
+    )
+
+    await TranscriptionJobManagerHolder.shutdown()
+    await WhisperServiceManager.shutdown()
+
 
 security_schemes = {"bearerAuth": {"type": "http", "scheme": "bearer"}}
 
@@ -12,7 +12,7 @@ from sqlalchemy import (
     text,
 )
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -290,3 +290,23 @@ class ReportNotification(Base):
     # Relationships
     user = relationship("User", back_populates="report_notifications")
     child = relationship("Child", back_populates="report_notifications")
+
+
+class TranscriptionCacheEntry(Base):
+    """音声認識結果のキャッシュ（音声ハッシュ×モデル×言語×プロンプトで一意）"""
+
+    __tablename__ = "transcription_cache"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    s3_key: Mapped[str] = mapped_column(String, nullable=False)
+    etag: Mapped[str] = mapped_column(String, nullable=False)
+    model_name: Mapped[str] = mapped_column(String, nullable=False)
+    language: Mapped[str] = mapped_column(String, nullable=False)
+    result: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_accessed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
@@ -1,7 +1,7 @@
 ﻿from __future__ import annotations
 
 from datetime import datetime, timezone, date
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from uuid import UUID
 
 from pydantic import (
@@ -208,6 +208,27 @@ class VoiceTranscribeRequest(StrictModel):
         )
 
 
+class VoiceTranscribeBatchRequest(StrictModel):
+    user_id: UUID = Field(
+        ..., description="ユーザーID（UUID）", example="user-uuid-example"
+    )
+    audio_file_paths: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="音声ファイルのS3キーの一覧（1〜100件）",
+        example=["audio/user-uuid-example/audio_YYYYMMDD_HHMMSS_xxx.webm"],
+    )
+    language: Literal["ja", "en"] = Field(
+        default="ja", description="言語コード (ja: 日本語, en: 英語)"
+    )
+
+    @field_validator("audio_file_paths")
+    @classmethod
+    def validate_audio_file_paths(cls, v: List[str]) -> List[str]:
+        return [VoiceTranscribeRequest.validate_audio_file_path(p) for p in v]
+
+
 # ===== Response =====
 class VoiceUploadResponse(StrictModel):
     success: bool = Field(..., description="処理成功フラグ", example=True)
@@ -269,5 +290,58 @@ class VoiceTranscribeResponse(StrictModel):
     )
 
 
+TranscribeJobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class VoiceTranscribeJobResponse(StrictModel):
+    success: bool = Field(..., description="処理成功フラグ", example=True)
+    job_id: str = Field(..., description="音声認識ジョブID")
+    status: TranscribeJobStatus = Field(
+        ..., description="ジョブ状態（queued/running/succeeded/failed）"
+    )
+    created_at: datetime = Field(..., description="ジョブ投入時刻（UTC）")
+    finished_at: Optional[datetime] = Field(
+        None, description="ジョブ終了時刻（UTC、未完了ならnull）"
+    )
+    result: Optional[VoiceTranscribeResponse] = Field(
+        None, description="音声認識結果（succeededの場合のみ）"
+    )
+    error: Optional[str] = Field(None, description="エラー内容（failedの場合のみ）")
+
+
+class VoiceUploadCompleteResponse(StrictModel):
+    success: bool = Field(..., description="処理成功フラグ", example=True)
+    scheduled: bool = Field(
+        ..., description="音声認識を先行して開始したか（混雑・無効時はfalse）"
+    )
+    job_id: Optional[str] = Field(None, description="先行実行した音声認識ジョブID")
+    status: Optional[TranscribeJobStatus] = Field(
+        None, description="ジョブ状態（scheduledの場合のみ）"
+    )
+
+
+class WhisperModelSwapRequest(StrictModel):
+    model_name: str = Field(
+        ...,
+        description="切り替え先のWhisperモデル（WHISPER_ALLOWED_MODELS）",
+        example="small",
+    )
+
+
+class WhisperModelSwapResponse(StrictModel):
+    success: bool = Field(..., description="処理成功フラグ", example=True)
+    state: Literal["idle", "warming", "draining", "completed", "failed"] = Field(
+        ...,
+        description="切り替えの状態（warming: 新モデル準備中, draining: 旧モデルの処理待ち）",
+    )
+    current_model: str = Field(..., description="新しいリクエストが使うモデル")
+    target_model: Optional[str] = Field(None, description="切り替え先のモデル")
+    previous_model: Optional[str] = Field(None, description="切り替え前のモデル")
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = Field(None, description="失敗した場合の理由")
+    swaps: int = Field(0, description="起動後に切り替えた回数")
+
+
 class SessionStatusRequest(BaseModel):
     session_id: str
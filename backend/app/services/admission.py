@@ -0,0 +1,262 @@
+"""
+音声認識の受付制御（アドミッションコントロール）
+
+アクセスが集中したときに音声認識を無制限に受け付けると、ワーカーの前に
+処理待ちが積み上がり、全員の応答時間がP95目標（10秒）を大きく超える。
+ここでは同時実行数の上限と待ち行列の長さを制限し、推定待ち時間が期限を
+超えるリクエストは処理を始める前に429（Retry-After付き）で断る。
+
+同時実行数の上限はAIMD（加算増加・乗算減少）で調整する。
+1件あたりの処理時間が目標以内なら上限を少しずつ上げ、
+目標を超えたら一気に下げることで、ワーカーが詰まる手前の並列度に保つ。
+待ち行列は FairScheduler で管理し、優先クラスとユーザー単位で公平に枠を割り当てる。
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Hashable, Optional
+
+from app.services.fair_scheduler import FairScheduler, PriorityClass
+
+logger = logging.getLogger(__name__)
+
+# 受付制御設定（未設定時はデフォルト値を使用）
+ADMISSION_ENABLED = os.getenv("TRANSCRIBE_ADMISSION_ENABLED", "true").lower() == "true"
+# 待ち行列の上限件数
+DEFAULT_MAX_WAITING = int(os.getenv("TRANSCRIBE_MAX_WAITING", "32"))
+# 推定待ち時間がこれを超えるリクエストは断る（秒）
+DEFAULT_QUEUE_DEADLINE_SECONDS = float(
+    os.getenv("TRANSCRIBE_QUEUE_DEADLINE_SECONDS", "5")
+)
+# 1件あたりの処理時間の目標（これを超えたら同時実行数を下げる）
+DEFAULT_TARGET_LATENCY_SECONDS = float(
+    os.getenv("TRANSCRIBE_TARGET_LATENCY_SECONDS", "5")
+)
+# 同時実行数の上限の最大値（未設定ならワーカー数の2倍）
+_MAX_CONCURRENCY_ENV = os.getenv("TRANSCRIBE_MAX_CONCURRENCY")
+
+# 目標超過時に同時実行数に掛ける係数
+DECREASE_FACTOR = 0.7
+# 処理時間の移動平均の重み
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class TranscriptionOverloadedError(Exception):
+    """音声認識の受付上限エラー（混雑時）"""
+
+    def __init__(
+        self,
+        message: str,
+        retry_after: int,
+        error_code: str = "TRANSCRIBE_OVERLOADED",
+    ):
+        self.message = message
+        self.retry_after = retry_after
+        self.error_code = error_code
+        super().__init__(self.message)
+
+
+def default_max_concurrency(worker_concurrency: int) -> int:
+    """同時実行数の上限の最大値（環境変数が優先）"""
+    if _MAX_CONCURRENCY_ENV:
+        return max(1, int(_MAX_CONCURRENCY_ENV))
+    return max(1, worker_concurrency * 2)
+
+
+class AdmissionController:
+    """
+    音声認識の受付制御クラス
+
+    slot() で実行枠を確保してから音声認識を行う。枠が空いていなければ
+    待ち行列に並び、推定待ち時間が期限を超える場合は
+    TranscriptionOverloadedError を送出する。
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        *,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        max_waiting: int = DEFAULT_MAX_WAITING,
+        deadline_seconds: float = DEFAULT_QUEUE_DEADLINE_SECONDS,
+        target_latency_seconds: float = DEFAULT_TARGET_LATENCY_SECONDS,
+    ) -> None:
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or initial_limit)
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.max_waiting = max_waiting
+        self.deadline_seconds = deadline_seconds
+        self.target_latency_seconds = target_latency_seconds
+        # 観測値がないうちは目標値を処理時間の見込みとする
+        self._latency_ewma = target_latency_seconds
+        self._in_flight = 0
+        self._waiters: FairScheduler[asyncio.Future] = FairScheduler()
+        # 直近の減少以降に開始した処理だけで次の減少を判断する
+        self._decrease_epoch = 0
+        self._started = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def limit(self) -> int:
+        """現在の同時実行数の上限"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return self._waiters.qsize()
+
+    def estimated_wait_seconds(self, position: int) -> float:
+        """待ち行列のposition番目（0始まり）が実行を始めるまでの推定秒数"""
+        return (position + 1) / self.limit * self._latency_ewma
+
+    def _reject(self, reason: str, wait: float) -> TranscriptionOverloadedError:
+        self.rejected += 1
+        retry_after = max(1, math.ceil(wait))
+        logger.warning(
+            "音声認識受付拒否: %s (in_flight=%s, limit=%s, waiting=%s, retry_after=%ss)",
+            reason,
+            self._in_flight,
+            self.limit,
+            self._waiters.qsize(),
+            retry_after,
+        )
+        return TranscriptionOverloadedError(
+            "音声認識が混雑しています。しばらくしてから再度お試しください",
+            retry_after=retry_after,
+        )
+
+    def _can_start_now(self) -> bool:
+        return self._in_flight < self.limit and self._waiters.empty()
+
+    def _check_waitable(self) -> None:
+        """待ち行列に並んでも期限内に実行できる見込みがなければ断る"""
+        position = self._waiters.qsize()
+        wait = self.estimated_wait_seconds(position)
+        if position >= self.max_waiting:
+            raise self._reject("待ち行列が満杯", wait)
+        if wait > self.deadline_seconds:
+            raise self._reject("推定待ち時間が期限超過", wait)
+
+    def precheck(self) -> None:
+        """
+        枠を確保せずに、いま並んでも断られる状態でないかを確かめる
+
+        応答を返し始めてから枠を待つ処理（ストリーミング応答）で、
+        混雑時は応答を始める前に429を返すために使う。
+
+        Raises:
+            TranscriptionOverloadedError: 混雑で受け付けられない場合
+        """
+        if not self._can_start_now():
+            self._check_waitable()
+
+    async def _acquire(self, user_key: Hashable, priority: PriorityClass) -> None:
+        if self._can_start_now():
+            self._in_flight += 1
+            return
+
+        self._check_waitable()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.put_nowait(waiter, user_key=user_key, priority=priority)
+        try:
+            await asyncio.wait_for(waiter, timeout=self.deadline_seconds)
+        except asyncio.TimeoutError:
+            # 推定より処理が遅れた場合は期限で打ち切る
+            raise self._reject(
+                "待機が期限超過", self.estimated_wait_seconds(self._waiters.qsize())
+            ) from None
+        except BaseException:
+            # キャンセル時に枠を受け取っていたら次の待ちへ回す
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            self._waiters.discard(waiter)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while not self._waiters.empty() and self._in_flight < self.limit:
+            waiter = self._waiters.pop_nowait()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    def _observe(self, latency: float, epoch: int) -> None:
+        """処理時間を記録し、AIMDで同時実行数の上限を調整する"""
+        self._latency_ewma += LATENCY_EWMA_ALPHA * (latency - self._latency_ewma)
+        if latency > self.target_latency_seconds:
+            # 減少後に始まった処理の結果でなければ二重に下げない
+            if epoch <= self._decrease_epoch:
+                return
+            new_limit = max(self.min_limit, self._limit * DECREASE_FACTOR)
+            self._decrease_epoch = self._started
+            if int(new_limit) != self.limit:
+                logger.info(
+                    "音声認識の同時実行数を縮小: %s -> %s (latency=%.2fs)",
+                    self.limit,
+                    int(new_limit),
+                    latency,
+                )
+            self._limit = new_limit
+        else:
+            # 上限ぶんの処理が目標以内に終われば上限を1増やす
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        *,
+        user_key: Hashable = None,
+        priority: PriorityClass = PriorityClass.STANDARD,
+    ) -> AsyncIterator[None]:
+        """
+        音声認識の実行枠を確保する
+
+        Args:
+            user_key: 公平に順番を回す単位（ユーザーID）
+            priority: 優先クラス（有料プランかどうか）
+
+        Raises:
+            TranscriptionOverloadedError: 混雑で受け付けられない場合
+        """
+        await self._acquire(user_key, priority)
+        self.admitted += 1
+        self._started += 1
+        epoch = self._started
+        started_at = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            # 失敗した処理の時間は上限の調整に使わない
+            self._release()
+            raise
+        self._observe(time.perf_counter() - started_at, epoch)
+        self._release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """メトリクス用の統計スナップショット"""
+        return {
+            "limit": self.limit,
+            "max_limit": self.max_limit,
+            "in_flight": self._in_flight,
+            "waiting": self._waiters.qsize(),
+            "latency_ewma_seconds": round(self._latency_ewma, 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queue_wait_by_class": self._waiters.snapshot(),
+        }
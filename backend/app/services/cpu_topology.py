@@ -0,0 +1,116 @@
+"""
+CPUトポロジーに基づく推論ワーカーの配置
+
+Whisperの推論はtorchのintra-opスレッドで並列化されるため、ワーカーごとに
+スレッド数を決めずに複数の推論を同時に走らせると、コア数を超えるスレッドが
+奪い合って全員が遅くなる。ここでは利用可能なCPUを物理コア単位に
+まとめ、ワーカー（モデルのレプリカ）ごとに重ならないコアの組を割り当てる。
+
+- スレッド数: ワーカーに割り当てた物理コア数（SMTの兄弟スレッドは数えない）
+- アフィニティ: WHISPER_CPU_AFFINITY=true の場合、割り当てたコアに固定する
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 配置設定（未設定時はデフォルト値を使用）
+CPU_AFFINITY_ENABLED = os.getenv("WHISPER_CPU_AFFINITY", "false").lower() == "true"
+
+_SYS_CPU_DIR = "/sys/devices/system/cpu"
+
+CoreSet = Tuple[int, ...]  # 1ワーカーに割り当てる論理CPU番号
+
+
+def available_cpus() -> List[int]:
+    """このプロセスが使える論理CPU番号（cgroup・taskset の制限を反映）"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _read_topology(cpu: int, name: str) -> Optional[int]:
+    try:
+        with open(f"{_SYS_CPU_DIR}/cpu{cpu}/topology/{name}", encoding="ascii") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def physical_cores(cpus: Optional[Iterable[int]] = None) -> List[CoreSet]:
+    """
+    論理CPUを物理コアごとにまとめる
+
+    sysfsのトポロジー情報（ソケット番号・コア番号）で同じ物理コアの
+    SMTスレッドをまとめる。情報が読めない環境では論理CPU1つを1コアとみなす。
+
+    Returns:
+        List[CoreSet]: 物理コアごとの論理CPU番号（ソケット・コア順）
+    """
+    cores: Dict[Tuple[int, int], List[int]] = {}
+    for cpu in cpus if cpus is not None else available_cpus():
+        package = _read_topology(cpu, "physical_package_id")
+        core = _read_topology(cpu, "core_id")
+        key = (package, core) if package is not None and core is not None else (-1, cpu)
+        cores.setdefault(key, []).append(cpu)
+    return [tuple(sorted(cores[key])) for key in sorted(cores)]
+
+
+@dataclass(frozen=True)
+class WorkerPlacement:
+    """推論ワーカーの配置（ワーカー数・スレッド数・割り当てるコア）"""
+
+    num_workers: int
+    torch_threads: int
+    core_sets: Tuple[CoreSet, ...]
+
+
+def plan_placement(
+    num_workers: int,
+    torch_threads: Optional[int] = None,
+    cores: Optional[List[CoreSet]] = None,
+) -> WorkerPlacement:
+    """
+    物理コアをワーカーに均等に分ける
+
+    ワーカーiには連続した物理コアを割り当てる（同じソケット・L2を共有しやすい）。
+    ワーカー数が物理コア数より多い場合は、コアを順に使い回す。
+
+    Args:
+        num_workers: ワーカー数（1以上）
+        torch_threads: 1ワーカーあたりのスレッド数（Noneなら割り当てた物理コア数）
+        cores: 物理コアの一覧（Noneならこのマシンから取得）
+    """
+    cores = cores if cores is not None else physical_cores()
+    num_workers = max(1, num_workers)
+    per_worker = max(1, len(cores) // num_workers)
+    core_sets = []
+    for i in range(num_workers):
+        start = (i * per_worker) % len(cores)
+        assigned = cores[start : start + per_worker]
+        core_sets.append(tuple(cpu for core in assigned for cpu in core))
+    return WorkerPlacement(
+        num_workers=num_workers,
+        torch_threads=torch_threads or per_worker,
+        core_sets=tuple(core_sets),
+    )
+
+
+def pin_to_cpus(cpus: Iterable[int]) -> bool:
+    """
+    このプロセスを指定した論理CPUに固定する
+
+    Returns:
+        bool: 固定できたかどうか（非対応OS・権限不足の場合はFalse）
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(0, set(cpus))
+        return True
+    except OSError as e:
+        logger.warning("CPUアフィニティの設定に失敗: %s", e)
+        return False
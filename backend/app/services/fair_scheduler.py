@@ -0,0 +1,220 @@
+"""
+音声認識の公平スケジューラ
+
+Whisperワーカーの前に置く待ち行列。単純なFIFOでは、1人の保護者が
+まとめて投入した音声が他のユーザーの処理をすべて待たせてしまうため、
+次の2段階で取り出す順番を決める。
+
+- 優先クラス間: 重み付きラウンドロビン（有料プランを多めに取り出すが、
+  無料・トライアルのユーザーも一定の割合で必ず処理する）
+- クラス内: ユーザーごとのラウンドロビン（同じユーザーの音声は投入順）
+
+クラスごとの待ち時間（投入から取り出しまで）を記録し、メトリクスとして返す。
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import Any, Deque, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+# スケジューラ設定（未設定時はデフォルト値を使用）
+# 有料プランのリクエストを、無料・トライアル1件につき何件取り出すか
+DEFAULT_PAID_WEIGHT = int(os.getenv("TRANSCRIBE_PAID_WEIGHT", "3"))
+# 待ち時間のパーセンタイル計算に使う直近の件数
+WAIT_SAMPLE_SIZE = 512
+
+T = TypeVar("T")
+
+
+class PriorityClass(str, Enum):
+    """音声認識の優先クラス"""
+
+    PAID = "paid"  # 有料プラン
+    STANDARD = "standard"  # 無料・トライアル
+
+
+def priority_for_subscription(is_paid: bool) -> PriorityClass:
+    """サブスクリプションの状態から優先クラスを決める"""
+    return PriorityClass.PAID if is_paid else PriorityClass.STANDARD
+
+
+class _ClassQueue(Generic[T]):
+    """優先クラス1つぶんの待ち行列（ユーザーごとのラウンドロビン）"""
+
+    def __init__(self, weight: int) -> None:
+        self.weight = max(1, weight)
+        # 重み付きラウンドロビンの現在値
+        self.current = 0
+        self.users: "OrderedDict[Hashable, Deque[Tuple[float, T]]]" = OrderedDict()
+        self.size = 0
+        self.dequeued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    def push(self, user_key: Hashable, item: T) -> None:
+        self.users.setdefault(user_key, deque()).append((time.monotonic(), item))
+        self.size += 1
+
+    def pop(self) -> T:
+        # 先頭のユーザーから1件取り出し、残りがあれば末尾に回す
+        user_key, items = next(iter(self.users.items()))
+        enqueued_at, item = items.popleft()
+        del self.users[user_key]
+        if items:
+            self.users[user_key] = items
+        self.size -= 1
+
+        wait = time.monotonic() - enqueued_at
+        self.dequeued += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.recent_waits.append(wait)
+        return item
+
+    def discard(self, item: T) -> bool:
+        for user_key, items in self.users.items():
+            for entry in items:
+                if entry[1] is item:
+                    items.remove(entry)
+                    if not items:
+                        del self.users[user_key]
+                    self.size -= 1
+                    return True
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        waits = sorted(self.recent_waits)
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        return {
+            "weight": self.weight,
+            "queued": self.size,
+            "queued_users": len(self.users),
+            "dequeued": self.dequeued,
+            "avg_wait_seconds": round(
+                self.wait_total / self.dequeued if self.dequeued else 0.0, 3
+            ),
+            "p95_wait_seconds": round(p95, 3),
+            "max_wait_seconds": round(self.wait_max, 3),
+        }
+
+
+class FairScheduler(Generic[T]):
+    """
+    優先クラス・ユーザー単位の公平スケジューラ
+
+    put_nowait() で投入し、get()（待機あり）または pop_nowait() で
+    次に処理すべき要素を取り出す。
+    """
+
+    def __init__(
+        self,
+        *,
+        weights: Optional[Dict[PriorityClass, int]] = None,
+        maxsize: int = 0,
+    ) -> None:
+        weights = weights or {
+            PriorityClass.PAID: DEFAULT_PAID_WEIGHT,
+            PriorityClass.STANDARD: 1,
+        }
+        self._classes: Dict[PriorityClass, _ClassQueue[T]] = {
+            priority: _ClassQueue(weights.get(priority, 1))
+            for priority in PriorityClass
+        }
+        self.maxsize = maxsize
+        self._size = 0
+        self._getters: Deque[asyncio.Future] = deque()
+
+    def qsize(self) -> int:
+        """待ち行列の要素数"""
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= self._size
+
+    def put_nowait(
+        self,
+        item: T,
+        *,
+        user_key: Hashable = None,
+        priority: PriorityClass = PriorityClass.STANDARD,
+    ) -> None:
+        """
+        要素を投入する
+
+        Raises:
+            asyncio.QueueFull: maxsizeに達している場合
+        """
+        if self.full():
+            raise asyncio.QueueFull
+        self._classes[priority].push(user_key, item)
+        self._size += 1
+        self._wake_getter()
+
+    def _wake_getter(self) -> None:
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
+
+    def _select_class(self) -> _ClassQueue[T]:
+        """重み付きラウンドロビン（滑らかな重み付け）で次のクラスを選ぶ"""
+        active = [q for q in self._classes.values() if q.size]
+        for q in self._classes.values():
+            if not q.size:
+                # 待ちのないクラスは持ち越さない（空いていた間の分を後で取り返さない）
+                q.current = 0
+        total = sum(q.weight for q in active)
+        for q in active:
+            q.current += q.weight
+        chosen = max(active, key=lambda q: q.current)
+        chosen.current -= total
+        return chosen
+
+    def pop_nowait(self) -> T:
+        """
+        次に処理すべき要素を取り出す
+
+        Raises:
+            asyncio.QueueEmpty: 待ち行列が空の場合
+        """
+        if self._size == 0:
+            raise asyncio.QueueEmpty
+        item = self._select_class().pop()
+        self._size -= 1
+        return item
+
+    async def get(self) -> T:
+        """要素が投入されるまで待って取り出す"""
+        while self._size == 0:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except BaseException:
+                getter.cancel()
+                if getter in self._getters:
+                    self._getters.remove(getter)
+                # 起こされた直後にキャンセルされた場合は次の待ち手に譲る
+                if self._size:
+                    self._wake_getter()
+                raise
+        return self.pop_nowait()
+
+    def discard(self, item: T) -> bool:
+        """まだ取り出されていない要素を取り除く（取り除いたらTrue）"""
+        for q in self._classes.values():
+            if q.discard(item):
+                self._size -= 1
+                return True
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """優先クラスごとの待ち件数・待ち時間の統計"""
+        return {priority.value: q.snapshot() for priority, q in self._classes.items()}
@@ -24,6 +24,15 @@ class S3PresignedUrlError(Exception):
         super().__init__(self.message)
 
 
+class S3UploadError(Exception):
+    """S3アップロード関連のエラー"""
+
+    def __init__(self, message: str, error_code: str = "S3_UPLOAD_ERROR"):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+
 class S3DeleteError(Exception):
     """S3オブジェクト削除関連のエラー"""
 
@@ -140,6 +149,31 @@ class S3Service:
                 f"署名付きダウンロードURLの生成に失敗しました: {e}"
             ) from e
 
+    def put_text_object(self, s3_key: str, text: str) -> None:
+        """
+        テキストをS3オブジェクトとして保存
+
+        文字起こし結果のテキストファイル（text_file_path）をサーバー側で
+        書き出す場合に使う（通常のアップロードはPresigned URLでクライアントが行う）。
+
+        Args:
+            s3_key: S3キー
+            text: 保存するテキスト（UTF-8で保存）
+
+        Raises:
+            S3UploadError: 保存に失敗した場合
+        """
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Body=text.encode("utf-8"),
+                ContentType="text/plain; charset=utf-8",
+            )
+        except ClientError as e:
+            logger.error("S3 put_object error (key=%s): %s", s3_key, e)
+            raise S3UploadError(f"テキストの保存に失敗しました: {e}") from e
+
     def delete_object(self, s3_key: str, bucket_name: Optional[str] = None) -> bool:
         """
         S3オブジェクトを削除
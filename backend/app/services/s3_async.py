@@ -0,0 +1,204 @@
+"""
+非同期S3ダウンロード
+
+boto3は同期APIのため、イベントループ上で直接呼ぶとS3の応答待ちの間
+他のリクエストがすべて止まる。ここではS3 I/O専用のスレッドプールで
+boto3を実行し、セマフォで同時実行数を制限しながら非同期に待つ。
+
+また、GetObjectのレスポンスに含まれるETagをキーごとに覚えておき、
+キャッシュ確認のためのHEADリクエストを省く。
+（音声のS3キーはアップロードごとにUUIDを含むため、内容は変わらない前提）
+"""
+
+import os
+import asyncio
+import logging
+import concurrent.futures
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# S3 I/O設定（未設定時はデフォルト値を使用）
+DEFAULT_S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+# キー→ETagの記憶件数
+DEFAULT_ETAG_MEMO_SIZE = 4096
+# ダウンロードしながらデコードするかどうか（falseなら全体を受信してからデコード）
+STREAM_DECODE_ENABLED = os.getenv("S3_STREAM_DECODE", "true").lower() == "true"
+# ストリーミング時に1回で読み出すサイズ
+DEFAULT_STREAM_CHUNK_BYTES = int(os.getenv("S3_STREAM_CHUNK_BYTES", str(64 * 1024)))
+
+# オブジェクトのサイズ（ContentLength）を受け取り、上限超過なら例外を送出する関数
+SizeCheck = Callable[[int], None]
+
+
+class AsyncS3Downloader:
+    """
+    非同期S3ダウンローダー
+
+    boto3クライアント（スレッドセーフ）を専用スレッドプールで呼び出し、
+    同時に実行するS3リクエスト数をmax_concurrencyまでに制限する。
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket_name: str,
+        *,
+        max_concurrency: int = DEFAULT_S3_MAX_CONCURRENCY,
+        etag_memo_size: int = DEFAULT_ETAG_MEMO_SIZE,
+    ) -> None:
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="s3-io"
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._etags: "OrderedDict[str, str]" = OrderedDict()
+        self._etag_memo_size = etag_memo_size
+
+    async def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """boto3の呼び出しをS3用スレッドプールで実行する"""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, partial(fn, *args, **kwargs)
+            )
+
+    def known_etag(self, s3_key: str) -> Optional[str]:
+        """以前のダウンロードで取得したETag（なければNone）"""
+        etag = self._etags.get(s3_key)
+        if etag is not None:
+            self._etags.move_to_end(s3_key)
+        return etag
+
+    def _remember_etag(self, s3_key: str, etag: Optional[str]) -> None:
+        if not etag:
+            return
+        self._etags[s3_key] = etag
+        self._etags.move_to_end(s3_key)
+        while len(self._etags) > self._etag_memo_size:
+            self._etags.popitem(last=False)
+
+    @staticmethod
+    def _check_size(obj: Dict[str, Any], check_size: Optional[SizeCheck]) -> None:
+        """本文を読む前にサイズを確認する（例外時は本文を閉じる）"""
+        if check_size is None or obj.get("ContentLength") is None:
+            return
+        try:
+            check_size(obj["ContentLength"])
+        except BaseException:
+            obj["Body"].close()
+            raise
+
+    def _get_object_bytes_sync(
+        self, s3_key: str, check_size: Optional[SizeCheck] = None
+    ) -> Tuple[bytes, str]:
+        obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+        self._check_size(obj, check_size)
+        return obj["Body"].read(), obj.get("ETag", "")
+
+    async def get_object_bytes(
+        self, s3_key: str, *, check_size: Optional[SizeCheck] = None
+    ) -> Tuple[bytes, str]:
+        """
+        S3オブジェクトをメモリ上にダウンロードする
+
+        Args:
+            s3_key: S3キー
+            check_size: 本文を読む前にContentLengthを渡す関数（例外で中止する）
+
+        Returns:
+            Tuple[bytes, str]: (オブジェクトの内容, ETag)
+        """
+        logger.info(
+            "S3からダウンロード開始: bucket=%s, key=%s", self.bucket_name, s3_key
+        )
+        try:
+            data, etag = await self._call(
+                self._get_object_bytes_sync, s3_key, check_size
+            )
+        except Exception as e:
+            logger.error(
+                "S3ダウンロードエラー: bucket=%s, key=%s, error=%s",
+                self.bucket_name,
+                s3_key,
+                e,
+            )
+            raise
+        self._remember_etag(s3_key, etag)
+        logger.info("S3ダウンロード完了: %s (%d bytes)", s3_key, len(data))
+        return data, etag
+
+    async def open_object(
+        self, s3_key: str, *, check_size: Optional[SizeCheck] = None
+    ) -> Tuple[Any, str]:
+        """
+        S3オブジェクトを開く（ヘッダだけを受け取り、本文はまだ読まない）
+
+        Args:
+            s3_key: S3キー
+            check_size: 本文を読む前にContentLengthを渡す関数（例外で中止する）
+
+        Returns:
+            Tuple[StreamingBody, str]: (本文のストリーム, ETag)。
+                ストリームは consume_object() で読み切るか close() すること
+        """
+        logger.info("S3ストリーミング開始: bucket=%s, key=%s", self.bucket_name, s3_key)
+        try:
+            obj = await self._call(
+                self.s3_client.get_object, Bucket=self.bucket_name, Key=s3_key
+            )
+        except Exception as e:
+            logger.error(
+                "S3ダウンロードエラー: bucket=%s, key=%s, error=%s",
+                self.bucket_name,
+                s3_key,
+                e,
+            )
+            raise
+        self._check_size(obj, check_size)
+        etag = obj.get("ETag", "")
+        self._remember_etag(s3_key, etag)
+        return obj["Body"], etag
+
+    async def consume_object(
+        self,
+        body,
+        consumer: Callable[[Iterable[bytes]], Any],
+        *,
+        chunk_size: int = DEFAULT_STREAM_CHUNK_BYTES,
+    ) -> Any:
+        """
+        開いたオブジェクトの本文をチャンクごとにconsumerへ渡す（S3用スレッドで実行）
+
+        consumerは受信しながら処理できる関数（FFmpegへのパイプなど）を想定し、
+        ダウンロードの完了を待たずに後段の処理を始められる。
+        受信とconsumerの処理は同じスレッドで交互に進むため、consumerが終わるまで
+        S3の同時実行枠（max_concurrency）を1つ使う。ストリーミングデコードでは
+        FFmpegのデコードもこの枠の中で行われ、同時デコード数の上限を兼ねる。
+        枠を待つ間にキャンセルされた場合も本文を閉じる。
+        """
+        started = False
+
+        def run() -> Any:
+            nonlocal started
+            started = True
+            try:
+                return consumer(body.iter_chunks(chunk_size))
+            finally:
+                body.close()
+
+        try:
+            return await self._call(run)
+        except BaseException:
+            # 実行が始まっていればrun()の中で閉じる
+            if not started:
+                body.close()
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        """S3用スレッドプールを停止する"""
+        self._executor.shutdown(wait=wait)
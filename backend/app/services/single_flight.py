@@ -0,0 +1,201 @@
+"""
+同じ音声の同時リクエストの合流（シングルフライト）
+
+ダブルタップやクライアントのリトライで、同じ audio_file_path の
+/voice/transcribe が同じ秒に複数届くことがある。それぞれが別々に
+ダウンロードとWhisper推論を行わないよう、同じキーの処理を1回にまとめる。
+
+- プロセス内: 同じキーの処理が実行中なら、新しく始めずにその結果を待つ
+- プロセス間: PostgreSQLのアドバイザリロック（pg_advisory_xact_lock）で
+  同じキーの処理を直列化する。後から来たプロセスはロックの解放を待ってから
+  処理を始め、先のプロセスが保存した認識結果キャッシュ（transcription_cache
+  テーブル）を使うため、推論をやり直さない。ロックは呼び出し側が受付制御の
+  枠を得てから lock() で取り、待ち行列に並んでいる間はDB接続を使わない
+
+キーは S3キー × モデル × 言語 × 入力上限 など、結果を変えるオプションから作る。
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+)
+
+from app.services.transcription_cache import CACHE_ENABLED, PERSISTENT_CACHE_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# シングルフライトの設定（未設定時はデフォルト値を使用）
+SINGLE_FLIGHT_ENABLED = (
+    os.getenv("TRANSCRIBE_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+)
+# プロセス間の合流（アドバイザリロック）を使うか。永続キャッシュが無効なら効果がないため使わない
+DISTRIBUTED_ENABLED = (
+    os.getenv("TRANSCRIBE_SINGLE_FLIGHT_DISTRIBUTED", "true").lower() == "true"
+    and CACHE_ENABLED
+    and PERSISTENT_CACHE_ENABLED
+)
+LockFactory = Callable[..., AsyncContextManager[None]]
+
+
+def flight_key(*parts: Any) -> str:
+    """結果を変えるオプションを並べてキーにする"""
+    return "\x1f".join(str(part) for part in parts)
+
+
+def advisory_lock_key(key: str) -> int:
+    """キーからPostgreSQLのアドバイザリロック用の63bit整数を作る"""
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[-8:], "big") & 0x7FFFFFFFFFFFFFFF
+
+
+@contextlib.asynccontextmanager
+async def advisory_lock(key: str, *, timeout_seconds: float) -> AsyncIterator[None]:
+    """
+    同じキーの処理をプロセス間で直列化する（PostgreSQLのアドバイザリロック）
+
+    トランザクション単位のロックなので、処理が終わるかプロセスが落ちて接続が
+    切れれば解放される。ロックを取れない場合（タイムアウト・DB障害）は
+    合流をあきらめてロックなしで処理する（認識自体は失敗させない）。
+
+    Args:
+        key: 合流するキー（flight_keyで作る）
+        timeout_seconds: 他のプロセスの処理を待つ上限（秒）
+    """
+    from sqlalchemy import text
+    from app.config.database import async_session_local
+
+    async with async_session_local() as session:
+        locked = False
+        try:
+            # SETはバインド変数を使えないため、数値に変換してから埋め込む
+            # （0は無制限の意味になるため、最低でも1ミリ秒にする）
+            timeout_ms = max(1, int(timeout_seconds * 1000))
+            await session.execute(text(f"SET LOCAL lock_timeout = {timeout_ms}"))
+            await session.execute(
+                text("SELECT pg_advisory_xact_lock(:k)"),
+                {"k": advisory_lock_key(key)},
+            )
+            locked = True
+        except Exception as e:  # ロックなしで続行する
+            logger.warning("プロセス間ロックを取得できないため合流せずに処理: %s", e)
+            await session.rollback()
+        try:
+            yield
+        finally:
+            if locked:
+                # 何も書いていないトランザクションを終えてロックを解放する
+                await session.rollback()
+
+
+class SingleFlight:
+    """
+    同じキーの同時実行を1回にまとめる
+
+    最初の呼び出し（リーダー）が処理を始め、処理中に来た同じキーの呼び出し
+    （フォロワー）は同じ結果・同じ例外を受け取る。処理は呼び出し元とは別の
+    タスクで行うため、リーダーのクライアントが切断してもフォロワーの処理は
+    止まらない。
+
+    プロセス間ロックは do() では取らない。呼び出し側が処理本体の中で
+    受付制御の枠を得てから lock() で取る（枠を待つ間にDB接続を使わない）。
+
+    Args:
+        lock_factory: キーごとのプロセス間ロック（Noneならプロセス内だけで合流）
+    """
+
+    def __init__(self, lock_factory: Optional[LockFactory] = None) -> None:
+        self._lock_factory = lock_factory
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        キーの処理を実行する（同じキーが実行中ならその結果を待つ）
+
+        Args:
+            key: 合流するキー（flight_keyで作る）
+            fn: 処理本体（引数なしのコルーチン関数）
+
+        Returns:
+            Any: fnの結果（フォロワーはリーダーと同じオブジェクトを受け取る）
+        """
+        task = self._flights.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.followers += 1
+            logger.info("同じ音声の処理に合流: %s", key.split("\x1f", 1)[0])
+        # 待っている側がキャンセルされても、処理自体は他の待ち手のために続ける
+        return await asyncio.shield(task)
+
+    @contextlib.asynccontextmanager
+    async def lock(self, key: str, *, timeout_seconds: float) -> AsyncIterator[None]:
+        """
+        キーのプロセス間ロック（lock_factoryがなければ何もしない）
+
+        ロックの取得はDB接続の取り出し（接続プールの空き待ち）も含めて
+        timeout_secondsまでしか待たず、超えたらロックなしで処理する。
+
+        Args:
+            key: 合流するキー（do()と同じもの）
+            timeout_seconds: 他のプロセスの処理を待つ上限（秒）
+        """
+        if self._lock_factory is None:
+            yield
+            return
+        async with contextlib.AsyncExitStack() as stack:
+            try:
+                await asyncio.wait_for(
+                    stack.enter_async_context(
+                        self._lock_factory(key, timeout_seconds=timeout_seconds)
+                    ),
+                    timeout=max(0.0, timeout_seconds),
+                )
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "プロセス間ロックを期限内に取得できないため合流せずに処理: %s",
+                    key.split("\x1f", 1)[0],
+                )
+            yield
+
+    def in_flight(self) -> int:
+        """実行中のキーの数"""
+        return len(self._flights)
+
+    def stats(self) -> Dict[str, Any]:
+        """メトリクス用の統計（followersが合流して省けた処理の数）"""
+        return {
+            "enabled": True,
+            "distributed": self._lock_factory is not None,
+            "in_flight": self.in_flight(),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # 待ち手が全員キャンセルされた場合も、例外を未回収のまま残さない
+            task.exception()
+
+
+def default_single_flight() -> Optional[SingleFlight]:
+    """設定に応じたSingleFlight（無効ならNone）"""
+    if not SINGLE_FLIGHT_ENABLED:
+        return None
+    return SingleFlight(lock_factory=advisory_lock if DISTRIBUTED_ENABLED else None)
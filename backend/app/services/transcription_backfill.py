@@ -0,0 +1,269 @@
+"""
+保存済み音声の文字起こしの一括再処理（バックフィル）
+
+Whisperのモデルやプロンプトを変えたときに、既存の EmotionLog の
+audio_file_path を認識し直し、voice_note とテキストファイルを更新する。
+
+- 行はIDのキーセットページングで少しずつ読む（OFFSETを使わず、全件をメモリに載せない）
+- 認識は WhisperService.transcribe_batch_async に任せ、ダウンロードを同時に進めて
+  ワーカープールのプロセスで並列に認識する
+- 1バッチ終わるごとにチェックポイント（最後に処理したID）をファイルに保存し、
+  中断しても続きから再開できる
+- 書き込み（DB更新・S3保存）は毎秒の上限で間引き、稼働中のAPIを圧迫しない
+
+CLIは backend/backfill_transcriptions.py。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import sqlalchemy as sa
+
+from app.models import EmotionLog
+
+logger = logging.getLogger(__name__)
+
+# バックフィルの設定（未設定時はデフォルト値を使用）
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "32"))
+BACKFILL_WRITES_PER_SECOND = float(os.getenv("BACKFILL_WRITES_PER_SECOND", "5"))
+BACKFILL_CHECKPOINT_PATH = os.getenv(
+    "BACKFILL_CHECKPOINT_PATH", ".backfill_transcriptions.json"
+)
+
+# チェックポイントに残す失敗IDの上限（再実行の手がかり。多すぎる分は件数だけ数える）
+_MAX_FAILED_IDS = 1000
+
+
+@dataclass
+class BackfillCheckpoint:
+    """再処理の進み具合（中断後の再開に使う）"""
+
+    model: str
+    last_id: Optional[str] = None  # 処理済みの最後のEmotionLog.id
+    processed: int = 0
+    updated: int = 0
+    failed: int = 0
+    failed_ids: List[str] = field(default_factory=list)
+    started_at: str = field(
+        default_factory=lambda: datetime.now(timezone.utc).isoformat()
+    )
+    finished: bool = False
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BackfillCheckpoint"]:
+        """チェックポイントを読み込む（ファイルがなければNone）"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def save(self, path: str) -> None:
+        """チェックポイントを保存する（途中で落ちても壊れないよう置き換えで書く）"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def record_failure(self, row_id: str) -> None:
+        self.failed += 1
+        if len(self.failed_ids) < _MAX_FAILED_IDS:
+            self.failed_ids.append(row_id)
+
+
+class WriteThrottle:
+    """書き込みの間隔を空けて、毎秒の上限を超えないようにする"""
+
+    def __init__(self, per_second: float) -> None:
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next_at = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        if self._next_at > now:
+            await asyncio.sleep(self._next_at - now)
+            now = self._next_at
+        self._next_at = now + self.interval
+
+
+@dataclass(frozen=True)
+class BackfillRow:
+    """再処理の対象行"""
+
+    id: str
+    audio_file_path: str
+    text_file_path: Optional[str]
+    voice_note: Optional[str]
+
+
+class TranscriptionBackfill:
+    """
+    保存済み音声の文字起こしを一括で再処理する
+
+    Args:
+        session_factory: DBセッションを作る関数（async_sessionmaker）
+        whisper_service: 認識に使うWhisperService（transcribe_batch_asyncを使う）
+        write_text: テキストファイルをS3に保存する関数（Noneなら保存しない）
+        checkpoint_path: チェックポイントファイルのパス
+        batch_size: 1回に読む行数（まとめて認識する件数）
+        writes_per_second: 1秒あたりの書き込み件数の上限（0で無制限）
+        language: 認識言語
+        dry_run: Trueなら認識だけ行い、DBとS3は更新しない
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        whisper_service: Any,
+        *,
+        write_text: Optional[Callable[[str, str], Awaitable[None]]] = None,
+        checkpoint_path: str = BACKFILL_CHECKPOINT_PATH,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        writes_per_second: float = BACKFILL_WRITES_PER_SECOND,
+        language: str = "ja",
+        dry_run: bool = False,
+    ) -> None:
+        self.session_factory = session_factory
+        self.whisper_service = whisper_service
+        self.write_text = write_text
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = max(1, batch_size)
+        self.throttle = WriteThrottle(writes_per_second)
+        self.language = language
+        self.dry_run = dry_run
+
+    def load_checkpoint(self, *, reset: bool = False) -> BackfillCheckpoint:
+        """
+        チェックポイントを読み込む（なければ最初から）
+
+        Raises:
+            ValueError: 別のモデルで途中まで実行したチェックポイントがある場合
+        """
+        model = self.whisper_service.model_identity
+        checkpoint = None if reset else BackfillCheckpoint.load(self.checkpoint_path)
+        if checkpoint is None or checkpoint.finished:
+            return BackfillCheckpoint(model=model)
+        if checkpoint.model != model:
+            raise ValueError(
+                f"チェックポイントのモデル（{checkpoint.model}）が現在のモデル"
+                f"（{model}）と異なります。最初からやり直す場合は --reset を指定してください"
+            )
+        return checkpoint
+
+    async def fetch_rows(self, after_id: Optional[str]) -> List[BackfillRow]:
+        """after_idより後の行をID順に batch_size 件読む（キーセットページング）"""
+        stmt = (
+            sa.select(
+                EmotionLog.id,
+                EmotionLog.audio_file_path,
+                EmotionLog.text_file_path,
+                EmotionLog.voice_note,
+            )
+            .where(EmotionLog.audio_file_path.is_not(None))
+            .where(EmotionLog.audio_file_path != "")
+            .order_by(EmotionLog.id)
+            .limit(self.batch_size)
+        )
+        if after_id is not None:
+            stmt = stmt.where(EmotionLog.id > uuid.UUID(after_id))
+        async with self.session_factory() as session:
+            rows = (await session.execute(stmt)).all()
+        return [
+            BackfillRow(str(r.id), r.audio_file_path, r.text_file_path, r.voice_note)
+            for r in rows
+        ]
+
+    async def update_row(self, row: BackfillRow, text: str) -> None:
+        """voice_noteを更新する（行ごとの短いトランザクションでロックを長く持たない）"""
+        async with self.session_factory() as session:
+            async with session.begin():
+                await session.execute(
+                    sa.update(EmotionLog)
+                    .where(EmotionLog.id == uuid.UUID(row.id))
+                    .values(voice_note=text)
+                )
+
+    async def run(
+        self, *, reset: bool = False, limit: Optional[int] = None
+    ) -> BackfillCheckpoint:
+        """
+        チェックポイントの続きから全件を再処理する
+
+        Args:
+            reset: Trueならチェックポイントを無視して最初から処理する
+            limit: 今回の実行で処理する最大件数（Noneなら最後まで）
+
+        Returns:
+            BackfillCheckpoint: 実行後の進み具合
+        """
+        checkpoint = self.load_checkpoint(reset=reset)
+        if checkpoint.last_id is not None:
+            logger.info(
+                "バックフィル再開: last_id=%s, 処理済み=%s件",
+                checkpoint.last_id,
+                checkpoint.processed,
+            )
+        handled = 0
+        while limit is None or handled < limit:
+            rows = await self.fetch_rows(checkpoint.last_id)
+            if limit is not None:
+                rows = rows[: limit - handled]
+            if not rows:
+                checkpoint.finished = True
+                break
+            await self._process_batch(rows, checkpoint)
+            handled += len(rows)
+            checkpoint.last_id = rows[-1].id
+            if not self.dry_run:
+                checkpoint.save(self.checkpoint_path)
+            logger.info(
+                "バックフィル進捗: 処理=%s件, 更新=%s件, 失敗=%s件",
+                checkpoint.processed,
+                checkpoint.updated,
+                checkpoint.failed,
+            )
+        if not self.dry_run:
+            checkpoint.save(self.checkpoint_path)
+        return checkpoint
+
+    async def _process_batch(
+        self, rows: List[BackfillRow], checkpoint: BackfillCheckpoint
+    ) -> None:
+        # 同じ音声を参照する行は1回だけ認識する
+        rows_by_key: Dict[str, List[BackfillRow]] = {}
+        for row in rows:
+            rows_by_key.setdefault(row.audio_file_path, []).append(row)
+
+        async for key, result in self.whisper_service.transcribe_batch_async(
+            list(rows_by_key), language=self.language
+        ):
+            for row in rows_by_key[key]:
+                checkpoint.processed += 1
+                if isinstance(result, Exception):
+                    logger.warning(
+                        "再処理失敗: id=%s, key=%s (%s)", row.id, key, result
+                    )
+                    checkpoint.record_failure(row.id)
+                    continue
+                text = (result.get("text") or "").strip()
+                if text == (row.voice_note or "").strip() or self.dry_run:
+                    continue
+                try:
+                    await self.throttle.wait()
+                    await self.update_row(row, text)
+                    if self.write_text is not None and row.text_file_path:
+                        await self.write_text(row.text_file_path, text)
+                except Exception as e:  # 行単位で失敗させ、他の行は続行
+                    logger.warning("再処理結果の保存失敗: id=%s (%s)", row.id, e)
+                    checkpoint.record_failure(row.id)
+                    continue
+                checkpoint.updated += 1
@@ -0,0 +1,310 @@
+"""
+音声認識結果キャッシュ
+
+同じ音声に対する再リクエスト（リトライやページ再読み込み）で
+S3ダウンロード・デコード・Whisper推論をやり直さないよう、
+認識結果を内容アドレス（S3 ETag×モデル×言語×プロンプト）でキャッシュする。
+
+- 1段目: プロセス内LRU（件数・バイト数で上限管理）
+- 2段目: PostgreSQLのtranscription_cacheテーブル（件数で上限管理）
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# キャッシュ設定（未設定時はデフォルト値を使用）
+CACHE_ENABLED = os.getenv("TRANSCRIBE_CACHE_ENABLED", "true").lower() == "true"
+PERSISTENT_CACHE_ENABLED = (
+    os.getenv("TRANSCRIBE_CACHE_PERSISTENT", "true").lower() == "true"
+)
+DEFAULT_MEMORY_MAX_ENTRIES = int(os.getenv("TRANSCRIBE_CACHE_MAX_ENTRIES", "512"))
+DEFAULT_MEMORY_MAX_BYTES = int(
+    os.getenv("TRANSCRIBE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))
+)
+DEFAULT_PERSISTENT_MAX_ENTRIES = int(
+    os.getenv("TRANSCRIBE_CACHE_PERSISTENT_MAX_ENTRIES", "10000")
+)
+# 永続キャッシュの溢れ削除は毎回ではなく一定件数の書き込みごとに行う
+_PERSISTENT_EVICT_EVERY = 50
+
+
+def make_cache_key(
+    etag: str, model_name: str, language: str, initial_prompt: Optional[str]
+) -> str:
+    """
+    キャッシュキーを作成する
+
+    音声の内容（S3 ETag）、モデル名、言語、プロンプトのダイジェストを
+    組み合わせたSHA-256を返す。どれか1つでも変われば別のキーになる。
+
+    Args:
+        etag: S3オブジェクトのETag（音声内容のハッシュ）
+        model_name: Whisperモデル名
+        language: 認識言語
+        initial_prompt: 実際に使用する初期プロンプト
+
+    Returns:
+        str: 64文字の16進キャッシュキー
+    """
+    prompt_digest = hashlib.sha256((initial_prompt or "").encode("utf-8")).hexdigest()
+    # ETagは引用符付きで返ってくるため外して正規化する
+    content_hash = etag.strip('"')
+    seed = f"{content_hash}:{model_name}:{language}:{prompt_digest}"
+    return hashlib.sha256(seed.encode("utf-8")).hexdigest()
+
+
+def _to_jsonable(result: Dict[str, Any]) -> Dict[str, Any]:
+    """numpy型などを含む結果をJSON化できる形に変換"""
+    return json.loads(json.dumps(result, ensure_ascii=False, default=float))
+
+
+@dataclass
+class CacheStats:
+    """キャッシュのヒット・ミス統計"""
+
+    memory_hits: int = 0
+    persistent_hits: int = 0
+    misses: int = 0
+    memory_evictions: int = 0
+    errors: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.memory_hits + self.persistent_hits + self.misses
+        return (self.memory_hits + self.persistent_hits) / total if total else 0.0
+
+
+class MemoryLRUCache:
+    """
+    プロセス内LRUキャッシュ
+
+    件数とおおよそのバイト数（JSONサイズ）の両方で上限を管理し、
+    超えた場合は最も古く使われたものから削除する。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MEMORY_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MEMORY_MAX_BYTES,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._total_bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return dict(item[0])
+
+    def put(self, key: str, value: Dict[str, Any], size_bytes: int) -> None:
+        if size_bytes > self.max_bytes:
+            # 1件で上限を超えるものはキャッシュしない
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._total_bytes -= old[1]
+        self._items[key] = (value, size_bytes)
+        self._total_bytes += size_bytes
+        while self._items and (
+            len(self._items) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, (_, evicted_size) = self._items.popitem(last=False)
+            self._total_bytes -= evicted_size
+            self.evictions += 1
+
+
+class PersistentTranscriptionStore:
+    """
+    PostgreSQLの永続キャッシュ（transcription_cacheテーブル）
+
+    プロセス再起動後や別プロセスでもキャッシュを共有するための2段目。
+    last_accessed_atが古いものから件数上限を超えた分を削除する。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_PERSISTENT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._writes_since_evict = 0
+
+    async def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        from sqlalchemy import update, func
+        from app.config.database import async_session_local
+        from app.models import TranscriptionCacheEntry
+
+        async with async_session_local() as session:
+            entry = await session.get(TranscriptionCacheEntry, cache_key)
+            if entry is None:
+                return None
+            result = dict(entry.result)
+            await session.execute(
+                update(TranscriptionCacheEntry)
+                .where(TranscriptionCacheEntry.cache_key == cache_key)
+                .values(last_accessed_at=func.now())
+            )
+            await session.commit()
+            return result
+
+    async def put(
+        self,
+        cache_key: str,
+        result: Dict[str, Any],
+        *,
+        s3_key: str,
+        etag: str,
+        model_name: str,
+        language: str,
+        size_bytes: int,
+    ) -> None:
+        from sqlalchemy import func
+        from sqlalchemy.dialects.postgresql import insert
+        from app.config.database import async_session_local
+        from app.models import TranscriptionCacheEntry
+
+        stmt = insert(TranscriptionCacheEntry).values(
+            cache_key=cache_key,
+            s3_key=s3_key,
+            etag=etag,
+            model_name=model_name,
+            language=language,
+            result=result,
+            size_bytes=size_bytes,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TranscriptionCacheEntry.cache_key],
+            set_={"result": stmt.excluded.result, "last_accessed_at": func.now()},
+        )
+        async with async_session_local() as session:
+            await session.execute(stmt)
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= _PERSISTENT_EVICT_EVERY:
+                self._writes_since_evict = 0
+                await self._evict_overflow(session)
+            await session.commit()
+
+    async def _evict_overflow(self, session) -> None:
+        """件数上限を超えた古いエントリを削除"""
+        from sqlalchemy import text
+
+        res = await session.execute(
+            text(
+                """
+                DELETE FROM transcription_cache
+                WHERE cache_key IN (
+                    SELECT cache_key FROM transcription_cache
+                    ORDER BY last_accessed_at DESC
+                    OFFSET :max_entries
+                )
+                """
+            ),
+            {"max_entries": self.max_entries},
+        )
+        if res.rowcount:
+            logger.info("永続キャッシュの古いエントリを削除: %s件", res.rowcount)
+
+
+class TranscriptionCache:
+    """
+    音声認識結果の2段キャッシュ
+
+    プロセス内LRU → 永続テーブルの順に参照し、永続側でヒットした場合は
+    プロセス内LRUにも載せる。キャッシュの失敗で音声認識自体を
+    失敗させないよう、永続側のエラーはログのみで握りつぶす。
+    """
+
+    def __init__(
+        self,
+        *,
+        memory: Optional[MemoryLRUCache] = None,
+        persistent: Optional[PersistentTranscriptionStore] = None,
+        use_persistent: bool = PERSISTENT_CACHE_ENABLED,
+    ) -> None:
+        self.memory = memory or MemoryLRUCache()
+        self.persistent = (
+            (persistent or PersistentTranscriptionStore()) if use_persistent else None
+        )
+        self.stats = CacheStats()
+
+    async def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """キャッシュから結果を取得（なければNone）"""
+        result = self.memory.get(cache_key)
+        if result is not None:
+            self.stats.memory_hits += 1
+            return result
+
+        if self.persistent is not None:
+            try:
+                result = await self.persistent.get(cache_key)
+            except Exception as e:  # DB障害時もキャッシュミス扱いで継続
+                self.stats.errors += 1
+                logger.warning("永続キャッシュ参照エラー: %s", e)
+                result = None
+            if result is not None:
+                self.stats.persistent_hits += 1
+                self.memory.put(cache_key, result, _estimate_size(result))
+                return dict(result)
+
+        self.stats.misses += 1
+        return None
+
+    async def put(
+        self,
+        cache_key: str,
+        result: Dict[str, Any],
+        *,
+        s3_key: str,
+        etag: str,
+        model_name: str,
+        language: str,
+    ) -> None:
+        """結果をキャッシュに保存"""
+        value = _to_jsonable(result)
+        size_bytes = _estimate_size(value)
+        self.memory.put(cache_key, value, size_bytes)
+
+        if self.persistent is not None:
+            try:
+                await self.persistent.put(
+                    cache_key,
+                    value,
+                    s3_key=s3_key,
+                    etag=etag,
+                    model_name=model_name,
+                    language=language,
+                    size_bytes=size_bytes,
+                )
+            except Exception as e:  # DB障害時もメモリ側だけで継続
+                self.stats.errors += 1
+                logger.warning("永続キャッシュ保存エラー: %s", e)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """メトリクス用の統計スナップショット"""
+        self.stats.memory_evictions = self.memory.evictions
+        return {
+            **asdict(self.stats),
+            "hit_ratio": round(self.stats.hit_ratio, 4),
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.total_bytes,
+            "persistent_enabled": self.persistent is not None,
+        }
+
+
+def _estimate_size(result: Dict[str, Any]) -> int:
+    """結果のおおよそのサイズ（JSONのバイト数）"""
+    return len(json.dumps(result, ensure_ascii=False, default=float).encode("utf-8"))
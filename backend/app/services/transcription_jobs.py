@@ -0,0 +1,394 @@
+"""
+音声認識ジョブ管理サービス
+
+音声認識をHTTPリクエストから切り離して非同期ジョブとして実行する。
+投入時はジョブIDだけを即座に返し、実処理はプロセス内のキューから
+ランナーが取り出してWhisperServiceで実行する。キューは FairScheduler で、
+優先クラス（有料プランかどうか）とユーザーごとに公平な順番で取り出す。
+クライアントはジョブIDで状態をポーリングするか、結果を待機して取得する。
+
+アップロード完了時には投機実行（speculative）としてジョブを投入し、
+後から届く /voice/transcribe は同じ音声のジョブの結果を使う（join）。
+ジョブは (S3キー, 言語, ユーザー, 入力上限) ごとに1つにまとめ、同じ音声を
+二重に認識しない。ユーザーをまたいでジョブ（結果）を共有せず、プランごとの
+入力上限で切り詰めた結果を、上限の違う呼び出し元に返すこともしない。
+
+NOTE: キューはプロセス内のスタンドイン実装（再起動でジョブは失われる）。
+永続化が必要になったらPostgreSQLのジョブテーブルに置き換える。
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager, Callable, Dict, Optional, Tuple
+
+from app.services.fair_scheduler import FairScheduler, PriorityClass
+from app.services.transcription_limits import TranscriptionLimits, limits_for_priority
+
+logger = logging.getLogger(__name__)
+
+# ジョブキュー設定（未設定時はデフォルト値を使用）
+DEFAULT_MAX_QUEUED_JOBS = int(os.getenv("TRANSCRIBE_JOB_MAX_QUEUED", "100"))
+DEFAULT_JOB_TTL_SECONDS = int(os.getenv("TRANSCRIBE_JOB_TTL_SECONDS", "3600"))
+# アップロード完了時の投機実行
+SPECULATIVE_ENABLED = (
+    os.getenv("TRANSCRIBE_SPECULATIVE_ENABLED", "true").lower() == "true"
+)
+# キュー待ちがこの件数以上なら投機実行は受け付けない（明示的なジョブを優先）
+DEFAULT_MAX_SPECULATIVE_QUEUED = int(
+    os.getenv("TRANSCRIBE_SPECULATIVE_MAX_QUEUED", "50")
+)
+
+
+class TranscriptionJobStatus(str, Enum):
+    """ジョブの状態"""
+
+    QUEUED = "queued"  # キュー待ち
+    RUNNING = "running"  # 実行中
+    SUCCEEDED = "succeeded"  # 完了
+    FAILED = "failed"  # 失敗
+
+
+@dataclass
+class TranscriptionJob:
+    """音声認識ジョブ"""
+
+    job_id: str
+    audio_file_path: str
+    language: str
+    user_id: Optional[str] = None
+    priority: PriorityClass = PriorityClass.STANDARD
+    speculative: bool = False  # アップロード完了時の投機実行かどうか
+    status: TranscriptionJobStatus = TranscriptionJobStatus.QUEUED
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    done_event: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        """完了または失敗で終了しているかどうか"""
+        return self.status in (
+            TranscriptionJobStatus.SUCCEEDED,
+            TranscriptionJobStatus.FAILED,
+        )
+
+
+JobKey = Tuple[str, str, Optional[str], TranscriptionLimits]
+
+
+def _job_key(
+    audio_file_path: str,
+    language: str,
+    user_id: Optional[str],
+    priority: PriorityClass,
+) -> JobKey:
+    """同じ結果になるジョブを1つにまとめるキー（結果は優先クラスの入力上限で変わる）"""
+    return (audio_file_path, language, user_id, limits_for_priority(priority))
+
+
+class TranscriptionQueueFullError(Exception):
+    """ジョブキュー満杯エラー"""
+
+    def __init__(self, message: str, error_code: str = "TRANSCRIBE_QUEUE_FULL"):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+
+class TranscriptionJobManager:
+    """
+    音声認識ジョブ管理クラス
+
+    ジョブの投入・状態取得・結果待機を提供する。
+    ランナー数はWhisperServiceの同時処理数に合わせ、
+    キューに積まれたジョブを順番にワーカーへ流す。
+    """
+
+    def __init__(
+        self,
+        whisper_service,
+        *,
+        num_runners: Optional[int] = None,
+        max_queued: int = DEFAULT_MAX_QUEUED_JOBS,
+        max_speculative_queued: int = DEFAULT_MAX_SPECULATIVE_QUEUED,
+        ttl_seconds: int = DEFAULT_JOB_TTL_SECONDS,
+    ) -> None:
+        self.whisper_service = whisper_service
+        self.num_runners = num_runners or whisper_service.concurrency
+        self.max_queued = max_queued
+        self.max_speculative_queued = max_speculative_queued
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, TranscriptionJob] = {}
+        # (S3キー, 言語, ユーザー, 入力上限) -> 最新のジョブ（同じ音声のジョブを1つにまとめる）
+        self._by_key: Dict[JobKey, TranscriptionJob] = {}
+        self._speculative_submitted = 0
+        self._speculative_joined = 0
+        self._queue: Optional[FairScheduler[TranscriptionJob]] = None
+        self._runners: list[asyncio.Task] = []
+        self._closed = False
+
+    def _ensure_started(self) -> None:
+        """初回投入時にキューとランナーを起動（実行中のイベントループが必要）"""
+        if self._queue is not None:
+            return
+        self._queue = FairScheduler(maxsize=self.max_queued)
+        self._runners = [
+            asyncio.create_task(self._run(i)) for i in range(self.num_runners)
+        ]
+        logger.info("音声認識ジョブランナー起動: %s本", self.num_runners)
+
+    async def submit(
+        self,
+        audio_file_path: str,
+        *,
+        language: str = "ja",
+        user_id: Optional[str] = None,
+        priority: PriorityClass = PriorityClass.STANDARD,
+        speculative: bool = False,
+    ) -> TranscriptionJob:
+        """
+        ジョブを投入する
+
+        同じユーザー・同じ入力上限で同じ音声（S3キーと言語）のジョブが
+        失敗せずに残っていれば、新しく投入せずにそのジョブを返す。
+
+        Args:
+            audio_file_path: 音声ファイルのS3キー
+            language: 認識言語
+            user_id: 投入したユーザーID（任意、公平に順番を回す単位）
+            priority: 優先クラス
+            speculative: アップロード完了時の投機実行かどうか
+
+        Returns:
+            TranscriptionJob: 投入したジョブ（状態はqueued）、または既存のジョブ
+
+        Raises:
+            TranscriptionQueueFullError: キューが満杯の場合（投機実行は
+                max_speculative_queued件以上キュー待ちがある場合も）、
+                停止済みの場合
+        """
+        if self._closed:
+            raise TranscriptionQueueFullError("音声認識ジョブ管理は停止しています")
+        self._ensure_started()
+        self._prune_expired()
+
+        existing = self.find(
+            audio_file_path, language, user_id=user_id, priority=priority
+        )
+        if existing is not None:
+            return existing
+        if speculative and self._queue.qsize() >= self.max_speculative_queued:
+            raise TranscriptionQueueFullError(
+                "混雑しているため投機実行を見送りました"
+                f"（キュー待ち: {self._queue.qsize()}件）"
+            )
+
+        job = TranscriptionJob(
+            job_id=uuid.uuid4().hex,
+            audio_file_path=audio_file_path,
+            language=language,
+            user_id=user_id,
+            priority=priority,
+            speculative=speculative,
+        )
+        try:
+            self._queue.put_nowait(job, user_key=user_id, priority=priority)
+        except asyncio.QueueFull as e:
+            raise TranscriptionQueueFullError(
+                f"音声認識ジョブキューが満杯です（上限: {self.max_queued}件）"
+            ) from e
+
+        self._jobs[job.job_id] = job
+        self._by_key[_job_key(audio_file_path, language, user_id, priority)] = job
+        if speculative:
+            self._speculative_submitted += 1
+        logger.info(
+            "音声認識ジョブ投入: job_id=%s, key=%s, priority=%s, speculative=%s, "
+            "queued=%s",
+            job.job_id,
+            audio_file_path,
+            priority.value,
+            speculative,
+            self._queue.qsize(),
+        )
+        return job
+
+    def get(self, job_id: str) -> Optional[TranscriptionJob]:
+        """ジョブIDからジョブを取得（存在しなければNone）"""
+        return self._jobs.get(job_id)
+
+    def find(
+        self,
+        audio_file_path: str,
+        language: str,
+        *,
+        user_id: Optional[str] = None,
+        priority: PriorityClass = PriorityClass.STANDARD,
+    ) -> Optional[TranscriptionJob]:
+        """
+        同じ音声の失敗していないジョブを取得（なければNone）
+
+        同じユーザーで、優先クラスから決まる入力上限も同じジョブだけを返す。
+        """
+        job = self._by_key.get(_job_key(audio_file_path, language, user_id, priority))
+        if job is None or job.status is TranscriptionJobStatus.FAILED:
+            return None
+        return job
+
+    async def join(
+        self,
+        audio_file_path: str,
+        language: str,
+        *,
+        user_id: Optional[str] = None,
+        priority: PriorityClass = PriorityClass.STANDARD,
+        slot: Optional[Callable[[], AsyncContextManager]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        同じ音声のジョブ（投機実行を含む）があれば、その結果を返す
+
+        - 実行中・完了済み: 終了を待って結果を返す
+        - キュー待ち: キューから取り出し、呼び出し元のタスクでそのまま実行する
+          （キューの後ろで待たせない。slotを指定した場合は、その枠を得てから
+          取り出す。枠を得られずに例外になった場合、ジョブはキューに残り
+          ランナーが実行する）
+
+        Returns:
+            Optional[Dict[str, Any]]: 音声認識結果。ジョブがない・失敗した場合、
+                停止済みの場合はNone（呼び出し元で通常どおり処理する）
+        """
+        if self._closed:
+            return None
+        job = self.find(audio_file_path, language, user_id=user_id, priority=priority)
+        if job is None:
+            return None
+        if job.status is TranscriptionJobStatus.QUEUED:
+            async with slot() if slot is not None else nullcontext():
+                # 枠を待つ間にランナーが取り出していれば（停止で失敗にされていれば）、
+                # その終了を待つ
+                if self._queue is not None and self._queue.discard(job):
+                    await self._execute(job, runner="inline")
+        await job.done_event.wait()
+        if job.status is not TranscriptionJobStatus.SUCCEEDED:
+            return None
+        if job.speculative:
+            self._speculative_joined += 1
+        return job.result
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[TranscriptionJob]:
+        """
+        ジョブの終了を最大timeout秒待つ
+
+        Returns:
+            Optional[TranscriptionJob]: ジョブ（存在しなければNone）。
+                タイムアウトした場合は未完了の状態で返す。
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.is_finished or timeout <= 0:
+            return job
+        try:
+            await asyncio.wait_for(job.done_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    @property
+    def queued_count(self) -> int:
+        """キュー待ちのジョブ数"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """キュー待ち件数と優先クラスごとの待ち時間の統計"""
+        speculative = {
+            "submitted": self._speculative_submitted,
+            "joined": self._speculative_joined,
+        }
+        if self._queue is None:
+            return {"queued": 0, "runners": 0, "speculative": speculative}
+        return {
+            "queued": self._queue.qsize(),
+            "runners": len(self._runners),
+            "queue_wait_by_class": self._queue.snapshot(),
+            "speculative": speculative,
+        }
+
+    async def _run(self, runner_no: int) -> None:
+        """キューからジョブを取り出して順に実行するランナー"""
+        while True:
+            job: TranscriptionJob = await self._queue.get()
+            await self._execute(job, runner=runner_no)
+
+    async def _execute(self, job: TranscriptionJob, runner: Any) -> None:
+        """ジョブを1件実行し、結果・状態を記録する（失敗は例外にしない）"""
+        job.status = TranscriptionJobStatus.RUNNING
+        job.started_at = datetime.now(timezone.utc)
+        t0 = time.monotonic()
+        try:
+            job.result = await self.whisper_service.transcribe_async(
+                audio_file_path=job.audio_file_path,
+                language=job.language,
+                limits=limits_for_priority(job.priority),
+            )
+            job.status = TranscriptionJobStatus.SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = TranscriptionJobStatus.FAILED
+            job.error = "cancelled"
+            raise
+        except Exception as e:  # ジョブ単位で失敗させ、ランナーは継続
+            logger.exception("音声認識ジョブ失敗: job_id=%s", job.job_id)
+            job.status = TranscriptionJobStatus.FAILED
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            job.done_event.set()
+        logger.info(
+            "音声認識ジョブ終了: job_id=%s, status=%s, runner=%s, %.2fs",
+            job.job_id,
+            job.status.value,
+            runner,
+            time.monotonic() - t0,
+        )
+
+    def _prune_expired(self) -> None:
+        """TTLを過ぎた終了済みジョブを削除"""
+        now = datetime.now(timezone.utc)
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.is_finished
+            and (now - job.finished_at).total_seconds() > self.ttl_seconds
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            key = _job_key(job.audio_file_path, job.language, job.user_id, job.priority)
+            if self._by_key.get(key) is job:
+                del self._by_key[key]
+
+    async def shutdown(self) -> None:
+        """
+        ランナーを停止する
+
+        キュー待ちのジョブは失敗として終了させ、結果を待っている呼び出し元を
+        起こす（joinは通常どおりの処理に戻る）。停止後は投入を受け付けない。
+        """
+        self._closed = True
+        for task in self._runners:
+            task.cancel()
+        await asyncio.gather(*self._runners, return_exceptions=True)
+        self._runners = []
+        self._queue = None
+        for job in self._jobs.values():
+            if job.status is TranscriptionJobStatus.QUEUED:
+                job.status = TranscriptionJobStatus.FAILED
+                job.error = "shutdown"
+                job.finished_at = datetime.now(timezone.utc)
+                job.done_event.set()
@@ -0,0 +1,138 @@
+"""
+音声認識の入力上限（長さ・サイズ）
+
+10分の録音のような長い入力が1件でワーカーを占有しないよう、
+デコードの前に音声の長さとサイズを確認する。上限はプラン
+（優先クラス）ごとに決め、超えた場合の扱いは次のどちらか。
+
+- truncate: 上限の長さまでデコードして認識する（既定）
+- reject: 処理を始める前に断る（AudioLimitExceededError）
+
+長さはコンテナのヘッダ（app/utils/audio_header.py）から求める。
+ヘッダから分からない場合は、FFmpegのデコード長を上限で打ち切り、
+デコード結果の長さで判定する。
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from app.services.fair_scheduler import PriorityClass
+from app.utils.audio_header import AudioHeader
+
+# 入力上限の設定（未設定時はデフォルト値を使用、0で無制限）
+MAX_SECONDS_STANDARD = float(os.getenv("TRANSCRIBE_MAX_SECONDS_STANDARD", "180"))
+MAX_SECONDS_PAID = float(os.getenv("TRANSCRIBE_MAX_SECONDS_PAID", "600"))
+MAX_MB_STANDARD = float(os.getenv("TRANSCRIBE_MAX_MB_STANDARD", "20"))
+MAX_MB_PAID = float(os.getenv("TRANSCRIBE_MAX_MB_PAID", "60"))
+# 上限を超えた場合の扱い（truncate / reject）
+OVER_LIMIT_POLICY = os.getenv("TRANSCRIBE_OVER_LIMIT", "truncate").lower()
+
+# 拒否モードで、ヘッダから長さが分からない場合に上限を超えたと判定できるよう
+# 上限より少し長めにデコードする（秒）
+_REJECT_DECODE_MARGIN_SECONDS = 1.0
+
+
+class AudioLimitExceededError(Exception):
+    """音声が長さ・サイズの上限を超えた場合の例外"""
+
+    def __init__(self, message: str, error_code: str = "AUDIO_LIMIT_EXCEEDED"):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+
+@dataclass(frozen=True)
+class TranscriptionLimits:
+    """1件の音声認識に許す入力の上限"""
+
+    max_seconds: Optional[float] = None  # Noneなら無制限
+    max_bytes: Optional[int] = None  # Noneなら無制限
+    truncate: bool = True  # Trueなら長さ超過を切り詰め、Falseなら拒否
+
+    @property
+    def decode_seconds(self) -> Optional[float]:
+        """FFmpegでデコードする最大の長さ（秒）"""
+        if self.max_seconds is None:
+            return None
+        if self.truncate:
+            return self.max_seconds
+        return self.max_seconds + _REJECT_DECODE_MARGIN_SECONDS
+
+    def check_size(self, size: int) -> None:
+        """
+        音声ファイルのサイズを確認する（ダウンロード前）
+
+        Raises:
+            AudioLimitExceededError: サイズが上限を超えた場合
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            raise AudioLimitExceededError(
+                "音声ファイルが大きすぎます: %.1fMB（上限 %.1fMB）"
+                % (size / 1e6, self.max_bytes / 1e6),
+                error_code="AUDIO_TOO_LARGE",
+            )
+
+    def check_header(self, header: AudioHeader) -> bool:
+        """
+        ヘッダの長さを確認する（デコード前）
+
+        Returns:
+            bool: 上限を超えていて切り詰めが必要かどうか
+
+        Raises:
+            AudioLimitExceededError: 拒否モードで長さが上限を超えた場合
+        """
+        seconds = header.duration_seconds
+        if self.max_seconds is None or seconds is None or seconds <= self.max_seconds:
+            return False
+        if not self.truncate:
+            raise self._too_long(seconds)
+        return True
+
+    def check_decoded(self, seconds: float) -> bool:
+        """
+        デコードした音声の長さを確認する（ヘッダから長さが分からなかった場合）
+
+        Returns:
+            bool: 上限で切り詰められたかどうか
+
+        Raises:
+            AudioLimitExceededError: 拒否モードで長さが上限を超えた場合
+        """
+        if self.max_seconds is None or seconds < self.max_seconds:
+            return False
+        if not self.truncate:
+            if seconds > self.max_seconds:
+                raise self._too_long(seconds)
+            return False
+        return True
+
+    def _too_long(self, seconds: float) -> AudioLimitExceededError:
+        return AudioLimitExceededError(
+            "音声が長すぎます: %.0f秒（上限 %.0f秒）" % (seconds, self.max_seconds),
+            error_code="AUDIO_TOO_LONG",
+        )
+
+
+def _positive_or_none(value: float) -> Optional[float]:
+    return value if value > 0 else None
+
+
+def limits_for_priority(priority: PriorityClass) -> TranscriptionLimits:
+    """
+    優先クラス（プラン）ごとの入力上限
+
+    優先クラスは認証前のuser_idから決まるため（_transcribe_priority参照）、
+    有料の上限は他人のIDで受けられる。ワーカー保護の上限としては
+    standardの値を基準に考えること。
+    """
+    paid = priority is PriorityClass.PAID
+    max_mb = _positive_or_none(MAX_MB_PAID if paid else MAX_MB_STANDARD)
+    return TranscriptionLimits(
+        max_seconds=_positive_or_none(
+            MAX_SECONDS_PAID if paid else MAX_SECONDS_STANDARD
+        ),
+        max_bytes=int(max_mb * 1e6) if max_mb is not None else None,
+        truncate=OVER_LIMIT_POLICY != "reject",
+    )
@@ -4,23 +4,73 @@ Whisper音声認識サービス
 OpenAIのWhisperモデルを使用して音声を文字起こしするサービス。
 モデルキャッシュ機能により、初回読み込み後の処理を高速化する。
 子ども向け語彙の初期プロンプトを自動適用し、認識精度を向上させる。
+推論はワーカープロセスごとのモデルレプリカで並列実行する。
+推論エンジンはWHISPER_BACKENDで切り替えられる（whisper_backends.py）。
 """
 
 import os
+import asyncio
+import contextlib
 import logging
 import subprocess
-import tempfile
-import asyncio
-import concurrent.futures
-from typing import Dict, Any, Optional, List
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from typing import (
+    Dict,
+    Any,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    Optional,
+    List,
+    Tuple,
+    Union,
+)
 
-import whisper
+import numpy as np
 import boto3
 from app.utils.child_vocabulary import (
-    generate_whisper_prompt,
+    DEFAULT_PROMPT_LEVEL,
+    compile_whisper_prompt,
 )
 from app.utils.constants import SUPPORTED_LANGUAGES
-from app.utils.audio import normalize_to_wav16k_mono
+from app.utils.vad import (
+    VAD_ENABLED,
+    detect_speech_regions,
+    split_at_silences,
+    to_original_time,
+    trim_to_speech,
+)
+from app.utils.audio import (
+    WHISPER_SAMPLE_RATE,
+    decode_audio_bytes,
+    decode_audio_stream,
+)
+from app.utils.audio_header import probe_audio_header
+from app.services.admission import (
+    ADMISSION_ENABLED,
+    AdmissionController,
+    default_max_concurrency,
+)
+from app.services.s3_async import AsyncS3Downloader, STREAM_DECODE_ENABLED
+from app.services.transcription_limits import TranscriptionLimits
+from app.services.whisper_backends import DecodeThresholds, backend_identity
+from app.services.whisper_registry import ALLOWED_MODELS, resolve_model_name
+from app.services.whisper_pool import (
+    WhisperWorkerPool,
+    AUTOTUNE_ENABLED,
+    DEFAULT_NUM_WORKERS,
+    autotune_num_workers,
+    load_process_model,
+    is_process_model_loaded,
+    release_process_model,
+)
+from app.services.transcription_cache import (
+    CACHE_ENABLED,
+    TranscriptionCache,
+    make_cache_key,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +81,28 @@ DEFAULT_TEMPERATURE = (
 )
 DEFAULT_FP16 = False  # 高精度のための浮動小数点設定（False=32bit精度、True=16bit高速）
 DEFAULT_DURATION = 0.0  # 音声長さが不明な場合の安全な初期値
+# 発話区間の合計がこの割合未満のときだけ無音を詰める（ほぼ発話なら詰めずにそのまま渡す）
+VAD_MIN_TRIM_RATIO = 0.9
+# この長さ以上の音声は無音で分割して並列に認識する（秒）
+CHUNK_MIN_DURATION_SECONDS = float(os.getenv("WHISPER_CHUNK_MIN_SECONDS", "60"))
+# 分割するチャンクの最小の目標長（秒）。短すぎると文脈が切れて精度が落ちる
+CHUNK_TARGET_SECONDS = float(os.getenv("WHISPER_CHUNK_TARGET_SECONDS", "30"))
+# FFmpegの前処理フィルタ（無音除去・音量正規化）をかけるか（未設定時は有効）
+AUDIO_PREPROCESS_ENABLED = (
+    os.getenv("WHISPER_AUDIO_PREPROCESS", "true").lower() == "true"
+)
+# 日本語で初期プロンプト未指定のとき、子ども向け語彙プロンプトを自動適用するか
+AUTO_PROMPT_ENABLED = os.getenv("WHISPER_AUTO_PROMPT", "true").lower() == "true"
+# 一括認識で1回の推論にまとめる音声の最大本数
+BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+# 一括認識でまとめる音声の最大長（秒）。Whisperの入力窓（30秒）を超える音声は1本ずつ
+BATCH_MAX_CLIP_SECONDS = min(
+    float(os.getenv("WHISPER_BATCH_MAX_CLIP_SECONDS", "30")), 30.0
+)
+# モデル切り替え時に、旧モデルで処理中のリクエストの完了を待つ上限（秒）
+SWAP_DRAIN_TIMEOUT_SECONDS = float(
+    os.getenv("WHISPER_SWAP_DRAIN_TIMEOUT_SECONDS", "600")
+)
 
 # 環境変数から取得する設定値（未設定時はデフォルト値を使用）
 _DEFAULTS = {
@@ -44,17 +116,445 @@ _DEFAULTS = {
     "no_speech_threshold": float(os.getenv("WHISPER_NO_SPEECH_TH", "0.6")),
     "compression_ratio_threshold": float(os.getenv("WHISPER_COMP_RATIO_TH", "3.5")),
     "logprob_threshold": float(os.getenv("WHISPER_LOGPROB_TH", "-1.2")),
+    # 推論ワーカープロセス数（0の場合はモデル共有のスレッドプール）
+    "num_workers": DEFAULT_NUM_WORKERS,
 }
 
+# 認識結果を採用するしきい値（1本ずつの認識と一括認識で共通）
+DEFAULT_THRESHOLDS = DecodeThresholds(
+    compression_ratio=_DEFAULTS["compression_ratio_threshold"],
+    logprob=_DEFAULTS["logprob_threshold"],
+    no_speech=_DEFAULTS["no_speech_threshold"],
+)
+
 # サポート言語一覧（constants.pyから一元管理）
 _SUPPORTED_LANGUAGES: List[str] = list(SUPPORTED_LANGUAGES)
 
-# DEFAULT_INITIAL_PROMPT_JAの部分を更新
-DEFAULT_INITIAL_PROMPT_JA = os.getenv(
-    "WHISPER_INITIAL_PROMPT_JA", generate_whisper_prompt()  # 動的に生成
+# 日本語の初期プロンプト（未設定時はトークン予算内にコンパイルしたものを使用）
+DEFAULT_INITIAL_PROMPT_JA = (
+    os.getenv("WHISPER_INITIAL_PROMPT_JA")
+    or compile_whisper_prompt(DEFAULT_PROMPT_LEVEL).text
 )
 
 
+def _resolve_initial_prompt(
+    language: str, initial_prompt: Optional[str]
+) -> Optional[str]:
+    """
+    実際に使用する初期プロンプトを決める
+
+    日本語音声の認識精度向上のため、未指定なら子ども向け語彙の初期プロンプトを
+    自動適用する。キャッシュキーにも同じ値を使うため1か所にまとめている。
+    プロンプトは起動時に1度だけコンパイルしたものを使い回す。
+    """
+    if language == "ja" and not initial_prompt and AUTO_PROMPT_ENABLED:
+        # 音声ファイルの場合は一般的な子ども向け語彙プロンプトを適用
+        return DEFAULT_INITIAL_PROMPT_JA
+    return initial_prompt
+
+
+def _get_process_model(model_name: str, *, pin: bool = False):
+    """
+    このプロセスのWhisperモデルを取得
+
+    ワーカープロセスでは自分専用のレプリカを、スレッドモードでは
+    プロセス共有のモデルを返す。初回呼び出し時のみ読み込みを行う。
+    既定以外のモデルはレジストリがメモリ予算内でLRU管理する。
+
+    Returns:
+        WhisperBackend: 読み込み済みの推論バックエンド
+
+    Raises:
+        WhisperModelLoadError: モデル読み込みに失敗した場合
+    """
+    if is_process_model_loaded(model_name):
+        logger.debug("キャッシュされたWhisperモデルを使用: 高速！")
+    try:
+        return load_process_model(model_name, pin=pin)
+    except (OSError, IOError, RuntimeError) as e:
+        logger.error("Whisperモデル読み込みエラー: %s", e)
+        raise WhisperModelLoadError(
+            "Whisperモデルの読み込みに失敗しました: %s" % e
+        ) from e
+
+
+def _compute_avg_logprob(result: Dict[str, Any]) -> Optional[float]:
+    """
+    平均ログ確率を計算
+
+    Whisperの認識結果から各セグメントの平均ログ確率を計算する。
+    この値は音声認識の信頼度を示し、値が高いほど認識精度が高い。
+
+    Args:
+        result: Whisperの認識結果辞書
+
+    Returns:
+        Optional[float]: 平均ログ確率、計算できない場合はNone
+    """
+    segs = result.get("segments") or []
+    vals = [
+        s.get("avg_logprob")
+        for s in segs
+        if isinstance(s.get("avg_logprob"), (int, float))
+    ]
+    if not vals:
+        return None
+    return float(sum(vals) / len(vals))
+
+
+def _run_model(model, audio, language: str, initial_prompt: Optional[str]):
+    """
+    Whisperモデルで音声認識を1回実行する
+
+    Args:
+        model: 推論バックエンド（whisper_backends.WhisperBackend）
+        audio: 音声ファイルパス、または16kHzモノラルのfloat32配列
+        language: 認識言語
+        initial_prompt: 初期プロンプト
+
+    Raises:
+        WhisperTranscriptionError: 音声認識に失敗した場合
+    """
+    # 最速設定で実行
+    # temperature=0.0で一貫した結果、fp16=Falseで高精度を確保
+    try:
+        return model.transcribe(
+            audio,
+            language=language,
+            initial_prompt=initial_prompt,
+            temperature=DEFAULT_TEMPERATURE,  # 0.0=最も一貫した結果
+            fp16=DEFAULT_FP16,  # False=32bit精度で高品質
+            thresholds=DEFAULT_THRESHOLDS,  # 一括認識と同じしきい値
+        )
+    except (OSError, IOError, RuntimeError) as e:
+        logger.error("音声認識エラー: %s", e)
+        raise WhisperTranscriptionError("音声認識に失敗しました: %s" % e) from e
+
+
+def _format_result(
+    result: Dict[str, Any],
+    language: str,
+    file_path: Optional[str],
+    duration: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Whisperの認識結果をサービスの返却形式に整える"""
+    avg_lp = _compute_avg_logprob(result)
+    logger.info("avg_logprob=%s", avg_lp)
+
+    # duration が None の場合はセグメント情報から計算
+    # Whisperが音声長さを正確に取得できない場合のフォールバック処理
+    if duration is None:
+        duration = result.get("duration")
+    if duration is None:
+        segs = result.get("segments") or []
+        # 各セグメントの終了時間の最大値を音声長さとして使用
+        duration = max((s.get("end", 0.0) for s in segs), default=DEFAULT_DURATION)
+
+    return {
+        "success": True,
+        "text": result.get("text", "") or "",
+        "language": result.get("language", language),
+        "file_path": file_path,
+        "segments": result.get("segments", []),
+        "duration": duration,
+        "avg_logprob": avg_lp,
+    }
+
+
+def _transcribe_array_in_worker(
+    model_name: str,
+    audio: np.ndarray,
+    initial_prompt: Optional[str] = None,
+    language: str = _DEFAULTS["language"],
+) -> Dict[str, Any]:
+    """
+    ワーカー内で実行する音声認識処理（デコード済み音声配列）
+
+    16kHzモノラルのfloat32配列をそのままモデルに渡す。
+    ストリーミング認識など、音声をメモリ上で扱う経路で使用する。
+    VADで長い無音を除去してからデコードし、発話がない音声は
+    モデルを通さずに空の結果を返す。
+
+    Args:
+        model_name: 使用するモデル名
+        audio: 16kHzモノラルのfloat32音声配列
+        initial_prompt: 初期プロンプト（未指定時は自動生成）
+        language: 認識言語（デフォルト: 日本語）
+
+    Returns:
+        Dict[str, Any]: 音声認識結果（file_pathはNone）
+
+    Raises:
+        WhisperTranscriptionError: 音声認識に失敗した場合
+    """
+    if language not in _SUPPORTED_LANGUAGES:
+        raise WhisperLanguageError(
+            f"サポートされていない言語です: {language}. サポート: {_SUPPORTED_LANGUAGES}"
+        )
+
+    duration = len(audio) / WHISPER_SAMPLE_RATE
+    timeline = None
+    if VAD_ENABLED:
+        # 長い無音を取り除いてからデコードする（発話がなければモデルを通さない）
+        regions = detect_speech_regions(audio)
+        if not regions:
+            logger.info("発話が検出されなかったため音声認識をスキップ: %.1fs", duration)
+            return _format_result(
+                {"text": "", "segments": []}, language, None, duration
+            )
+        speech_samples = sum(e - s for s, e in regions)
+        if speech_samples < len(audio) * VAD_MIN_TRIM_RATIO:
+            audio, timeline = trim_to_speech(audio, regions)
+            logger.debug(
+                "無音を除去: %.1fs -> %.1fs", duration, len(audio) / WHISPER_SAMPLE_RATE
+            )
+
+    model_to_use = _get_process_model(model_name)
+    initial_prompt = _resolve_initial_prompt(language, initial_prompt)
+    result = _run_model(model_to_use, audio, language, initial_prompt)
+    if timeline:
+        # セグメントの時刻を無音除去前の音声の時刻に戻す
+        result["segments"] = [
+            {
+                **seg,
+                "start": to_original_time(seg["start"], timeline),
+                "end": to_original_time(seg["end"], timeline),
+            }
+            for seg in result.get("segments", [])
+        ]
+    return _format_result(result, language, None, duration=duration)
+
+
+def _transcribe_batch_in_worker(
+    model_name: str,
+    audios: List[np.ndarray],
+    initial_prompt: Optional[str] = None,
+    language: str = _DEFAULTS["language"],
+) -> List[Dict[str, Any]]:
+    """
+    ワーカー内で実行する一括音声認識処理（30秒以下の音声をまとめて推論）
+
+    発話のない音声はVADでモデルを通さずに空の結果にし、残りを
+    バックエンドのバッチ推論に渡す。
+
+    Returns:
+        List[Dict[str, Any]]: audiosと同じ順の音声認識結果（file_pathはNone）
+
+    Raises:
+        WhisperTranscriptionError: 音声認識に失敗した場合
+    """
+    if language not in _SUPPORTED_LANGUAGES:
+        raise WhisperLanguageError(
+            f"サポートされていない言語です: {language}. サポート: {_SUPPORTED_LANGUAGES}"
+        )
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(audios)
+    speech = []
+    for i, audio in enumerate(audios):
+        duration = len(audio) / WHISPER_SAMPLE_RATE
+        if VAD_ENABLED and not detect_speech_regions(audio):
+            results[i] = _format_result(
+                {"text": "", "segments": []}, language, None, duration
+            )
+            continue
+        speech.append(i)
+
+    if speech:
+        model_to_use = _get_process_model(model_name)
+        initial_prompt = _resolve_initial_prompt(language, initial_prompt)
+        try:
+            outputs = model_to_use.transcribe_batch(
+                [audios[i] for i in speech],
+                language=language,
+                initial_prompt=initial_prompt,
+                temperature=DEFAULT_TEMPERATURE,
+                fp16=DEFAULT_FP16,
+                thresholds=DEFAULT_THRESHOLDS,
+            )
+        except (OSError, IOError, RuntimeError) as e:
+            logger.error("一括音声認識エラー: %s", e)
+            raise WhisperTranscriptionError("音声認識に失敗しました: %s" % e) from e
+        for i, output in zip(speech, outputs):
+            duration = len(audios[i]) / WHISPER_SAMPLE_RATE
+            results[i] = _format_result(output, language, None, duration=duration)
+    return results
+
+
+def _decode_bytes(
+    audio_bytes: bytes, *, normalize: bool, max_seconds: Optional[float]
+) -> np.ndarray:
+    """
+    音声バイト列をデコードする（通常はFFmpegパイプ）
+
+    MP4/M4Aはmoovがmdatより後ろにある（faststartでない）とパイプからは
+    デコードできないため、その場合やパイプでのデコードに失敗した場合は
+    一時ファイルから読ませる。
+    """
+    header = probe_audio_header(audio_bytes, complete=False)
+    if header.container == "mp4" and header.moov_after_mdat:
+        return decode_audio_bytes(
+            audio_bytes, normalize=normalize, max_seconds=max_seconds, seekable=True
+        )
+    try:
+        return decode_audio_bytes(
+            audio_bytes, normalize=normalize, max_seconds=max_seconds
+        )
+    except subprocess.CalledProcessError as e:
+        if header.container != "mp4":
+            raise
+        logger.info("MP4をパイプでデコードできないため一時ファイルから読む: %s", e)
+    return decode_audio_bytes(
+        audio_bytes, normalize=normalize, max_seconds=max_seconds, seekable=True
+    )
+
+
+def _decode_for_model(
+    audio_bytes: bytes, max_seconds: Optional[float] = None
+) -> np.ndarray:
+    """
+    音声バイト列をFFmpegでデコードしてモデル入力用の配列にする
+
+    前処理フィルタ（無音除去・音量正規化）とデコードを1回のFFmpeg実行で行う。
+    前処理に失敗した場合はフィルタなしのデコードにフォールバックする。
+    max_secondsを指定した場合は、その長さでデコードを打ち切る。
+    """
+    try:
+        return _decode_bytes(
+            audio_bytes, normalize=AUDIO_PREPROCESS_ENABLED, max_seconds=max_seconds
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.error("音声前処理エラー: %s", e)
+        # 前処理に失敗した場合はフィルタなしでデコード
+        return _decode_for_model_plain(audio_bytes, max_seconds)
+
+
+def _decode_for_model_plain(
+    audio_bytes: bytes, max_seconds: Optional[float] = None
+) -> np.ndarray:
+    """前処理フィルタなしでデコードする（前処理失敗時のフォールバック）"""
+    try:
+        return _decode_bytes(audio_bytes, normalize=False, max_seconds=max_seconds)
+    except (OSError, subprocess.CalledProcessError) as decode_error:
+        raise WhisperTranscriptionError(
+            "音声のデコードに失敗しました: %s" % decode_error
+        ) from decode_error
+
+
+def _decode_stream_for_model(
+    chunks: Iterable[bytes], limits: Optional[TranscriptionLimits] = None
+) -> Tuple[np.ndarray, int]:
+    """
+    受信中の音声チャンクをFFmpegパイプでデコードしてモデル入力用の配列にする
+
+    前処理に失敗した場合は、残りを受信し切ってからフィルタなしのデコードを
+    やり直す（_decode_for_modelと同じフォールバック）。
+    limitsを指定した場合は、最初のチャンクのヘッダで長さを確認してから
+    FFmpegを起動し、上限の長さでデコードを打ち切る。
+    moovがmdatより後ろにあるMP4はパイプからデコードできないため、
+    受信し切ってから一時ファイル経由でデコードする。
+
+    Returns:
+        Tuple[np.ndarray, int]: デコードした配列と受信したバイト数
+
+    Raises:
+        AudioLimitExceededError: 拒否モードでヘッダの長さが上限を超えた場合
+    """
+    chunks = iter(chunks)
+    first = next(chunks, b"")
+    received: List[bytes] = [first]
+    # 受信途中のため、ヘッダに書かれた長さだけで判定する
+    header = probe_audio_header(first, complete=False)
+    max_seconds = None
+    if limits is not None:
+        limits.check_header(header)
+        max_seconds = limits.decode_seconds
+    if header.moov_after_mdat:
+        # moovが末尾にあるMP4はパイプではデコードできないため、受信し切ってから読む
+        received.extend(chunks)
+        audio_bytes = b"".join(received)
+        return _decode_for_model(audio_bytes, max_seconds), len(audio_bytes)
+
+    def tee() -> Iterator[bytes]:
+        yield from received
+        for chunk in chunks:
+            received.append(chunk)
+            yield chunk
+
+    try:
+        audio = decode_audio_stream(
+            tee(), normalize=AUDIO_PREPROCESS_ENABLED, max_seconds=max_seconds
+        )
+        return audio, sum(len(c) for c in received)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.error("音声前処理エラー: %s", e)
+    # FFmpegが途中で終了した場合は未受信の残りを読み切ってからやり直す
+    received.extend(chunks)
+    audio_bytes = b"".join(received)
+    return _decode_for_model_plain(audio_bytes, max_seconds), len(audio_bytes)
+
+
+def _stitch_chunk_results(
+    results: List[Dict[str, Any]],
+    chunk_offsets: List[float],
+    language: str,
+    duration: float,
+) -> Dict[str, Any]:
+    """
+    チャンクごとの認識結果を1つの結果にまとめる
+
+    セグメントの時刻をチャンクの開始位置だけずらして元の音声の時刻に戻し、
+    IDを振り直す。avg_logprobはまとめた後のセグメントから計算し直す。
+    """
+    segments: List[Dict[str, Any]] = []
+    for result, offset in zip(results, chunk_offsets):
+        for seg in result.get("segments", []):
+            segments.append(
+                {
+                    **seg,
+                    "id": len(segments),
+                    "start": seg["start"] + offset,
+                    "end": seg["end"] + offset,
+                }
+            )
+    merged = {
+        "text": "".join(r.get("text", "") or "" for r in results),
+        "segments": segments,
+        "language": results[0].get("language", language) if results else language,
+    }
+    return _format_result(merged, language, None, duration=duration)
+
+
+@dataclass
+class _PreparedAudio:
+    """認識前の音声（キャッシュにあった場合は結果）"""
+
+    audio_file_path: str
+    audio: Optional[np.ndarray] = None
+    cached: Optional[Dict[str, Any]] = None
+    etag: Optional[str] = None
+    cache_key: Optional[str] = None
+    truncated: bool = False
+
+
+@dataclass
+class _ModelGeneration:
+    """
+    1つの既定モデルと、それを読み込んだワーカープールの組（モデル切り替えの単位）
+
+    リクエストは開始時点の世代を最後まで使い、途中でモデルが切り替わっても
+    旧モデルのまま処理を終える。active が0になった旧世代は停止してよい。
+    """
+
+    model_name: str
+    model_identity: str
+    pool: WhisperWorkerPool
+    active: int = 0
+    idle: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def __post_init__(self) -> None:
+        self.idle.set()
+
+
 class WhisperService:
     """
     Whisper音声認識サービス
@@ -67,16 +567,30 @@ class WhisperService:
 
     def __init__(self) -> None:
         # .envファイルのWHISPER_MODEL_SIZEを優先的に使用
-        self.model_name = os.getenv("WHISPER_MODEL_SIZE", "base")
+        model_name = os.getenv("WHISPER_MODEL_SIZE", "base")
 
         # デバッグ用ログ
         logger.info("環境変数WHISPER_MODEL_SIZE: %s", os.getenv("WHISPER_MODEL_SIZE"))
-        logger.info("選択されたモデル: %s", self.model_name)
-
-        self._model_cache = None
-        self._model_loaded = False
-        # 非同期処理用のスレッドプール
-        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        logger.info("選択されたモデル: %s", model_name)
+
+        # 推論用ワーカープール（ワーカーごとにモデルのレプリカを保持）
+        num_workers = _DEFAULTS["num_workers"]
+        if num_workers > 0 and AUTOTUNE_ENABLED:
+            # 起動時に実測して「レプリカ数 × スレッド数」の分け方を決める
+            num_workers = autotune_num_workers(model_name)
+        # 既定モデルとワーカープールの組。モデル切り替え（swap_model）で丸ごと差し替える
+        # キャッシュキー用の識別子は、バックエンドや演算精度が変われば別の結果になる
+        self._generation = _ModelGeneration(
+            model_name,
+            backend_identity(model_name),
+            WhisperWorkerPool(model_name, num_workers),
+        )
+        # モデル切り替えの進み具合（/voice/admin/model で確認）
+        self._swap_task: Optional[asyncio.Task] = None
+        self._swap_status: Dict[str, Any] = {"state": "idle"}
+        self.swaps = 0
+        # 音声認識結果キャッシュ（ETag×モデル×言語×プロンプト）
+        self._cache = TranscriptionCache() if CACHE_ENABLED else None
         # S3アクセス用のクライアントを初期化
         self.s3_client = boto3.client("s3")
         # 既存のS3設定と一致させる
@@ -85,133 +599,233 @@ class WhisperService:
         self.bucket_name = S3_BUCKET_NAME
         if not self.bucket_name:
             raise ValueError("S3_BUCKET_NAME環境変数が設定されていません")
+        # warm_up()が完了してリクエストを処理できる状態かどうか
+        self._ready = False
+        # S3 I/Oはイベントループを止めないよう専用スレッドで非同期に実行する
+        self._s3 = AsyncS3Downloader(self.s3_client, self.bucket_name)
+        # 同期APIの受付制御（混雑時は処理を始める前に断る）
+        self.admission = (
+            AdmissionController(
+                self.concurrency, max_limit=default_max_concurrency(self.concurrency)
+            )
+            if ADMISSION_ENABLED
+            else None
+        )
         logger.info(
             "WhisperService初期化: %s, S3バケット: %s",
             self.model_name,
             self.bucket_name,
         )
 
+    @property
+    def model_name(self) -> str:
+        """既定モデル名（新しいリクエストが使うモデル）"""
+        return self._generation.model_name
+
+    @property
+    def model_identity(self) -> str:
+        """既定モデルのキャッシュキー用の識別子"""
+        return self._generation.model_identity
+
+    @property
+    def _pool(self) -> WhisperWorkerPool:
+        return self._generation.pool
+
+    @property
+    def concurrency(self) -> int:
+        """同時に実行できる音声認識の数（ワーカー数）"""
+        return self._pool.concurrency
+
+    @property
+    def is_ready(self) -> bool:
+        """モデルの事前読み込みとダミー推論が完了しているかどうか"""
+        return self._ready
+
     async def warm_up(self) -> None:
         """
         モデルを事前読み込み（アプリ起動時に実行）
 
-        アプリケーション起動時にWhisperモデルを事前読み込みすることで、
-        初回の音声認識処理を高速化する。
+        アプリケーション起動時にWhisperモデルを事前読み込みし、
+        ダミー音声で1回推論しておくことで、初回の音声認識処理を高速化する。
+        完了すると is_ready が True になる。
         """
         logger.info("Whisperモデル事前読み込み開始: %s", self.model_name)
         try:
-            # 非同期でモデルを読み込み
-            loop = asyncio.get_event_loop()
-            self._model_cache = await loop.run_in_executor(
-                self._executor, whisper.load_model, self.model_name
+            # 全ワーカーを起動し、各ワーカーでモデルの読み込みとダミー推論を行う
+            pids = await self._pool.warm_up()
+            logger.info(
+                "Whisperモデル事前読み込み完了: %s (workers=%s)", self.model_name, pids
             )
-            self._model_loaded = True
-            logger.info("Whisperモデル事前読み込み完了: %s", self.model_name)
         except Exception as e:
             logger.error("Whisperモデル事前読み込みエラー: %s", e)
             raise
+        self._ready = True
 
-    def _get_cached_model(self):
+    @contextlib.contextmanager
+    def _use_generation(self) -> Iterator[_ModelGeneration]:
         """
-        Whisperモデルをキャッシュして取得
+        リクエストの間、開始時点のモデルとワーカープールを使い続ける
 
-        初回呼び出し時にモデルを読み込み、以降はキャッシュから取得する。
-        これにより、複数回の音声認識処理でパフォーマンスを大幅に向上させる。
-
-        Returns:
-            whisper.Model: 読み込み済みのWhisperモデル
-
-        Raises:
-            WhisperModelLoadError: モデル読み込みに失敗した場合
+        モデル切り替え後も、切り替え前に始まったリクエストは旧世代で処理を
+        終え、旧世代は使っているリクエストがなくなってから停止する。
         """
-        if not self._model_loaded:
-            logger.info("Whisperモデル読み込み開始: %s", self.model_name)
-            try:
-                self._model_cache = whisper.load_model(self.model_name)
-                self._model_loaded = True
-                logger.info(
-                    "Whisperモデル読み込み完了: %s（キャッシュ済み）", self.model_name
-                )
-            except (OSError, IOError, RuntimeError) as e:
-                logger.error("Whisperモデル読み込みエラー: %s", e)
-                raise WhisperModelLoadError(
-                    "Whisperモデルの読み込みに失敗しました: %s" % e
-                ) from e
-        else:
-            logger.debug("キャッシュされたWhisperモデルを使用: 高速！")
-        return self._model_cache
-
-    def _preprocess_audio(self, src_path: str) -> str:
+        generation = self._generation
+        generation.active += 1
+        generation.idle.clear()
+        try:
+            yield generation
+        finally:
+            generation.active -= 1
+            if generation.active == 0:
+                generation.idle.set()
+
+    def model_swap_status(self) -> Dict[str, Any]:
+        """モデル切り替えの状態（current_model は新しいリクエストが使うモデル）"""
+        return {
+            **self._swap_status,
+            "current_model": self.model_name,
+            "swaps": self.swaps,
+        }
+
+    def start_model_swap(self, model_name: str) -> Dict[str, Any]:
         """
-        音声前処理（FFmpegによる最適化）
+        既定モデルの切り替えをバックグラウンドで始める
 
         Args:
-            src_path: 音声ファイルパス
+            model_name: 切り替え先のモデル名（WHISPER_ALLOWED_MODELSのいずれか）
 
         Returns:
-            str: 処理済み音声ファイルパス
+            Dict[str, Any]: 切り替えの状態（model_swap_statusと同じ形式）
+
+        Raises:
+            WhisperModelSwapError: 切り替え中の場合、許可されていないモデルの場合
         """
-        # 一時ファイルを作成
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        temp_path = temp_file.name
-        temp_file.close()
+        if self._swap_task is not None and not self._swap_task.done():
+            raise WhisperModelSwapError(
+                "モデルを切り替え中です: %s" % self._swap_status.get("target_model"),
+                error_code="WHISPER_MODEL_SWAP_IN_PROGRESS",
+            )
+        if model_name == self.model_name:
+            return self.model_swap_status()
+        if model_name not in ALLOWED_MODELS:
+            raise WhisperModelSwapError(
+                "許可されていないモデルです: %s" % model_name,
+                error_code="WHISPER_MODEL_NOT_ALLOWED",
+            )
+        self._mark_swap_started(model_name)
+        self._swap_task = asyncio.create_task(self._run_swap(model_name))
+        return self.model_swap_status()
 
-        try:
-            # FFmpegで音声を正規化
-            normalize_to_wav16k_mono(src_path, temp_path)
-            logger.info("音声前処理完了: %s -> %s", src_path, temp_path)
-            return temp_path
-        except (OSError, IOError, RuntimeError, subprocess.CalledProcessError) as e:
-            logger.error("音声前処理エラー: %s", e)
-            # 前処理に失敗した場合は元ファイルを使用
-            return src_path
-
-    def _compute_avg_logprob(self, result: Dict[str, Any]) -> Optional[float]:
+    async def swap_model(self, model_name: str) -> bool:
         """
-        平均ログ確率を計算
+        既定モデルを無停止で切り替える（ブルーグリーン）
 
-        Whisperの認識結果から各セグメントの平均ログ確率を計算する。
-        この値は音声認識の信頼度を示し、値が高いほど認識精度が高い。
+        1. 新しいモデルのワーカープールを起動し、読み込みとダミー推論を済ませる
+           （その間も旧モデルでリクエストを処理し続ける）
+        2. 新しいリクエストの振り分け先を新しい世代に差し替える
+        3. 旧世代で処理中のリクエストが終わるのを待ってから旧ワーカーを停止する
 
-        Args:
-            result: Whisperの認識結果辞書
+        切り替え中は一時的に両方のモデルがメモリに載る。
 
         Returns:
-            Optional[float]: 平均ログ確率、計算できない場合はNone
+            bool: 切り替えたかどうか（新しいモデルの準備に失敗したらFalse）
         """
-        segs = result.get("segments") or []
-        vals = [
-            s.get("avg_logprob")
-            for s in segs
-            if isinstance(s.get("avg_logprob"), (int, float))
-        ]
-        if not vals:
-            return None
-        return float(sum(vals) / len(vals))
+        self._mark_swap_started(model_name)
+        return await self._run_swap(model_name)
+
+    def _mark_swap_started(self, model_name: str) -> None:
+        self._swap_status = {
+            "state": "warming",
+            "target_model": model_name,
+            "previous_model": self.model_name,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "error": None,
+        }
+
+    async def _run_swap(self, model_name: str) -> bool:
+        previous = self._generation
+        logger.info("モデル切り替え開始: %s -> %s", previous.model_name, model_name)
+        pool = WhisperWorkerPool(
+            model_name, previous.pool.num_workers, previous.pool.torch_threads
+        )
+        try:
+            await pool.warm_up()
+        except asyncio.CancelledError:
+            # アプリ終了などで切り替えを中止した場合も、準備中のワーカーを残さない
+            pool.shutdown(wait=False)
+            raise
+        except Exception as e:  # 旧モデルのまま処理を続ける
+            logger.exception("モデル切り替え失敗（%sのまま継続）", previous.model_name)
+            pool.shutdown(wait=False)
+            if not pool.uses_processes and model_name != previous.model_name:
+                release_process_model(model_name)
+            self._swap_status.update(state="failed", error=f"{type(e).__name__}: {e}")
+            return False
+
+        # ここから後に始まるリクエストは新しいモデルで処理する
+        self._generation = _ModelGeneration(
+            model_name, backend_identity(model_name), pool
+        )
+        self.swaps += 1
+        self._swap_status["state"] = "draining"
+        logger.info(
+            "モデル切り替え: 新しいリクエストを%sで処理（%sの処理中 %s件）",
+            model_name,
+            previous.model_name,
+            previous.active,
+        )
+
+        await self._retire_generation(previous)
+        self._swap_status.update(
+            state="completed", finished_at=datetime.now(timezone.utc).isoformat()
+        )
+        logger.info("モデル切り替え完了: %s -> %s", previous.model_name, model_name)
+        return True
 
-    def _transcribe_once(self, model, audio_path: str, **kwargs) -> Dict[str, Any]:
-        """1回の音声認識実行（最速設定）"""
+    async def _retire_generation(self, generation: _ModelGeneration) -> None:
+        """旧世代のリクエストが終わるのを待ち、ワーカーとモデルを解放する"""
         try:
-            # 最速設定で実行
-            result = model.transcribe(
-                audio_path,
-                **kwargs,
-                # 最速設定
-                temperature=0.0,  # 決定的
-                best_of=1,  # 最小値
-                beam_size=1,  # 最小値
-                condition_on_previous_text=False,
-                no_speech_threshold=0.6,  # 緩和（処理軽量化）
-                compression_ratio_threshold=3.5,  # 緩和（処理軽量化）
-                logprob_threshold=-1.2,  # 緩和（処理軽量化）
-                fp16=False,  # CPU環境
+            await asyncio.wait_for(
+                generation.idle.wait(), timeout=SWAP_DRAIN_TIMEOUT_SECONDS
+            )
+            drained = True
+        except asyncio.TimeoutError:
+            logger.warning(
+                "旧モデルの処理が%s秒で終わらないため打ち切り: %s (%s件)",
+                SWAP_DRAIN_TIMEOUT_SECONDS,
+                generation.model_name,
+                generation.active,
             )
+            drained = False
+        except asyncio.CancelledError:
+            generation.pool.shutdown(wait=False)
+            raise
+        await asyncio.to_thread(generation.pool.shutdown, drained)
+        if not generation.pool.uses_processes:
+            # スレッドモードはモデルをこのプロセスで共有しているため、明示的に解放する
+            release_process_model(generation.model_name)
 
-            return result
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        ワーカープールとS3用スレッドを停止する
 
-        except (OSError, IOError, RuntimeError) as e:
-            logger.error("音声認識エラー: %s", e)
-            raise
+        CLI（一括再処理など）の終了時に使う。APIの終了時は、実行中のモデル
+        切り替えも止める aclose() を使う。
+        """
+        self._ready = False
+        self._pool.shutdown(wait=wait)
+        self._s3.shutdown(wait=wait)
+
+    async def aclose(self) -> None:
+        """
+        実行中のモデル切り替えを中止してから、ワーカーとS3用スレッドを停止する
+
+        アプリ終了時（lifespanの後処理）に呼び、ワーカープロセスを残さない。
+        """
+        if self._swap_task is not None and not self._swap_task.done():
+            self._swap_task.cancel()
+            await asyncio.gather(self._swap_task, return_exceptions=True)
+        await asyncio.to_thread(self.shutdown)
 
     async def transcribe_async(
         self,
@@ -219,6 +833,8 @@ class WhisperService:
         *,
         initial_prompt: Optional[str] = None,
         language: str = _DEFAULTS["language"],
+        model_name: Optional[str] = None,
+        limits: Optional[TranscriptionLimits] = None,
     ) -> Dict[str, Any]:
         """
         音声認識の非同期メイン処理
@@ -232,6 +848,8 @@ class WhisperService:
             audio_file_path: 音声ファイルパス（S3キー）
             initial_prompt: 初期プロンプト（未指定時は自動生成）
             language: 認識言語（デフォルト: 日本語）
+            model_name: 使用するモデル名（未指定・許可外の場合は既定モデル）
+            limits: 音声の長さ・サイズの上限（未指定なら無制限）
 
         Returns:
             Dict[str, Any]: 音声認識結果
@@ -242,138 +860,355 @@ class WhisperService:
                 - segments: セグメント情報
                 - duration: 音声長さ
                 - avg_logprob: 平均ログ確率（信頼度）
+                - truncated: 上限の長さで切り詰めた場合のみTrue
 
         Raises:
             WhisperTranscriptionError: 音声認識に失敗した場合
+            AudioLimitExceededError: 拒否モードで上限を超えた場合
         """
-        # S3からダウンロードしてから音声認識を実行
-        temp_file_path = None
-        try:
-            # S3から一時ファイルにダウンロード
-            temp_file_path = self._download_from_s3(audio_file_path)
-
-            # 非同期で音声認識を実行
-            loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(
-                self._executor,
-                self._transcribe_sync,
-                temp_file_path,
+        with self._use_generation() as generation:
+            model_name = resolve_model_name(model_name, generation.model_name)
+            model_identity = (
+                generation.model_identity
+                if model_name == generation.model_name
+                else backend_identity(model_name)
+            )
+
+            resolved_prompt = _resolve_initial_prompt(language, initial_prompt)
+            prepared = await self._prepare_audio(
+                audio_file_path, model_identity, language, resolved_prompt, limits
+            )
+            if prepared.cached is not None:
+                return prepared.cached
+
+            # 長い音声は無音で分割してワーカープールで並列に認識する
+            result = await self._transcribe_chunked(
+                prepared.audio,
+                model_name,
                 initial_prompt,
                 language,
+                pool=generation.pool,
             )
-        finally:
-            # 一時ファイルを削除
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    logger.debug("一時ファイルを削除しました: %s", temp_file_path)
-                except OSError as e:
-                    logger.warning("一時ファイル削除に失敗: %s", e)
+            return await self._store_result(prepared, result, model_identity, language)
 
-    def _transcribe_sync(
+    async def _prepare_audio(
         self,
         audio_file_path: str,
-        initial_prompt: Optional[str] = None,
-        language: str = _DEFAULTS["language"],
-    ) -> Dict[str, Any]:
+        model_identity: str,
+        language: str,
+        resolved_prompt: Optional[str],
+        limits: Optional[TranscriptionLimits],
+    ) -> "_PreparedAudio":
         """
-        音声認識のメイン処理
+        S3の音声を取得してモデル入力用にデコードする（キャッシュにあれば結果を返す）
 
-        S3に保存された音声ファイルをWhisper AIで文字起こしする。
-        日本語の場合は子ども向け語彙の初期プロンプトを自動適用し、
-        認識精度を向上させる。
+        Raises:
+            AudioLimitExceededError: 拒否モードで上限を超えた場合
+        """
+        # ETagが分かっていればダウンロード前にキャッシュを確認する
+        # （HEADは送らず、以前のGetObjectで得たETagを使う）
+        cache_key = None
+        etag = self._s3.known_etag(audio_file_path)
+        if self._cache is not None and etag:
+            cache_key = make_cache_key(etag, model_identity, language, resolved_prompt)
+            cached = await self._cache.get(cache_key)
+            if cached is not None:
+                logger.info("音声認識キャッシュヒット: %s", audio_file_path)
+                return _PreparedAudio(audio_file_path, cached=cached)
+
+        # S3のGetObjectを開始する（ストリーミング時は本文をまだ読まない）
+        # サイズの上限はContentLengthで確認し、超えていれば本文を受信しない
+        check_size = limits.check_size if limits is not None else None
+        body = None
+        if STREAM_DECODE_ENABLED:
+            body, etag = await self._s3.open_object(
+                audio_file_path, check_size=check_size
+            )
+        else:
+            audio_bytes, etag = await self._s3.get_object_bytes(
+                audio_file_path, check_size=check_size
+            )
 
-        Args:
-            audio_file_path: 音声ファイルパス（S3キー）
-            initial_prompt: 初期プロンプト（未指定時は自動生成）
-            language: 認識言語（デフォルト: 日本語）
+        # 初めてのキーはGetObjectのETagでキャッシュを確認する
+        # （永続キャッシュにあればデコードと推論を省ける）
+        # consume_objectへ渡すまでの間にキャンセル・例外で抜けても本文を閉じる
+        try:
+            if self._cache is not None and cache_key is None and etag:
+                cache_key = make_cache_key(
+                    etag, model_identity, language, resolved_prompt
+                )
+                cached = await self._cache.get(cache_key)
+                if cached is not None:
+                    logger.info("音声認識キャッシュヒット: %s", audio_file_path)
+                    if body is not None:
+                        body.close()
+                    return _PreparedAudio(audio_file_path, cached=cached)
+        except BaseException:
+            if body is not None:
+                body.close()
+            raise
 
-        Returns:
-            Dict[str, Any]: 音声認識結果
-                - success: 処理成功フラグ
-                - text: 認識されたテキスト
-                - language: 認識された言語
-                - file_path: 処理したファイルパス
-                - segments: セグメント情報
-                - duration: 音声長さ
-                - avg_logprob: 平均ログ確率（信頼度）
+        # FFmpegパイプでデコード（処理はFFmpegの子プロセスで行われる）
+        # 長さの上限はデコード前にヘッダで確認し、デコードも上限で打ち切る
+        truncated = False
+        if STREAM_DECODE_ENABLED:
+            # 受信したチャンクを順にFFmpegへ流し、転送とデコードを重ねる
+            # （転送とデコードが重なるため、デコードの間もS3の同時実行枠を使う）
+            audio, n_bytes = await self._s3.consume_object(
+                body, partial(_decode_stream_for_model, limits=limits)
+            )
+        else:
+            max_seconds = None
+            if limits is not None:
+                truncated = limits.check_header(probe_audio_header(audio_bytes))
+                max_seconds = limits.decode_seconds
+            audio = await asyncio.to_thread(_decode_for_model, audio_bytes, max_seconds)
+            n_bytes = len(audio_bytes)
+        if limits is not None:
+            # ヘッダから長さが分からなかった場合はデコード結果の長さで判定する
+            truncated = (
+                limits.check_decoded(len(audio) / WHISPER_SAMPLE_RATE) or truncated
+            )
+            if truncated:
+                logger.warning(
+                    "音声を上限の長さで切り詰め: %s (%.0fs)",
+                    audio_file_path,
+                    limits.max_seconds,
+                )
+        logger.info(
+            "音声認識開始: %d bytes -> %.1fs (lang=%s, fp16=%s)",
+            n_bytes,
+            len(audio) / WHISPER_SAMPLE_RATE,
+            language,
+            DEFAULT_FP16,
+        )
+        return _PreparedAudio(
+            audio_file_path,
+            audio=audio,
+            etag=etag,
+            cache_key=cache_key,
+            truncated=truncated,
+        )
 
-        Raises:
-            WhisperTranscriptionError: 音声認識に失敗した場合
-        """
-        if language not in self.get_supported_languages():
-            raise WhisperLanguageError(
-                f"サポートされていない言語です: {language}. サポート: {self.get_supported_languages()}"
+    async def _store_result(
+        self,
+        prepared: "_PreparedAudio",
+        result: Dict[str, Any],
+        model_identity: str,
+        language: str,
+    ) -> Dict[str, Any]:
+        """認識結果にファイル情報を付けてキャッシュに保存する"""
+        result["file_path"] = prepared.audio_file_path
+        if prepared.truncated:
+            result["truncated"] = True
+        # 切り詰めた結果は上限が変われば変わるため、キャッシュしない
+        if prepared.cache_key is not None and not prepared.truncated:
+            await self._cache.put(
+                prepared.cache_key,
+                result,
+                s3_key=prepared.audio_file_path,
+                etag=prepared.etag,
+                model_name=model_identity,
+                language=language,
             )
+        return result
 
-        # キャッシュされたモデルを使用
-        model_to_use = self._get_cached_model()
+    async def transcribe_batch_async(
+        self,
+        audio_file_paths: List[str],
+        *,
+        language: str = _DEFAULTS["language"],
+        limits: Optional[TranscriptionLimits] = None,
+    ) -> AsyncIterator[Tuple[str, Union[Dict[str, Any], Exception]]]:
+        """
+        複数の音声をまとめて文字起こしし、終わった順に結果を返す
 
-        # 初期プロンプト（未指定なら子ども向け語彙を適用）
-        # 日本語音声の認識精度向上のため、子ども向け語彙の初期プロンプトを自動適用
-        if language == "ja" and not initial_prompt:
-            # 音声ファイルの場合は一般的な子ども向け語彙プロンプトを適用
-            initial_prompt = generate_whisper_prompt()
+        - ダウンロードとデコードは全キーを同時に始める（S3の同時実行数で制限）
+        - BATCH_MAX_CLIP_SECONDS以下の音声は、ワーカーが空いていればすぐに、
+          空いていなければBATCH_SIZE本までまとめて1回の推論に通す
+        - それより長い音声は transcribe_async と同じく分割して並列に認識する
+        - 推論の同時実行数はワーカー数まで（1回の一括認識でプールを占有しすぎない）
 
-        preprocessed = self._preprocess_audio(audio_file_path)
-        remove_tmp = preprocessed != audio_file_path
+        Args:
+            audio_file_paths: 音声ファイルのS3キー（重複は1回だけ処理）
+            language: 認識言語
+            limits: 音声の長さ・サイズの上限（未指定なら無制限）
 
-        try:
-            logger.info(
-                "音声認識開始: %s (lang=%s, fp16=%s)",
-                audio_file_path,
+        Yields:
+            Tuple[str, Union[Dict[str, Any], Exception]]: (S3キー, 音声認識結果)。
+                失敗したキーは結果の代わりに例外を返す（他のキーは続行する）
+        """
+        # 一括処理の間は開始時点のモデルを使い続ける（途中で切り替わっても混ぜない）
+        with self._use_generation() as generation:
+            keys = list(dict.fromkeys(audio_file_paths))
+            resolved_prompt = _resolve_initial_prompt(language, None)
+            done: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+            pending: List[_PreparedAudio] = []
+            tasks: set = set()
+            state = {"busy": 0}
+
+            def spawn(coro) -> None:
+                task = asyncio.create_task(coro)
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            def is_long(prepared: _PreparedAudio) -> bool:
+                return (
+                    len(prepared.audio) > BATCH_MAX_CLIP_SECONDS * WHISPER_SAMPLE_RATE
+                )
+
+            def dispatch() -> None:
+                # ワーカーに空きがあれば待たせずに流す。空きがない間に準備できた
+                # 短い音声は pending に溜まり、空いた時点で最大BATCH_SIZE本まとめて流す
+                while pending and state["busy"] < generation.pool.concurrency:
+                    if is_long(pending[0]):
+                        batch = [pending.pop(0)]
+                    else:
+                        batch = [p for p in pending if not is_long(p)][:BATCH_SIZE]
+                        for prepared in batch:
+                            pending.remove(prepared)
+                    state["busy"] += 1
+                    spawn(infer(batch))
+
+            async def infer(batch: List[_PreparedAudio]) -> None:
+                try:
+                    if is_long(batch[0]):
+                        results = [
+                            await self._transcribe_chunked(
+                                batch[0].audio,
+                                generation.model_name,
+                                None,
+                                language,
+                                pool=generation.pool,
+                            )
+                        ]
+                    else:
+                        results = await generation.pool.run(
+                            _transcribe_batch_in_worker,
+                            generation.model_name,
+                            [p.audio for p in batch],
+                            None,
+                            language,
+                        )
+                    for prepared, result in zip(batch, results):
+                        result = await self._store_result(
+                            prepared, result, generation.model_identity, language
+                        )
+                        done.put_nowait((prepared.audio_file_path, result))
+                except Exception as e:  # バッチ単位で失敗させ、他のバッチは続行
+                    logger.exception("一括音声認識エラー: %s件", len(batch))
+                    for prepared in batch:
+                        done.put_nowait((prepared.audio_file_path, e))
+                finally:
+                    state["busy"] -= 1
+                    dispatch()
+
+            async def prepare(key: str) -> None:
+                try:
+                    prepared = await self._prepare_audio(
+                        key,
+                        generation.model_identity,
+                        language,
+                        resolved_prompt,
+                        limits,
+                    )
+                except Exception as e:  # キー単位で失敗させる
+                    logger.warning("一括音声認識の準備に失敗: %s (%s)", key, e)
+                    done.put_nowait((key, e))
+                    return
+                if prepared.cached is not None:
+                    done.put_nowait((key, prepared.cached))
+                    return
+                pending.append(prepared)
+                dispatch()
+
+            for key in keys:
+                spawn(prepare(key))
+            try:
+                for _ in keys:
+                    yield await done.get()
+            finally:
+                # 途中で打ち切られた場合（クライアント切断など）は残りを止める
+                for task in list(tasks):
+                    task.cancel()
+
+    async def _transcribe_chunked(
+        self,
+        audio: np.ndarray,
+        model_name: str,
+        initial_prompt: Optional[str],
+        language: str,
+        *,
+        pool: Optional[WhisperWorkerPool] = None,
+    ) -> Dict[str, Any]:
+        """
+        音声を無音の位置でチャンクに分割し、ワーカーで並列に認識する
+
+        1本の音声は1ワーカーでしか処理できず、処理時間が音声長に比例するため、
+        CHUNK_MIN_DURATION_SECONDS以上の音声はワーカー数ぶんに分けて並列化する。
+        短い音声やワーカーが1つの場合は分割せずにそのまま認識する。
+        pool はリクエスト開始時の世代のワーカープール（未指定なら現在の既定）。
+        """
+        pool = pool or self._pool
+        duration = len(audio) / WHISPER_SAMPLE_RATE
+        if duration < CHUNK_MIN_DURATION_SECONDS or pool.concurrency < 2:
+            return await pool.run(
+                _transcribe_array_in_worker,
+                model_name,
+                audio,
+                initial_prompt,
                 language,
-                DEFAULT_FP16,
             )
 
-            # 最速設定で実行
-            # temperature=0.0で一貫した結果、fp16=Falseで高精度を確保
-            try:
-                result = model_to_use.transcribe(
-                    preprocessed,
-                    language=language,
-                    initial_prompt=initial_prompt,
-                    temperature=DEFAULT_TEMPERATURE,  # 0.0=最も一貫した結果
-                    fp16=DEFAULT_FP16,  # False=32bit精度で高品質
-                )
-            except (OSError, IOError, RuntimeError) as e:
-                logger.error("音声認識エラー: %s", e)
-                raise WhisperTranscriptionError("音声認識に失敗しました: %s" % e) from e
-
-            avg_lp = self._compute_avg_logprob(result)
-            logger.info("avg_logprob=%s", avg_lp)
-
-            # duration が None の場合はセグメント情報から計算
-            # Whisperが音声長さを正確に取得できない場合のフォールバック処理
-            duration = result.get("duration")
-            if duration is None:
-                segs = result.get("segments") or []
-                # 各セグメントの終了時間の最大値を音声長さとして使用
-                duration = max(
-                    (s.get("end", 0.0) for s in segs), default=DEFAULT_DURATION
+        target_seconds = max(CHUNK_TARGET_SECONDS, duration / pool.concurrency)
+        chunks = await asyncio.to_thread(split_at_silences, audio, target_seconds)
+        logger.info(
+            "音声を分割して並列認識: %.1fs -> %s chunks (workers=%s)",
+            duration,
+            len(chunks),
+            pool.concurrency,
+        )
+        results = await asyncio.gather(
+            *(
+                pool.run(
+                    _transcribe_array_in_worker,
+                    model_name,
+                    audio[start:end],
+                    initial_prompt,
+                    language,
                 )
+                for start, end in chunks
+            )
+        )
+        offsets = [start / WHISPER_SAMPLE_RATE for start, _ in chunks]
+        return _stitch_chunk_results(list(results), offsets, language, duration)
 
-            return {
-                "success": True,
-                "text": result.get("text", "") or "",
-                "language": result.get("language", language),
-                "file_path": audio_file_path,
-                "segments": result.get("segments", []),
-                "duration": duration,
-                "avg_logprob": avg_lp,
-            }
-        except (OSError, IOError, RuntimeError) as e:
-            logger.error("音声認識エラー: %s", e)
-            raise WhisperTranscriptionError("音声認識に失敗しました: %s" % e) from e
-        finally:
-            # 一時ファイルのクリーンアップ
-            # 前処理で一時ファイルが作成された場合のみ削除
-            if remove_tmp and os.path.exists(preprocessed):
-                try:
-                    os.remove(preprocessed)
-                except OSError:
-                    # 削除に失敗しても処理は継続（ログは出力しない）
-                    pass
+    async def transcribe_array_async(
+        self,
+        audio: np.ndarray,
+        *,
+        initial_prompt: Optional[str] = None,
+        language: str = _DEFAULTS["language"],
+    ) -> Dict[str, Any]:
+        """
+        デコード済みの音声配列を非同期で文字起こしする
+
+        Args:
+            audio: 16kHzモノラルのfloat32音声配列
+            initial_prompt: 初期プロンプト（未指定時は自動生成）
+            language: 認識言語（デフォルト: 日本語）
+
+        Returns:
+            Dict[str, Any]: 音声認識結果（transcribe_asyncと同じ形式）
+        """
+        with self._use_generation() as generation:
+            return await generation.pool.run(
+                _transcribe_array_in_worker,
+                generation.model_name,
+                audio,
+                initial_prompt,
+                language,
+            )
 
     async def transcribe_from_s3(
         self,
@@ -383,7 +1218,7 @@ class WhisperService:
         language: str = _DEFAULTS["language"],
     ) -> Dict[str, Any]:
         """
-        S3から音声ファイルをダウンロードして音声認識を実行
+        S3の音声ファイルを音声認識する（後方互換のため残したtranscribe_asyncの別名）
 
         Args:
             s3_key: S3キー
@@ -391,80 +1226,23 @@ class WhisperService:
             language: 認識言語
 
         Returns:
-            Dict[str, Any]: 音声認識結果
+            Dict[str, Any]: 音声認識結果（transcribe_asyncと同じ形式）
         """
-        temp_file_path = None
-        try:
-            # S3から一時ファイルにダウンロード
-            temp_file_path = await self._download_from_s3(s3_key)
-
-            # 音声認識を実行
-            result = self._transcribe_sync(
-                audio_file_path=temp_file_path,
-                initial_prompt=initial_prompt,
-                language=language,
-            )
-
-            return result
-
-        finally:
-            # 一時ファイルを削除
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    logger.debug("一時ファイルを削除しました: %s", temp_file_path)
-                except OSError as e:
-                    logger.warning("一時ファイル削除に失敗: %s", e)
-
-    def _download_from_s3(self, s3_key: str) -> str:
-        """S3からファイルをダウンロードして一時ファイルに保存"""
-        temp_file_path = None
-        try:
-            # まずファイルの存在確認
-            logger.info(
-                "S3ファイル存在確認: bucket=%s, key=%s", self.bucket_name, s3_key
-            )
-            try:
-                self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
-                logger.info("S3ファイル存在確認OK: %s", s3_key)
-            except Exception as head_error:
-                logger.error("S3ファイル存在確認失敗: %s", head_error)
-                raise head_error
-
-            # 一時ファイルを作成
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".webm")
-            temp_file_path = temp_file.name
-            temp_file.close()
-
-            logger.info(
-                "S3からダウンロード開始: bucket=%s, key=%s -> %s",
-                self.bucket_name,
-                s3_key,
-                temp_file_path,
-            )
+        return await self.transcribe_async(
+            s3_key, initial_prompt=initial_prompt, language=language
+        )
 
-            # S3からダウンロード
-            self.s3_client.download_file(
-                Bucket=self.bucket_name, Key=s3_key, Filename=temp_file_path
-            )
+    def cache_stats(self) -> Dict[str, Any]:
+        """音声認識キャッシュのヒット・ミス統計"""
+        if self._cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._cache.snapshot()}
 
-            logger.info("S3ダウンロード完了: %s", temp_file_path)
-            return temp_file_path
-
-        except Exception as e:
-            # エラー時は一時ファイルを削除
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                except OSError:
-                    pass
-            logger.error(
-                "S3ダウンロードエラー: bucket=%s, key=%s, error=%s",
-                self.bucket_name,
-                s3_key,
-                e,
-            )
-            raise e
+    def admission_stats(self) -> Dict[str, Any]:
+        """受付制御の同時実行数・待ち行列・拒否数の統計"""
+        if self.admission is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.admission.snapshot()}
 
     def get_supported_languages(self) -> List[str]:
         """
@@ -478,16 +1256,6 @@ class WhisperService:
         """
         return list(_SUPPORTED_LANGUAGES)
 
-    def _get_model(self, model_name: str):
-        if not model_name or model_name == self.model_name:
-            return self._get_cached_model()
-        logger.info("別モデル読み込み: %s", model_name)
-        try:
-            return whisper.load_model(model_name)
-        except (OSError, IOError, RuntimeError) as e:
-            logger.error("別モデル読み込み失敗: %s（fallback: %s）", e, self.model_name)
-            return self._get_cached_model()
-
 
 class WhisperTranscriptionError(Exception):
     """音声認識エラー"""
@@ -498,6 +1266,15 @@ class WhisperTranscriptionError(Exception):
         super().__init__(self.message)
 
 
+class WhisperModelSwapError(Exception):
+    """Whisperモデル切り替えエラー"""
+
+    def __init__(self, message: str, error_code: str = "WHISPER_MODEL_SWAP_ERROR"):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+
 class WhisperModelLoadError(Exception):
     """Whisperモデル読み込みエラー"""
 
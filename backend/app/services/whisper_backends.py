@@ -0,0 +1,587 @@
+"""
+Whisper推論バックエンド
+
+音声認識エンジンを差し替えられるよう、モデルの読み込みと推論を
+バックエンドクラスにまとめる。どのバックエンドも openai-whisper の
+transcribe と同じ形式の辞書（text / segments / language）を返すため、
+WhisperService側の結果整形やAPIのレスポンスは変わらない。
+
+- openai: openai-whisper（PyTorch、float32）。従来の動作
+  （WHISPER_DYNAMIC_QUANTIZE=true でLinear層を動的int8量子化）。
+  float32の重みは変換済みキャッシュからmmapで読み込み、起動を速くする
+- faster-whisper: CTranslate2 によるint8量子化推論（CPU向け）
+
+WHISPER_BACKEND で選択する（未設定時は openai）。
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from app.utils.audio import WHISPER_SAMPLE_RATE
+from app.utils.child_vocabulary import compiled_prompt_tokens
+
+logger = logging.getLogger(__name__)
+
+BACKEND_OPENAI = "openai"
+BACKEND_FASTER_WHISPER = "faster-whisper"
+SUPPORTED_BACKENDS = (BACKEND_OPENAI, BACKEND_FASTER_WHISPER)
+
+# バックエンド設定（未設定時はデフォルト値を使用）
+DEFAULT_BACKEND = os.getenv("WHISPER_BACKEND", BACKEND_OPENAI).lower()
+# CTranslate2の演算精度（int8 / int8_float32 / float32 など）
+DEFAULT_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+# openaiバックエンドでLinear層を動的int8量子化するかどうか
+DYNAMIC_QUANTIZE_ENABLED = (
+    os.getenv("WHISPER_DYNAMIC_QUANTIZE", "false").lower() == "true"
+)
+# 量子化済みモデルの保存先（次回起動時は量子化を省略して読み込む）
+QUANTIZED_CACHE_DIR = os.getenv(
+    "WHISPER_QUANTIZED_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "whisper", "quantized"),
+)
+
+# float32に変換済みの重みキャッシュ（mmapで読み込み、ワーカー間でページを共有）
+WEIGHT_CACHE_ENABLED = os.getenv("WHISPER_WEIGHT_CACHE", "true").lower() == "true"
+WEIGHT_CACHE_DIR = os.getenv(
+    "WHISPER_WEIGHT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "whisper", "mmap"),
+)
+
+AudioInput = Union[str, np.ndarray]
+
+
+def _decoder_prompt(initial_prompt: Optional[str]) -> Union[str, List[int], None]:
+    """
+    デコーダに渡す初期プロンプト
+
+    起動時にコンパイルしたプロンプトなら、キャッシュ済みのトークン列を渡して
+    呼び出しごとのトークン化を省く。それ以外の文字列はそのまま渡す。
+    """
+    tokens = compiled_prompt_tokens(initial_prompt)
+    return list(tokens) if tokens else initial_prompt
+
+
+@dataclass(frozen=True)
+class DecodeThresholds:
+    """
+    認識結果を採用する基準（openai-whisperのtranscribe()のしきい値と同じ意味）
+
+    1本ずつの認識（transcribe）とバッチ推論（transcribe_batch）で同じ値を使い、
+    どちらの経路でも同じ音声から同じ文字起こしになるようにする。
+
+    - 圧縮率が高い（同じ語の繰り返し）・平均ログ確率が低い結果は、
+      温度フォールバックでやり直す（バッチ推論では1本ずつtranscribe()でやり直す）
+    - 無音の確率が高く平均ログ確率も低い結果は、発話なし（空文字）とする
+    """
+
+    compression_ratio: float = 2.4
+    logprob: float = -1.0
+    no_speech: float = 0.6
+
+
+class WhisperBackend:
+    """
+    推論バックエンドの共通インターフェース
+
+    サブクラスは load() でモデルを読み込み、transcribe() で
+    openai-whisper互換の結果辞書を返す。
+    """
+
+    name = ""
+
+    def __init__(self, model_name: str, *, cpu_threads: int = 0) -> None:
+        self.model_name = model_name
+        self.cpu_threads = cpu_threads
+        self.model: Any = None
+
+    @property
+    def identity(self) -> str:
+        """キャッシュキーなどに使うモデルの識別子（同じ入力で同じ結果になる単位）"""
+        return self.model_name
+
+    def load(self) -> "WhisperBackend":
+        raise NotImplementedError
+
+    def transcribe(
+        self,
+        audio: AudioInput,
+        *,
+        language: str,
+        initial_prompt: Optional[str],
+        temperature: float,
+        fp16: bool,
+        thresholds: DecodeThresholds = DecodeThresholds(),
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def transcribe_batch(
+        self,
+        audios: List[np.ndarray],
+        *,
+        language: str,
+        initial_prompt: Optional[str],
+        temperature: float,
+        fp16: bool,
+        thresholds: DecodeThresholds = DecodeThresholds(),
+    ) -> List[Dict[str, Any]]:
+        """
+        30秒以下の音声をまとめて認識する（既定は1本ずつtranscribe()）
+
+        バッチ推論に対応したバックエンドは上書きして、複数の音声を
+        1回のエンコーダ・デコーダ実行で処理する。
+        """
+        return [
+            self.transcribe(
+                audio,
+                language=language,
+                initial_prompt=initial_prompt,
+                temperature=temperature,
+                fp16=fp16,
+                thresholds=thresholds,
+            )
+            for audio in audios
+        ]
+
+
+def quantize_linear_layers(model):
+    """
+    モデルのLinear層を動的int8量子化する
+
+    重みはint8で保持し、活性化は推論時に量子化するため、
+    キャリブレーション用データは不要。埋め込み・畳み込み・LayerNormは
+    float32のまま残す。
+    """
+    import torch
+
+    # openai-whisperのLinearはdtype変換だけを足したnn.Linearのサブクラスで、
+    # 量子化の対象判定（型の完全一致）から漏れるため、float32推論では
+    # 挙動の変わらないnn.Linearに戻してから量子化する
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def quantized_cache_path(model_name: str) -> str:
+    """量子化済みモデルの保存パス（torchとwhisperのバージョンごとに分ける）"""
+    import torch
+    import whisper
+
+    filename = (
+        f"{model_name}-dynamic-int8-torch{torch.__version__}"
+        f"-whisper{whisper.__version__}.pt"
+    )
+    return os.path.join(QUANTIZED_CACHE_DIR, filename.replace("+", "_"))
+
+
+def weight_cache_path(model_name: str) -> str:
+    """変換済み重みキャッシュの保存パス（whisperのバージョンごとに分ける）"""
+    import whisper
+
+    filename = f"{model_name}-float32-whisper{whisper.__version__}.pt"
+    return os.path.join(WEIGHT_CACHE_DIR, filename.replace("+", "_"))
+
+
+def save_weight_cache(model, path: str) -> None:
+    """
+    モデルをmmapで読み込める形式で保存する
+
+    重み（state_dict）はfloat32のまま保存し、読み込み時の型変換を省く。
+    state_dictに含まれない非永続バッファ（因果マスク・アライメントヘッド）も
+    一緒に保存し、読み込み時にモデルを初期化し直さずに済むようにする。
+    """
+    import dataclasses
+
+    import torch
+
+    state_dict = model.state_dict()
+    buffers, sparse = {}, []
+    for name, buf in model.named_buffers():
+        if name in state_dict:
+            continue
+        if buf.is_sparse:
+            sparse.append(name)
+            buf = buf.to_dense()
+        buffers[name] = buf
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 複数ワーカーが同時に書いても壊れないよう、一時ファイル経由で置き換える
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.save(
+        {
+            "dims": dataclasses.asdict(model.dims),
+            "model_state_dict": state_dict,
+            "buffers": buffers,
+            "sparse_buffers": sparse,
+        },
+        tmp_path,
+    )
+    os.replace(tmp_path, path)
+
+
+def load_weight_cache(path: str):
+    """
+    変換済み重みキャッシュからモデルを組み立てる
+
+    torch.load(mmap=True) で重みをファイルにマップし、
+    load_state_dict(assign=True) でそのままモデルのパラメータにする。
+    重みはページキャッシュ経由で読まれるため、同じファイルを開いた
+    ワーカープロセス間で物理メモリを共有し、触れたページだけが読み込まれる。
+    """
+    import torch
+    from whisper.model import ModelDimensions, Whisper
+
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    dims = ModelDimensions(**checkpoint["dims"])
+    try:
+        # metaデバイスで組み立て、ランダム初期化の計算とメモリ確保を省く
+        with torch.device("meta"):
+            model = Whisper(dims)
+    except (RuntimeError, NotImplementedError):
+        model = Whisper(dims)
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+
+    sparse = set(checkpoint["sparse_buffers"])
+    for name, buf in checkpoint["buffers"].items():
+        module_path, _, attr = name.rpartition(".")
+        module = model.get_submodule(module_path)
+        module.register_buffer(
+            attr, buf.to_sparse() if name in sparse else buf, persistent=False
+        )
+    return model
+
+
+class OpenAIWhisperBackend(WhisperBackend):
+    """openai-whisper（PyTorch）バックエンド"""
+
+    name = BACKEND_OPENAI
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        cpu_threads: int = 0,
+        quantize: bool = DYNAMIC_QUANTIZE_ENABLED,
+    ) -> None:
+        super().__init__(model_name, cpu_threads=cpu_threads)
+        self.quantize = quantize
+
+    @property
+    def identity(self) -> str:
+        if self.quantize:
+            return f"{self.name}:dynamic-int8:{self.model_name}"
+        return self.model_name
+
+    def load(self) -> "OpenAIWhisperBackend":
+        import whisper
+
+        if not self.quantize:
+            if WEIGHT_CACHE_ENABLED:
+                self.model = self._load_weight_cached()
+            else:
+                self.model = whisper.load_model(self.model_name)
+            return self
+        self.model = self._load_quantized()
+        return self
+
+    def _load_weight_cached(self):
+        """
+        変換済み重みキャッシュから読み込む
+
+        キャッシュがなければ通常どおりチェックポイントから読み込み、
+        次回以降のためにキャッシュを作る。失敗しても読み込んだモデルは使う。
+        """
+        import whisper
+
+        path = weight_cache_path(self.model_name)
+        if os.path.exists(path):
+            try:
+                model = load_weight_cache(path)
+                logger.info("Whisper重みキャッシュをmmapで読み込み: %s", path)
+                return model
+            except (OSError, RuntimeError, EOFError, KeyError) as e:
+                logger.warning("Whisper重みキャッシュの読み込みに失敗: %s", e)
+
+        model = whisper.load_model(self.model_name, device="cpu")
+        try:
+            save_weight_cache(model, path)
+            logger.info("Whisper重みキャッシュを保存: %s", path)
+        except OSError as e:
+            logger.warning("Whisper重みキャッシュの保存に失敗: %s", e)
+        return model
+
+    def _load_quantized(self):
+        """
+        量子化済みモデルを読み込む
+
+        ディスクに保存済みならそれを読み込み、なければfloat32モデルを
+        量子化して保存する。保存に失敗しても量子化したモデルはそのまま使う。
+        """
+        import torch
+        import whisper
+
+        path = quantized_cache_path(self.model_name)
+        if os.path.exists(path):
+            try:
+                model = torch.load(path, map_location="cpu", weights_only=False)
+                logger.info("量子化済みWhisperモデルを読み込み: %s", path)
+                return model
+            except (OSError, RuntimeError, EOFError) as e:
+                logger.warning(
+                    "量子化済みモデルの読み込みに失敗（再量子化します）: %s", e
+                )
+
+        model = quantize_linear_layers(
+            whisper.load_model(self.model_name, device="cpu")
+        )
+        try:
+            os.makedirs(QUANTIZED_CACHE_DIR, exist_ok=True)
+            # 複数ワーカーが同時に書いても壊れないよう、一時ファイル経由で置き換える
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            torch.save(model, tmp_path)
+            os.replace(tmp_path, path)
+            logger.info("量子化済みWhisperモデルを保存: %s", path)
+        except OSError as e:
+            logger.warning("量子化済みモデルの保存に失敗: %s", e)
+        return model
+
+    def transcribe(
+        self,
+        audio: AudioInput,
+        *,
+        language: str,
+        initial_prompt: Optional[str],
+        temperature: float,
+        fp16: bool,
+        thresholds: DecodeThresholds = DecodeThresholds(),
+    ) -> Dict[str, Any]:
+        # openai-whisperのtranscribe()は文字列のプロンプトしか受け付けない
+        # （トークン化は呼び出しごとに1回。セグメントごとのデコードでは使い回される）
+        return self.model.transcribe(
+            audio,
+            language=language,
+            initial_prompt=initial_prompt,
+            temperature=temperature,
+            fp16=fp16,
+            compression_ratio_threshold=thresholds.compression_ratio,
+            logprob_threshold=thresholds.logprob,
+            no_speech_threshold=thresholds.no_speech,
+        )
+
+    def transcribe_batch(
+        self,
+        audios: List[np.ndarray],
+        *,
+        language: str,
+        initial_prompt: Optional[str],
+        temperature: float,
+        fp16: bool,
+        thresholds: DecodeThresholds = DecodeThresholds(),
+    ) -> List[Dict[str, Any]]:
+        """
+        30秒以下の音声をまとめてエンコーダ・デコーダに通す
+
+        各音声を30秒のメルスペクトログラムにしてバッチにし、whisper.decode()で
+        1回の推論にまとめる。短い音声を1本ずつ処理するより、1回あたりの
+        固定コスト（エンコーダ起動・プロンプトのデコード）を分け合える。
+        セグメントは音声全体で1つ（タイムスタンプなし）。
+        """
+        import torch
+        import whisper
+
+        mel = torch.stack(
+            [
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(torch.from_numpy(audio)),
+                    self.model.dims.n_mels,
+                )
+                for audio in audios
+            ]
+        ).to(self.model.device)
+        options = whisper.DecodingOptions(
+            language=language,
+            prompt=_decoder_prompt(initial_prompt),
+            temperature=temperature,
+            fp16=fp16,
+            without_timestamps=True,
+        )
+        decoded = whisper.decode(self.model, mel, options)
+
+        results = []
+        for audio, r in zip(audios, decoded):
+            no_speech = (
+                r.no_speech_prob > thresholds.no_speech
+                and r.avg_logprob < thresholds.logprob
+            )
+            if not no_speech and (
+                r.compression_ratio > thresholds.compression_ratio
+                or r.avg_logprob < thresholds.logprob
+            ):
+                # 品質が低い結果は温度フォールバック付きの通常経路でやり直す
+                results.append(
+                    self.transcribe(
+                        audio,
+                        language=language,
+                        initial_prompt=initial_prompt,
+                        temperature=temperature,
+                        fp16=fp16,
+                        thresholds=thresholds,
+                    )
+                )
+                continue
+            text = "" if no_speech else r.text
+            segments = []
+            if text:
+                segments.append(
+                    {
+                        "id": 0,
+                        "seek": 0,
+                        "start": 0.0,
+                        "end": len(audio) / WHISPER_SAMPLE_RATE,
+                        "text": text,
+                        "tokens": r.tokens,
+                        "temperature": r.temperature,
+                        "avg_logprob": r.avg_logprob,
+                        "compression_ratio": r.compression_ratio,
+                        "no_speech_prob": r.no_speech_prob,
+                    }
+                )
+            results.append({"text": text, "segments": segments, "language": language})
+        return results
+
+
+class FasterWhisperBackend(WhisperBackend):
+    """
+    faster-whisper（CTranslate2）バックエンド
+
+    重みをint8に量子化して推論するため、float32のPyTorch推論より
+    CPUでの処理時間とメモリ使用量が小さい。
+    """
+
+    name = BACKEND_FASTER_WHISPER
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        cpu_threads: int = 0,
+        compute_type: str = DEFAULT_COMPUTE_TYPE,
+    ) -> None:
+        super().__init__(model_name, cpu_threads=cpu_threads)
+        self.compute_type = compute_type
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}:{self.compute_type}:{self.model_name}"
+
+    def load(self) -> "FasterWhisperBackend":
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError(
+                "WHISPER_BACKEND=faster-whisper には faster-whisper パッケージが必要です"
+            ) from e
+
+        self.model = WhisperModel(
+            self.model_name,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+            # 並列処理はワーカープロセス単位で行うため、モデル内は1本にする
+            num_workers=1,
+        )
+        return self
+
+    def transcribe(
+        self,
+        audio: AudioInput,
+        *,
+        language: str,
+        initial_prompt: Optional[str],
+        temperature: float,
+        fp16: bool,
+        thresholds: DecodeThresholds = DecodeThresholds(),
+    ) -> Dict[str, Any]:
+        # openai-whisperの既定（貪欲デコード）に合わせて beam_size=1 にする
+        segments, info = self.model.transcribe(
+            audio,
+            language=language,
+            initial_prompt=_decoder_prompt(initial_prompt),
+            temperature=temperature,
+            beam_size=1,
+            compression_ratio_threshold=thresholds.compression_ratio,
+            log_prob_threshold=thresholds.logprob,
+            no_speech_threshold=thresholds.no_speech,
+        )
+        # segmentsはジェネレータで、消費した時点でデコードが進む
+        segs = [
+            {
+                "id": seg.id,
+                "seek": seg.seek,
+                "start": seg.start,
+                "end": seg.end,
+                "text": seg.text,
+                "tokens": list(seg.tokens),
+                "temperature": seg.temperature,
+                "avg_logprob": seg.avg_logprob,
+                "compression_ratio": seg.compression_ratio,
+                "no_speech_prob": seg.no_speech_prob,
+            }
+            for seg in segments
+        ]
+        return {
+            "text": "".join(s["text"] for s in segs),
+            "segments": segs,
+            "language": info.language,
+            "duration": info.duration,
+        }
+
+
+_BACKEND_CLASSES = {
+    BACKEND_OPENAI: OpenAIWhisperBackend,
+    BACKEND_FASTER_WHISPER: FasterWhisperBackend,
+}
+
+
+def create_backend(
+    model_name: str,
+    backend: str = DEFAULT_BACKEND,
+    *,
+    cpu_threads: int = 0,
+) -> WhisperBackend:
+    """
+    バックエンドを作成する（モデルはまだ読み込まない）
+
+    Raises:
+        ValueError: 未対応のバックエンド名の場合
+    """
+    backend_cls = _BACKEND_CLASSES.get(backend)
+    if backend_cls is None:
+        raise ValueError(
+            f"未対応のWhisperバックエンドです: {backend}. サポート: {SUPPORTED_BACKENDS}"
+        )
+    return backend_cls(model_name, cpu_threads=cpu_threads)
+
+
+def load_backend(
+    model_name: str,
+    backend: str = DEFAULT_BACKEND,
+    *,
+    cpu_threads: int = 0,
+) -> WhisperBackend:
+    """バックエンドを作成してモデルを読み込む"""
+    logger.info(
+        "Whisperバックエンド読み込み: backend=%s, model=%s", backend, model_name
+    )
+    return create_backend(model_name, backend, cpu_threads=cpu_threads).load()
+
+
+def backend_identity(model_name: str, backend: str = DEFAULT_BACKEND) -> str:
+    """モデルを読み込まずに識別子だけを求める"""
+    return create_backend(model_name, backend).identity
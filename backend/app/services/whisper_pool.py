@@ -0,0 +1,368 @@
+"""
+Whisper推論ワーカープール
+
+Whisperモデルのレプリカを保持するワーカープロセス群を管理する。
+各ワーカーは独立したプロセスで自分専用のモデルを読み込み、
+torchのスレッド数を固定することで、GILやintra-opスレッドの競合を避けて
+CPUコア数に応じて同時処理数をスケールさせる。
+
+WHISPER_WORKERS=0 の場合は従来通り、1つのモデルを共有する
+スレッドプールで動作する（ローカル開発・テスト向け）。
+モデルはWHISPER_BACKENDで選択した推論バックエンドとして読み込む。
+
+ワーカーへのコアの割り当てとスレッド数は cpu_topology で決める。
+WHISPER_AUTOTUNE=true の場合は起動時にワーカー数の候補を実測し、
+スループットが最も高い「レプリカ数 × スレッド数」の組み合わせを選ぶ。
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import asyncio
+import multiprocessing
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services.cpu_topology import (
+    CPU_AFFINITY_ENABLED,
+    CoreSet,
+    physical_cores,
+    pin_to_cpus,
+    plan_placement,
+)
+from app.services.whisper_backends import backend_identity, load_backend
+from app.utils.audio import WHISPER_SAMPLE_RATE
+from app.services.whisper_registry import WhisperModelRegistry
+
+logger = logging.getLogger(__name__)
+
+# ワーカー設定（未設定時はデフォルト値を使用）
+DEFAULT_NUM_WORKERS = int(os.getenv("WHISPER_WORKERS", "2"))
+DEFAULT_THREAD_WORKERS = 2  # WHISPER_WORKERS=0 のときのスレッド数（従来値）
+_TORCH_THREADS_ENV = os.getenv("WHISPER_TORCH_THREADS")
+# 起動時のキャリブレーションでワーカー数を決めるかどうか
+AUTOTUNE_ENABLED = os.getenv("WHISPER_AUTOTUNE", "false").lower() == "true"
+# キャリブレーションで試すワーカー数の上限（レプリカごとにモデルのメモリが必要）
+AUTOTUNE_MAX_WORKERS = int(os.getenv("WHISPER_AUTOTUNE_MAX_WORKERS", "4"))
+# キャリブレーション結果の保存先（同じマシン・モデルでは再計測しない）
+AUTOTUNE_CACHE_PATH = os.getenv(
+    "WHISPER_AUTOTUNE_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "whisper", "placement.json"),
+)
+# キャリブレーションに使う音声の長さ（秒）
+CALIBRATION_CLIP_SECONDS = 5.0
+# ワーカー数を増やすのは、スループットがこの割合以上上がる場合だけ
+CALIBRATION_MIN_GAIN = 1.05
+
+# このプロセスの推論スレッド数（ワーカー初期化時に設定、0はバックエンド既定）
+_process_cpu_threads = 0
+
+
+def _load_for_process(model_name: str):
+    return load_backend(model_name, cpu_threads=_process_cpu_threads)
+
+
+# プロセスごとのモデルレジストリ（ワーカープロセス内・スレッドモード共通）
+_process_registry = WhisperModelRegistry(_load_for_process)
+
+
+def default_torch_threads(num_workers: int) -> int:
+    """
+    1ワーカーあたりのtorchスレッド数を決める
+
+    WHISPER_TORCH_THREADSが指定されていればそれを使い、
+    未指定なら物理コア数をワーカー数で均等に割った値を使う。
+    """
+    if _TORCH_THREADS_ENV:
+        return max(1, int(_TORCH_THREADS_ENV))
+    return plan_placement(num_workers).torch_threads
+
+
+def load_process_model(model_name: str, *, pin: bool = False):
+    """
+    このプロセス用のWhisperモデルを取得（初回のみ読み込み）
+
+    ワーカープロセス内ではプロセス専用のレプリカ、
+    スレッドモードではプロセス全体で共有する1つのモデルを返す。
+    既定モデル以外はレジストリのメモリ予算内でLRU管理される。
+
+    Args:
+        model_name: モデル名
+        pin: Trueの場合、メモリ予算を超えても解放しない（既定モデル用）
+    """
+    return _process_registry.get(model_name, pin=pin)
+
+
+def is_process_model_loaded(model_name: str) -> bool:
+    """このプロセスでモデルが読み込み済みかどうか"""
+    return _process_registry.is_loaded(model_name)
+
+
+def release_process_model(model_name: str) -> bool:
+    """このプロセスのモデルを固定解除して解放する（スレッドモードのモデル切り替え用）"""
+    return _process_registry.release(model_name)
+
+
+def process_registry_snapshot() -> Dict[str, Any]:
+    """このプロセスのモデルレジストリの統計"""
+    return _process_registry.snapshot()
+
+
+def _configure_torch_threads(torch_threads: int) -> None:
+    """
+    このプロセスの推論スレッド数を設定する
+
+    inter-opスレッドは1本に絞り、ワーカー間でコアを奪い合わないようにする。
+    """
+    import torch
+
+    global _process_cpu_threads
+    _process_cpu_threads = torch_threads
+    torch.set_num_threads(torch_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # 既に並列処理が始まっている場合は変更できない（無視して継続）
+        pass
+
+
+def _init_worker(model_name: str, torch_threads: int, core_queue=None) -> None:
+    """
+    ワーカープロセスの初期化
+
+    割り当てられたコアに固定し、torchのスレッド数を設定してからモデルを読み込む。
+    """
+    cpus: Optional[CoreSet] = None
+    if core_queue is not None:
+        try:
+            cpus = core_queue.get(timeout=1.0)
+        except queue.Empty:
+            # 割り当て済みのコアがない（ワーカーの再起動など）場合は固定しない
+            pass
+    pinned = bool(cpus) and pin_to_cpus(cpus)
+    _configure_torch_threads(torch_threads)
+    logger.info(
+        "Whisperワーカー初期化: pid=%s, model=%s, torch_threads=%s, cpus=%s",
+        os.getpid(),
+        model_name,
+        torch_threads,
+        list(cpus) if pinned else "unpinned",
+    )
+    load_process_model(model_name, pin=True)
+
+
+def _warm_up_worker(model_name: str) -> int:
+    """
+    ワーカーの起動とモデル読み込みを行い、ダミー音声で1回推論する（ウォームアップ用）
+
+    初回推論でだけ発生するカーネルの初期化やメモリ確保を起動時に済ませ、
+    最初のリクエストが遅くならないようにする。
+    """
+    backend = load_process_model(model_name, pin=True)
+    backend.transcribe(
+        np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32),
+        language="ja",
+        initial_prompt=None,
+        temperature=0.0,
+        fp16=False,
+    )
+    return os.getpid()
+
+
+def _calibration_worker(model_name: str, clip_seconds: float) -> float:
+    """キャリブレーション用の音声を1回推論し、処理時間（秒）を返す"""
+    backend = load_process_model(model_name, pin=True)
+    # 無音だとデコーダがすぐ終わるため、小さなノイズを使う
+    audio = np.random.default_rng(0).normal(
+        0.0, 0.05, int(clip_seconds * WHISPER_SAMPLE_RATE)
+    )
+    t0 = time.perf_counter()
+    backend.transcribe(
+        audio.astype(np.float32),
+        language="ja",
+        initial_prompt=None,
+        temperature=0.0,
+        fp16=False,
+    )
+    return time.perf_counter() - t0
+
+
+class WhisperWorkerPool:
+    """
+    Whisper推論ワーカープール
+
+    num_workers > 0 の場合は spawn したワーカープロセスを使い、
+    各プロセスがモデルのレプリカを1つずつ保持する。
+    num_workers == 0 の場合はモデル共有のスレッドプールで動作する。
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        num_workers: int = DEFAULT_NUM_WORKERS,
+        torch_threads: Optional[int] = None,
+        *,
+        pin_affinity: bool = CPU_AFFINITY_ENABLED,
+    ) -> None:
+        self.model_name = model_name
+        self.num_workers = max(0, num_workers)
+        # 同時に推論するワーカー（スレッドモードではスレッド）ごとにコアを分ける
+        slots = self.num_workers or DEFAULT_THREAD_WORKERS
+        placement = plan_placement(slots, torch_threads or default_torch_threads(slots))
+        self.torch_threads = placement.torch_threads
+        self.pin_affinity = pin_affinity and self.num_workers > 0
+
+        if self.num_workers > 0:
+            core_queue = None
+            if self.pin_affinity:
+                # 各ワーカーが初期化時に1組ずつ受け取る
+                ctx = multiprocessing.get_context("spawn")
+                core_queue = ctx.Queue()
+                for cpus in placement.core_sets:
+                    core_queue.put(cpus)
+            # fork は torch のスレッド状態を壊すため spawn を使う
+            self._executor: concurrent.futures.Executor = (
+                concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.torch_threads, core_queue),
+                )
+            )
+        else:
+            # スレッドモードでも同時推論数ぶんのスレッドでコア数を超えないようにする
+            _configure_torch_threads(self.torch_threads)
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=DEFAULT_THREAD_WORKERS
+            )
+
+        logger.info(
+            "WhisperWorkerPool初期化: model=%s, mode=%s, workers=%s, "
+            "torch_threads=%s, affinity=%s",
+            self.model_name,
+            "process" if self.uses_processes else "thread",
+            self.concurrency,
+            self.torch_threads,
+            self.pin_affinity,
+        )
+
+    @property
+    def uses_processes(self) -> bool:
+        """ワーカープロセスを使っているかどうか"""
+        return self.num_workers > 0
+
+    @property
+    def concurrency(self) -> int:
+        """同時に処理できる音声認識の数"""
+        return self.num_workers if self.uses_processes else DEFAULT_THREAD_WORKERS
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        ワーカーで関数を実行して結果を待つ
+
+        プロセスモードでは fn と引数がpickleされるため、
+        fn はモジュールレベルの関数である必要がある。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def warm_up(self) -> List[int]:
+        """
+        全ワーカーを起動してモデルを読み込ませ、ダミー推論を1回ずつ実行する
+
+        Returns:
+            List[int]: モデルを読み込んだワーカーのPID一覧
+        """
+        if not self.uses_processes:
+            await self.run(_warm_up_worker, self.model_name)
+            return [os.getpid()]
+        # ワーカー数ぶん同時に投入し、全プロセスを起動させる
+        pids = await asyncio.gather(
+            *(
+                self.run(_warm_up_worker, self.model_name)
+                for _ in range(self.num_workers)
+            )
+        )
+        return sorted(set(pids))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """ワーカーを停止する"""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def calibrate_num_workers(
+    model_name: str,
+    *,
+    max_workers: int = AUTOTUNE_MAX_WORKERS,
+    clip_seconds: float = CALIBRATION_CLIP_SECONDS,
+) -> int:
+    """
+    ワーカー数の候補ごとに推論のスループットを実測し、最適なワーカー数を返す
+
+    候補は1, 2, 4, ...（物理コア数とmax_workersまで）。各候補でワーカーを起動し、
+    モデル読み込みと初回推論を済ませてから、ワーカー数の2倍の推論を同時に
+    投入して処理時間を測る。スレッド数は物理コア数 ÷ ワーカー数になる。
+    メモリを節約するため、スループットが5%以上上がらない限りワーカー数は増やさない。
+    """
+    limit = max(1, min(len(physical_cores()), max_workers))
+    candidates = sorted({2**i for i in range(limit.bit_length()) if 2**i <= limit})
+    candidates = sorted(set(candidates) | {limit})
+
+    best_workers, best_throughput = 1, 0.0
+    for num_workers in candidates:
+        pool = WhisperWorkerPool(model_name, num_workers)
+        try:
+            executor = pool._executor
+            list(executor.map(_warm_up_worker, [model_name] * num_workers))
+            clips = num_workers * 2
+            t0 = time.perf_counter()
+            list(
+                executor.map(
+                    _calibration_worker, [model_name] * clips, [clip_seconds] * clips
+                )
+            )
+            throughput = clips * clip_seconds / (time.perf_counter() - t0)
+        finally:
+            pool.shutdown()
+        logger.info(
+            "Whisperキャリブレーション: workers=%s, torch_threads=%s, "
+            "%.2f 音声秒/秒",
+            num_workers,
+            pool.torch_threads,
+            throughput,
+        )
+        if throughput > best_throughput * CALIBRATION_MIN_GAIN:
+            best_workers, best_throughput = num_workers, throughput
+    return best_workers
+
+
+def autotune_num_workers(model_name: str) -> int:
+    """
+    キャリブレーション結果のワーカー数を返す（保存済みなら再計測しない）
+
+    結果はモデル（バックエンド・演算精度を含む）と物理コア数ごとに保存する。
+    """
+    key = f"{backend_identity(model_name)}|{len(physical_cores())}cores"
+    try:
+        with open(AUTOTUNE_CACHE_PATH, encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {}
+    if key in saved:
+        logger.info("Whisperワーカー数（保存済み）: %s -> %s", key, saved[key])
+        return int(saved[key])
+
+    num_workers = calibrate_num_workers(model_name)
+    saved[key] = num_workers
+    try:
+        os.makedirs(os.path.dirname(AUTOTUNE_CACHE_PATH), exist_ok=True)
+        with open(AUTOTUNE_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2)
+    except OSError as e:
+        logger.warning("キャリブレーション結果の保存に失敗: %s", e)
+    logger.info("Whisperワーカー数（キャリブレーション）: %s -> %s", key, num_workers)
+    return num_workers
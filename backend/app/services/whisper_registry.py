@@ -0,0 +1,216 @@
+"""
+Whisperモデルレジストリ
+
+プロセス内で読み込んだモデルを名前ごとに保持し、必要になった時点で
+遅延読み込みする。保持するモデルの合計サイズがメモリ予算を超えた場合は、
+最も長く使われていないモデルから解放する（固定したモデルは解放しない）。
+同じモデルの同時読み込みは1回にまとめ、重みが二重に載らないようにする。
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.whisper_backends import WhisperBackend
+
+logger = logging.getLogger(__name__)
+
+# レジストリ設定（未設定時はデフォルト値を使用）
+DEFAULT_MODEL_MEMORY_BUDGET_MB = int(
+    os.getenv("WHISPER_MODEL_MEMORY_BUDGET_MB", "2048")
+)
+# リクエストごとに選択できるモデル（英語専用の .en モデルを含む）
+ALLOWED_MODELS = tuple(
+    name.strip()
+    for name in os.getenv(
+        "WHISPER_ALLOWED_MODELS", "tiny,base,small,tiny.en,base.en,small.en"
+    ).split(",")
+    if name.strip()
+)
+
+# パラメータ数からの概算ができない場合のfloat32換算サイズ（MB）
+_APPROX_MODEL_MB = {
+    "tiny": 150,
+    "base": 290,
+    "small": 970,
+    "medium": 3000,
+    "large": 6000,
+}
+
+
+def estimate_model_bytes(backend: WhisperBackend) -> int:
+    """
+    読み込んだモデルのおおよそのメモリ使用量を求める
+
+    PyTorchモデルならパラメータとバッファの合計バイト数、
+    それ以外（CTranslate2など）はモデルサイズ別の概算値を使う。
+    """
+    model = backend.model
+    if hasattr(model, "parameters") and hasattr(model, "buffers"):
+        tensors = list(model.parameters()) + list(model.buffers())
+        total = sum(t.numel() * t.element_size() for t in tensors if not t.is_sparse)
+        if total:
+            return total
+    size = backend.model_name.split(".")[0].split("-")[0]
+    return _APPROX_MODEL_MB.get(size, _APPROX_MODEL_MB["large"]) * 1024 * 1024
+
+
+class WhisperModelRegistry:
+    """
+    Whisperモデルレジストリ（LRU・メモリ予算つき）
+
+    get() で指定モデルを返し、未読み込みならその場で読み込む。
+    読み込み処理は loader（model_name -> WhisperBackend）に委ねる。
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], WhisperBackend],
+        *,
+        memory_budget_bytes: int = DEFAULT_MODEL_MEMORY_BUDGET_MB * 1024 * 1024,
+    ) -> None:
+        self._loader = loader
+        self.memory_budget_bytes = memory_budget_bytes
+        self._models: "OrderedDict[str, tuple[WhisperBackend, int]]" = OrderedDict()
+        self._pinned: set[str] = set()
+        self._lock = threading.Lock()
+        # モデル名ごとの読み込みロック（別モデルの読み込みは並行できる）
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, model_name: str, *, pin: bool = False) -> WhisperBackend:
+        """
+        モデルを取得する（未読み込みなら読み込む）
+
+        Args:
+            model_name: モデル名
+            pin: Trueの場合、以降LRUで解放しない（既定モデル用）
+        """
+        with self._lock:
+            if pin:
+                self._pinned.add(model_name)
+            item = self._models.get(model_name)
+            if item is not None:
+                self._models.move_to_end(model_name)
+                return item[0]
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        # 同じモデルの読み込みは1つのスレッドだけが行い、他は完了を待つ
+        with load_lock:
+            with self._lock:
+                item = self._models.get(model_name)
+                if item is not None:
+                    self._models.move_to_end(model_name)
+                    return item[0]
+
+            logger.info(
+                "Whisperモデル読み込み開始: %s (pid=%s)", model_name, os.getpid()
+            )
+            backend = self._loader(model_name)
+            size_bytes = estimate_model_bytes(backend)
+            logger.info(
+                "Whisperモデル読み込み完了: %s (pid=%s, %.0fMB)",
+                model_name,
+                os.getpid(),
+                size_bytes / 1024 / 1024,
+            )
+
+            with self._lock:
+                self._models[model_name] = (backend, size_bytes)
+                self.loads += 1
+                self._evict_locked(keep=model_name)
+        return backend
+
+    def release(self, model_name: str) -> bool:
+        """
+        モデルを固定解除して解放する（既定モデルの切り替え後に旧モデルを捨てる）
+
+        Returns:
+            bool: 解放したかどうか（読み込まれていなければFalse）
+        """
+        with self._lock:
+            self._pinned.discard(model_name)
+            item = self._models.pop(model_name, None)
+            if item is None:
+                return False
+            self.evictions += 1
+        logger.info(
+            "Whisperモデルを解放: %s (%.0fMB, pid=%s)",
+            model_name,
+            item[1] / 1024 / 1024,
+            os.getpid(),
+        )
+        return True
+
+    def is_loaded(self, model_name: str) -> bool:
+        """モデルが読み込み済みかどうか"""
+        return model_name in self._models
+
+    def loaded_models(self) -> List[str]:
+        """読み込み済みのモデル名（古く使われた順）"""
+        with self._lock:
+            return list(self._models)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def _evict_locked(self, keep: str) -> None:
+        """メモリ予算を超えている間、古く使われたモデルから解放する"""
+        total = sum(size for _, size in self._models.values())
+        for name in list(self._models):
+            if total <= self.memory_budget_bytes:
+                break
+            if name == keep or name in self._pinned:
+                continue
+            _, size = self._models.pop(name)
+            total -= size
+            self.evictions += 1
+            logger.info(
+                "Whisperモデルを解放: %s (%.0fMB, pid=%s)",
+                name,
+                size / 1024 / 1024,
+                os.getpid(),
+            )
+        if total > self.memory_budget_bytes:
+            logger.warning(
+                "Whisperモデルがメモリ予算を超過しています: %.0fMB > %.0fMB",
+                total / 1024 / 1024,
+                self.memory_budget_bytes / 1024 / 1024,
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """メトリクス用の統計スナップショット"""
+        with self._lock:
+            return {
+                "loaded_models": list(self._models),
+                "pinned_models": sorted(self._pinned),
+                "total_mb": round(
+                    sum(size for _, size in self._models.values()) / 1024 / 1024, 1
+                ),
+                "budget_mb": round(self.memory_budget_bytes / 1024 / 1024, 1),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+def resolve_model_name(
+    requested: Optional[str], default: str, allowed=ALLOWED_MODELS
+) -> str:
+    """
+    リクエストで指定されたモデル名を検証する
+
+    未指定または許可されていないモデルの場合は既定モデルを返す。
+    """
+    if not requested or requested == default:
+        return default
+    if requested not in allowed:
+        logger.warning(
+            "許可されていないモデル指定: %s（fallback: %s）", requested, default
+        )
+        return default
+    return requested
@@ -0,0 +1,207 @@
+"""
+ストリーミング音声認識セッション
+
+録音中の音声チャンクを受け取りながら逐次デコードし、途中結果（partial）を返す。
+録音全体ではなく「確定済みの位置から最大30秒のローリングウィンドウ」だけを
+認識するため、録音終了後の最終結果（final）は残りの末尾だけを処理すればよく、
+体感の待ち時間をほぼゼロにできる。
+
+処理の流れ:
+1. チャンクをセッション専用のFFmpegプロセスに流し、届いた分だけPCMにデコード
+   （MediaRecorderのwebm等、先頭にヘッダを含む連続データ）
+2. 未確定部分が30秒を超えたら、先頭30秒を認識して区切りの良いセグメントまで確定し、
+   確定したPCMは捨てる
+3. 残りの未確定部分を認識して「確定テキスト + 途中テキスト」を返す
+
+デコードも認識も1回あたりの量が録音の長さに比例しないため、長い録音でも
+途中結果の計算コストは増えない。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.utils.audio import WHISPER_SAMPLE_RATE, IncrementalAudioDecoder
+
+logger = logging.getLogger(__name__)
+
+# Whisperが一度に扱える音声長（秒）
+WINDOW_SECONDS = 30.0
+# 確定させるときに窓の末尾から残しておく余白（途中で切れた単語を避ける）
+COMMIT_MARGIN_SECONDS = 2.0
+# 途中結果を返す最小間隔（秒）
+DEFAULT_PARTIAL_INTERVAL = float(os.getenv("STREAM_PARTIAL_INTERVAL_SECONDS", "1.0"))
+# 1セッションで受け付ける最大バイト数（録音しっぱなし対策）
+DEFAULT_MAX_STREAM_BYTES = int(os.getenv("STREAM_MAX_BYTES", str(20 * 1024 * 1024)))
+
+
+class StreamLimitExceededError(Exception):
+    """ストリーミング上限超過エラー"""
+
+    def __init__(self, message: str, error_code: str = "STREAM_LIMIT_EXCEEDED"):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+
+class StreamingTranscriptionSession:
+    """
+    ストリーミング音声認識セッション（WebSocket接続1本につき1つ）
+
+    確定済みテキストと確定済みサンプル位置を保持し、
+    未確定の末尾だけを毎回認識し直す。
+
+    Args:
+        whisper_service: 認識に使うWhisperService（transcribe_array_asyncを使う）
+        language: 認識言語
+        partial_interval: 途中結果を返す最小間隔（秒）
+        max_bytes: 受け付ける最大バイト数
+        decoder: 音声チャンクのデコーダ（省略時はFFmpegのIncrementalAudioDecoder）
+    """
+
+    def __init__(
+        self,
+        whisper_service,
+        *,
+        language: str = "ja",
+        partial_interval: float = DEFAULT_PARTIAL_INTERVAL,
+        max_bytes: int = DEFAULT_MAX_STREAM_BYTES,
+        decoder: Optional[IncrementalAudioDecoder] = None,
+    ) -> None:
+        self.whisper_service = whisper_service
+        self.language = language
+        self.partial_interval = partial_interval
+        self.max_bytes = max_bytes
+        self._decoder = decoder or IncrementalAudioDecoder()
+        self._received_bytes = 0
+        self._committed_text = ""
+        self._committed_samples = 0
+        self._last_decode_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def received_bytes(self) -> int:
+        """受信済みのバイト数"""
+        return self._received_bytes
+
+    def add_chunk(self, chunk: bytes) -> None:
+        """
+        音声チャンクを追加する
+
+        Raises:
+            StreamLimitExceededError: 受信バイト数が上限を超えた場合
+        """
+        if self._received_bytes + len(chunk) > self.max_bytes:
+            raise StreamLimitExceededError(
+                f"ストリーミング音声が上限（{self.max_bytes}バイト）を超えました"
+            )
+        self._received_bytes += len(chunk)
+        self._decoder.feed(chunk)
+
+    def partial_due(self) -> bool:
+        """途中結果を計算するタイミングかどうか（前回から一定時間経過）"""
+        return (
+            self._received_bytes > 0
+            and time.monotonic() - self._last_decode_at >= self.partial_interval
+        )
+
+    async def partial(self) -> Optional[Dict[str, Any]]:
+        """
+        途中結果を計算する
+
+        Returns:
+            Optional[Dict[str, Any]]: {"text", "duration"}。
+                まだデコードできる音声がない場合はNone。
+        """
+        async with self._lock:
+            self._last_decode_at = time.monotonic()
+            return await self._decode(final=False)
+
+    async def final(self) -> Dict[str, Any]:
+        """
+        最終結果を計算する（録音終了時）
+
+        Returns:
+            Dict[str, Any]: 音声認識結果（transcribe_asyncと同じ形式）
+        """
+        async with self._lock:
+            # 入力を閉じ、FFmpegが残りを出力し終えてから末尾を認識する
+            await asyncio.to_thread(self._decoder.close)
+            result = await self._decode(final=True)
+        return result or {
+            "success": True,
+            "text": self._committed_text,
+            "language": self.language,
+            "file_path": None,
+            "segments": [],
+            "duration": 0.0,
+            "avg_logprob": None,
+        }
+
+    def close(self) -> None:
+        """FFmpegを止める（クライアント切断時など、最終結果を出さずに終える場合）"""
+        self._decoder.kill()
+
+    async def _decode(self, *, final: bool) -> Optional[Dict[str, Any]]:
+        """デコード済みの分で確定を進めてから、未確定の末尾を認識する"""
+        total_samples = self._decoder.total_samples
+        window_samples = int(WINDOW_SECONDS * WHISPER_SAMPLE_RATE)
+        # 未確定部分が窓を超えている間は、先頭の窓を認識して確定を進める
+        while total_samples - self._committed_samples > window_samples:
+            await self._commit_window(
+                self._decoder.read(
+                    self._committed_samples, self._committed_samples + window_samples
+                )
+            )
+            self._decoder.discard(self._committed_samples)
+
+        tail = self._decoder.read(self._committed_samples, total_samples)
+        if len(tail) == 0:
+            return None
+
+        result = await self.whisper_service.transcribe_array_async(
+            tail, language=self.language
+        )
+        total_duration = total_samples / WHISPER_SAMPLE_RATE
+        text = self._committed_text + (result.get("text", "") or "")
+        if not final:
+            return {"text": text, "duration": total_duration}
+
+        offset = self._committed_samples / WHISPER_SAMPLE_RATE
+        return {
+            **result,
+            "text": text,
+            "segments": [
+                {**seg, "start": seg["start"] + offset, "end": seg["end"] + offset}
+                for seg in result.get("segments", [])
+            ],
+            "duration": total_duration,
+        }
+
+    async def _commit_window(self, window: np.ndarray) -> None:
+        """
+        窓の先頭から区切りの良いセグメントまでを確定させる
+
+        窓の末尾付近のセグメントは途中で切れている可能性があるため確定せず、
+        次の窓で認識し直す。確定できるセグメントがなければ窓全体を確定する。
+        """
+        result = await self.whisper_service.transcribe_array_async(
+            window, language=self.language
+        )
+        cut = WINDOW_SECONDS - COMMIT_MARGIN_SECONDS
+        kept = [s for s in result.get("segments", []) if s.get("end", 0.0) <= cut]
+        if kept:
+            self._committed_text += "".join(s.get("text", "") for s in kept)
+            commit_seconds = kept[-1]["end"]
+        else:
+            self._committed_text += result.get("text", "") or ""
+            commit_seconds = WINDOW_SECONDS
+        self._committed_samples += max(1, int(commit_seconds * WHISPER_SAMPLE_RATE))
+        logger.debug(
+            "ストリーミング認識の確定を更新: %.1fs",
+            self._committed_samples / WHISPER_SAMPLE_RATE,
+        )
@@ -1,10 +1,30 @@
+import os
+import queue
 import subprocess
+import tempfile
+import threading
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+# Whisperが前提とするサンプリングレート（16kHzモノラル）
+WHISPER_SAMPLE_RATE = 16000
+# FFmpegの標準エラーを読む単位と、エラー報告用に残す末尾の長さ
+_STDERR_READ_BYTES = 4096
+_STDERR_TAIL_BYTES = 8192
 
 
 def _run(cmd: list[str]) -> str:
     return subprocess.check_output(cmd).decode("utf-8", errors="ignore")
 
 
+# 前処理フィルタ（先頭無音の除去 + 音量正規化）
+NORMALIZE_AUDIO_FILTERS = (
+    "silenceremove=start_periods=1:start_threshold=-35dB:start_silence=0.2:detection=peak,"
+    "loudnorm=I=-20:TP=-1.0:LRA=11"
+)
+
+
 def normalize_to_wav16k_mono(src: str, dst: str) -> None:
     _run(
         [
@@ -19,13 +39,299 @@ def normalize_to_wav16k_mono(src: str, dst: str) -> None:
             "-c:a",
             "pcm_s16le",
             "-af",
-            "silenceremove=start_periods=1:start_threshold=-35dB:start_silence=0.2:detection=peak,"
-            "loudnorm=I=-20:TP=-1.0:LRA=11",
+            NORMALIZE_AUDIO_FILTERS,
             dst,
         ]
     )
 
 
+def decode_audio_bytes(
+    data: bytes,
+    sample_rate: int = WHISPER_SAMPLE_RATE,
+    *,
+    normalize: bool = False,
+    max_seconds: Optional[float] = None,
+    seekable: bool = False,
+) -> np.ndarray:
+    """
+    音声データ（webm/wav/mp3/m4aなど）をメモリ上でデコードする
+
+    FFmpegの標準入力に音声バイト列を渡し、標準出力から
+    モノラルのfloat32 PCMを受け取る。一時ファイルは作らない。
+    録音途中の不完全なコンテナでも、デコードできた分だけを返す。
+
+    Args:
+        data: 音声ファイルのバイト列
+        sample_rate: 出力サンプリングレート
+        normalize: Trueなら前処理フィルタ（無音除去・音量正規化）も同時にかける
+        max_seconds: 指定した場合、この長さ（秒）でデコードを打ち切る
+        seekable: Trueなら一時ファイルに書いてから読ませる（moovがmdatより
+            後ろにあるMP4など、シークできないパイプではデコードできない入力用）
+
+    Returns:
+        np.ndarray: float32のモノラル音声配列（-1.0〜1.0）
+
+    Raises:
+        subprocess.CalledProcessError: 1サンプルもデコードできなかった場合
+    """
+    if seekable:
+        with tempfile.NamedTemporaryFile(suffix=".audio") as tmp:
+            tmp.write(data)
+            tmp.flush()
+            proc = subprocess.run(
+                _ffmpeg_decode_cmd(sample_rate, normalize, max_seconds, tmp.name),
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                check=False,
+            )
+    else:
+        proc = subprocess.run(
+            _ffmpeg_decode_cmd(sample_rate, normalize, max_seconds),
+            input=data,
+            capture_output=True,
+            check=False,
+        )
+    if proc.returncode != 0 and not proc.stdout:
+        raise subprocess.CalledProcessError(
+            proc.returncode, "ffmpeg", output=proc.stdout, stderr=proc.stderr
+        )
+    # frombufferは読み取り専用になるため、torchに渡せるようコピーする
+    return np.frombuffer(proc.stdout, dtype=np.float32).copy()
+
+
+def _ffmpeg_decode_cmd(
+    sample_rate: int,
+    normalize: bool,
+    max_seconds: Optional[float] = None,
+    source: str = "pipe:0",
+) -> list[str]:
+    """音声（既定は標準入力）を標準出力にfloat32 PCMで出すFFmpegコマンド"""
+    filters = ["-af", NORMALIZE_AUDIO_FILTERS] if normalize else []
+    # 出力側の -t で、上限を超えた分はデコードせずに終了する
+    limit = ["-t", f"{max_seconds:.3f}"] if max_seconds is not None else []
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-i",
+        source,
+        *filters,
+        *limit,
+        "-f",
+        "f32le",
+        "-ac",
+        "1",
+        "-ar",
+        str(sample_rate),
+        "pipe:1",
+    ]
+
+
+def decode_audio_stream(
+    chunks: Iterable[bytes],
+    sample_rate: int = WHISPER_SAMPLE_RATE,
+    *,
+    normalize: bool = False,
+    max_seconds: Optional[float] = None,
+) -> np.ndarray:
+    """
+    チャンク単位で届く音声データを受信しながらデコードする
+
+    受信したチャンクを別スレッドで順次FFmpegの標準入力に書き込み、
+    標準出力のPCMを読み続ける。ダウンロードの完了を待たずにデコードが
+    始まるため、転送とデコードが重なる。
+
+    Args:
+        chunks: 音声ファイルのバイト列を順に返すイテラブル（S3のBodyなど）
+        sample_rate: 出力サンプリングレート
+        normalize: Trueなら前処理フィルタ（無音除去・音量正規化）も同時にかける
+        max_seconds: 指定した場合、この長さ（秒）でデコードを打ち切る
+
+    Returns:
+        np.ndarray: float32のモノラル音声配列（-1.0〜1.0）
+
+    Raises:
+        subprocess.CalledProcessError: 1サンプルもデコードできなかった場合
+        Exception: チャンクの受信中に発生したエラー
+    """
+    proc = subprocess.Popen(
+        _ffmpeg_decode_cmd(sample_rate, normalize, max_seconds),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    feed_error: List[BaseException] = []
+
+    def feed() -> None:
+        try:
+            for chunk in chunks:
+                proc.stdin.write(chunk)
+        except BrokenPipeError:
+            # FFmpegが先に終了した（エラーは終了コードで判定する）
+            pass
+        except BaseException as e:  # 受信エラーは呼び出し元で再送出する
+            feed_error.append(e)
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    # 標準エラーも別スレッドで読み続ける（壊れた入力で警告が大量に出ても、
+    # パイプが詰まってFFmpegと互いに待ち合うことがないように）
+    stderr_tail = bytearray()
+
+    def drain_stderr() -> None:
+        while data := proc.stderr.read(_STDERR_READ_BYTES):
+            stderr_tail.extend(data)
+            del stderr_tail[:-_STDERR_TAIL_BYTES]
+
+    feeder = threading.Thread(target=feed, name="ffmpeg-feed", daemon=True)
+    drainer = threading.Thread(target=drain_stderr, name="ffmpeg-stderr", daemon=True)
+    feeder.start()
+    drainer.start()
+    pcm = proc.stdout.read()
+    returncode = proc.wait()
+    feeder.join()
+    drainer.join()
+    stderr = bytes(stderr_tail)
+
+    if feed_error:
+        raise feed_error[0]
+    if returncode != 0 and not pcm:
+        raise subprocess.CalledProcessError(
+            returncode, "ffmpeg", output=pcm, stderr=stderr
+        )
+    return np.frombuffer(pcm, dtype=np.float32).copy()
+
+
+class IncrementalAudioDecoder:
+    """
+    録音中に届くチャンクを1本のFFmpegプロセスで逐次デコードする
+
+    チャンクは書き込み用スレッドからFFmpegの標準入力に流し、標準出力のPCMは
+    読み取り用スレッドで溜めていく。届いた分だけを1回ずつデコードするため、
+    途中結果のたびに先頭から全体をデコードし直す必要がない。
+    確定済みで不要になった先頭のPCMは discard で捨てられる（位置は先頭からの
+    サンプル数で数え、捨てた後も変わらない）。
+
+    Args:
+        sample_rate: 出力サンプリングレート
+    """
+
+    # ストリーミング入力ではコンテナの解析に長く待たない（先頭から順に出力させる）
+    _STREAM_INPUT_OPTIONS = ["-probesize", "32768", "-analyzeduration", "0"]
+    _READ_SIZE = 64 * 1024
+
+    def __init__(self, sample_rate: int = WHISPER_SAMPLE_RATE) -> None:
+        self.sample_rate = sample_rate
+        self._proc: Optional[subprocess.Popen] = None
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._pcm = bytearray()
+        self._offset = 0  # 捨てたサンプル数
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    @property
+    def total_samples(self) -> int:
+        """デコード済みのサンプル数（捨てた分を含む）"""
+        with self._lock:
+            return self._offset + len(self._pcm) // 4
+
+    def feed(self, chunk: bytes) -> None:
+        """チャンクを追加する（書き込みは別スレッドで行うため待たない）"""
+        if self._closed:
+            raise ValueError("decoder is already closed")
+        if self._proc is None:
+            self._start()
+        self._chunks.put(chunk)
+
+    def read(self, start: int, end: Optional[int] = None) -> np.ndarray:
+        """start〜endサンプル目（endを省略すれば最後まで）のPCMを返す"""
+        with self._lock:
+            total = self._offset + len(self._pcm) // 4
+            end = total if end is None else min(end, total)
+            begin = max(start, self._offset)
+            if end <= begin:
+                return np.zeros(0, dtype=np.float32)
+            data = bytes(
+                self._pcm[(begin - self._offset) * 4 : (end - self._offset) * 4]
+            )
+        return np.frombuffer(data, dtype=np.float32).copy()
+
+    def discard(self, end: int) -> None:
+        """endサンプル目より前のPCMを捨てる（確定済みの部分のメモリを解放する）"""
+        with self._lock:
+            drop = min(max(0, end - self._offset), len(self._pcm) // 4)
+            del self._pcm[: drop * 4]
+            self._offset += drop
+
+    def close(self) -> int:
+        """
+        入力を閉じ、FFmpegが残りを出力し終えるまで待つ（ブロックする）
+
+        Returns:
+            int: 最終的なデコード済みサンプル数
+        """
+        if not self._closed:
+            self._closed = True
+            if self._proc is not None:
+                self._chunks.put(None)
+                for thread in self._threads:
+                    thread.join()
+                self._proc.wait()
+        return self.total_samples
+
+    def kill(self) -> None:
+        """FFmpegを止める（クライアント切断時など、結果が不要な場合）"""
+        self._closed = True
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+            self._chunks.put(None)
+            self._proc.wait()
+
+    def _start(self) -> None:
+        cmd = _ffmpeg_decode_cmd(self.sample_rate, normalize=False)
+        cmd[1:1] = self._STREAM_INPUT_OPTIONS
+        self._proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            # エラーは出力されたPCMの有無で判断するため、標準エラーは読まない
+            stderr=subprocess.DEVNULL,
+        )
+        self._threads = [
+            threading.Thread(
+                target=self._write, name="ffmpeg-stream-feed", daemon=True
+            ),
+            threading.Thread(target=self._read, name="ffmpeg-stream-read", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _write(self) -> None:
+        try:
+            while (chunk := self._chunks.get()) is not None:
+                self._proc.stdin.write(chunk)
+                self._proc.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            # FFmpegが先に終了した（デコードできた分だけを使う）
+            pass
+        finally:
+            try:
+                self._proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _read(self) -> None:
+        fd = self._proc.stdout.fileno()
+        while data := os.read(fd, self._READ_SIZE):
+            with self._lock:
+                self._pcm.extend(data)
+
+
 def ffprobe_duration_seconds(path: str) -> float:
     try:
         out = _run(
@@ -0,0 +1,229 @@
+"""
+音声コンテナのヘッダ解析
+
+デコード（FFmpeg）の前に、バイト列のヘッダだけから音声の長さを求める。
+サブプロセス（ffprobe）を起動せず、プロセス内で数十マイクロ秒で終わる。
+
+対応形式:
+- WAV: fmtチャンクのバイトレートとdataチャンクのサイズ
+- WebM/Matroska: SegmentInfoのDuration。MediaRecorderの録音のように
+  Durationがない場合は、ファイル全体があれば最後のブロックの時刻
+- MP4/M4A: moov/mvhdのduration（断片化MP4はmvex/mehd）。moovがmdatより
+  後ろにあるファイル（faststartでないもの）はパイプから読めないことも判定する
+
+長さが分からない場合（未対応形式・途中までのデータなど）はNoneを返す。
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class AudioHeader:
+    """ヘッダから分かった音声の情報"""
+
+    container: str  # "wav" / "webm" / "mp4" / "unknown"
+    duration_seconds: Optional[float]
+    # MP4でmoovがmdatより後ろにある（シークできない入力ではデコードできない）
+    moov_after_mdat: bool = False
+
+
+def probe_audio_header(data: bytes, *, complete: bool = True) -> AudioHeader:
+    """
+    音声ファイルのヘッダから形式と長さを求める
+
+    Args:
+        data: 音声ファイルのバイト列（先頭から）
+        complete: dataがファイル全体かどうか。Falseの場合は、ヘッダに
+            宣言された長さだけを使う（途中までの内容から推定しない）
+
+    Returns:
+        AudioHeader: 形式と長さ（秒、分からなければNone）
+    """
+    try:
+        if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+            return AudioHeader("wav", _wav_duration(data, complete))
+        if data[:4] == b"\x1a\x45\xdf\xa3":
+            return AudioHeader("webm", _webm_duration(data, complete))
+        if data[4:8] == b"ftyp":
+            return AudioHeader(
+                "mp4", _mp4_duration(data), moov_after_mdat=_mp4_moov_after_mdat(data)
+            )
+    except (struct.error, IndexError, ValueError):
+        # 壊れたヘッダは長さ不明として扱い、判定はデコード結果に任せる
+        pass
+    return AudioHeader("unknown", None)
+
+
+# -------------------------------------------------
+# WAV
+# -------------------------------------------------
+def _wav_duration(data: bytes, complete: bool) -> Optional[float]:
+    pos = 12
+    byte_rate = 0
+    while pos + 8 <= len(data):
+        chunk_id = data[pos : pos + 4]
+        (size,) = struct.unpack_from("<I", data, pos + 4)
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            (byte_rate,) = struct.unpack_from("<I", data, body + 8)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            available = len(data) - body
+            if size in (0, 0xFFFFFFFF) or (complete and size > available):
+                # 録音中に書き出したWAVはサイズが未確定のことがある
+                if not complete:
+                    return None
+                size = available
+            return size / byte_rate
+        pos = body + size + (size & 1)  # チャンクは2バイト境界に揃える
+    return None
+
+
+# -------------------------------------------------
+# WebM / Matroska（EBML）
+# -------------------------------------------------
+_EBML_SEGMENT = 0x18538067
+_EBML_INFO = 0x1549A966
+_EBML_TIMECODE_SCALE = 0x2AD7B1
+_EBML_DURATION = 0x4489
+_EBML_CLUSTER = 0x1F43B675
+_EBML_CLUSTER_TIMECODE = 0xE7
+_EBML_BLOCK_GROUP = 0xA0
+_EBML_BLOCK = 0xA1
+_EBML_SIMPLE_BLOCK = 0xA3
+
+# 中に入って子要素を読む要素（サイズ不明の要素もあるため、入れ子を平らに走査する）
+_EBML_MASTERS = {_EBML_SEGMENT, _EBML_INFO, _EBML_CLUSTER, _EBML_BLOCK_GROUP}
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool) -> Tuple[int, int, bool]:
+    """EBMLの可変長整数を読む（値, 次の位置, サイズ不明かどうか）"""
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        length += 1
+        mask >>= 1
+    if length > 8:
+        raise ValueError("invalid EBML vint")
+    value = first if keep_marker else first & (mask - 1)
+    for b in data[pos + 1 : pos + length]:
+        value = (value << 8) | b
+    if pos + length > len(data):
+        raise IndexError("truncated EBML vint")
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, pos + length, unknown
+
+
+def _ebml_elements(data: bytes) -> Iterator[Tuple[int, int, int]]:
+    """要素を (ID, 本体の開始位置, 本体のサイズ) の順に返す（途中で切れていれば終了）"""
+    pos = 0
+    while pos < len(data):
+        try:
+            element_id, pos, _ = _read_vint(data, pos, keep_marker=True)
+            size, pos, unknown = _read_vint(data, pos, keep_marker=False)
+        except IndexError:
+            return
+        if element_id in _EBML_MASTERS or unknown:
+            yield element_id, pos, 0
+            continue
+        if pos + size > len(data):
+            return
+        yield element_id, pos, size
+        pos += size
+
+
+def _read_uint(data: bytes, pos: int, size: int) -> int:
+    return int.from_bytes(data[pos : pos + size], "big")
+
+
+def _webm_duration(data: bytes, complete: bool) -> Optional[float]:
+    timecode_scale = 1_000_000  # ns（Matroskaの既定値）
+    duration = None
+    cluster_timecode = 0
+    last_timecode = None
+    for element_id, pos, size in _ebml_elements(data):
+        if element_id == _EBML_TIMECODE_SCALE:
+            timecode_scale = _read_uint(data, pos, size)
+        elif element_id == _EBML_DURATION:
+            fmt = ">f" if size == 4 else ">d"
+            (duration,) = struct.unpack_from(fmt, data, pos)
+        elif element_id == _EBML_CLUSTER_TIMECODE:
+            cluster_timecode = _read_uint(data, pos, size)
+        elif element_id in (_EBML_SIMPLE_BLOCK, _EBML_BLOCK):
+            # ブロック: トラック番号（vint）+ クラスタからの相対時刻（int16）
+            _, tc_pos, _ = _read_vint(data, pos, keep_marker=False)
+            (relative,) = struct.unpack_from(">h", data, tc_pos)
+            timecode = cluster_timecode + relative
+            if last_timecode is None or timecode > last_timecode:
+                last_timecode = timecode
+    if duration:
+        return duration * timecode_scale / 1e9
+    if complete and last_timecode is not None:
+        return last_timecode * timecode_scale / 1e9
+    return None
+
+
+# -------------------------------------------------
+# MP4 / M4A（ISO BMFF）
+# -------------------------------------------------
+def _mp4_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """ボックスを (種類, 本体の開始位置, 本体の終了位置) の順に返す"""
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack_from(">Q", data, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield box_type, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _full_box_duration(data: bytes, pos: int, v0: str, v1: str) -> Tuple[int, int]:
+    """mvhd/mehdのversionに応じてフィールドを読む"""
+    version = data[pos]
+    return struct.unpack_from(v1 if version == 1 else v0, data, pos + 4)
+
+
+def _mp4_duration(data: bytes) -> Optional[float]:
+    for box_type, start, end in _mp4_boxes(data, 0, len(data)):
+        if box_type != b"moov":
+            continue
+        timescale = duration = 0
+        for child, c_start, c_end in _mp4_boxes(data, start, end):
+            if child == b"mvhd":
+                # (作成時刻, 更新時刻,) timescale, duration
+                _, _, timescale, duration = _full_box_duration(
+                    data, c_start, ">IIII", ">QQIQ"
+                )
+            elif child == b"mvex" and not duration:
+                # 断片化MP4（録音ストリーム）はmvhdのdurationが0になる
+                for grandchild, g_start, _ in _mp4_boxes(data, c_start, c_end):
+                    if grandchild == b"mehd":
+                        (duration,) = _full_box_duration(data, g_start, ">I", ">Q")
+        if timescale and duration and duration != 0xFFFFFFFF:
+            return duration / timescale
+        return None
+    return None
+
+
+def _mp4_moov_after_mdat(data: bytes) -> bool:
+    """
+    トップレベルでmoovより先にmdatがあるか
+
+    mdatの中身は読まないため、ファイルの先頭（最初のチャンク）だけでも判定できる。
+    """
+    for box_type, _, _ in _mp4_boxes(data, 0, len(data)):
+        if box_type == b"moov":
+            return False
+        if box_type == b"mdat":
+            return True
+    return False
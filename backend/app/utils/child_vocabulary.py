@@ -9,12 +9,28 @@
 - 感情表現語彙の優先指定
 - 日常会話の認識精度向上
 - 子どもの発音特徴への対応
+- トークン数の上限に収めたプロンプトの事前コンパイル（キャッシュ）
 """
 
-from typing import List
+import os
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+logger = logging.getLogger(__name__)
+
+# Whisperのデコーダが初期プロンプトに使えるトークン数の上限
+# （n_text_ctx=448 の半分から開始トークン分を引いた値。超えた分は先頭から切り捨てられる）
+WHISPER_MAX_PROMPT_TOKENS = 223
+# 初期プロンプトのトークン予算（未設定時はデフォルト値を使用）
+DEFAULT_PROMPT_TOKEN_BUDGET = min(
+    int(os.getenv("WHISPER_PROMPT_TOKEN_BUDGET", "128")), WHISPER_MAX_PROMPT_TOKENS
+)
+# 自動適用する初期プロンプトの最適化レベル
+DEFAULT_PROMPT_LEVEL = os.getenv("WHISPER_PROMPT_LEVEL", "balanced")
+
 
 class PromptPriority(Enum):
     """プロンプトの優先度レベル（感情表現の重要度に基づく）"""
@@ -121,6 +137,169 @@ ALL_VOCABULARY_CATEGORIES = [
 ]
 
 
+# 最適化レベルごとの語彙数（generate_whisper_promptと同じ値）
+_VOCABULARY_LIMITS = {"precision": 15, "speed": 8, "balanced": 10}
+# コンパイル済みプロンプトの先頭に置く文脈文（語彙の並びだけより自然な文体になる）
+_PROMPT_CONTEXT = "今日は楽しい一日でした。ママと一緒にプールに行って遊びました。"
+
+
+# コンパイル済みプロンプトの文字列 -> トークン列（推論のたびにトークン化し直さないため）
+_COMPILED_PROMPT_TOKENS: Dict[str, Tuple[int, ...]] = {}
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """トークン予算に収めたコンパイル済みプロンプト"""
+
+    optimization_level: str  # 最適化レベル
+    text: str  # Whisperに渡すプロンプト文字列
+    tokens: Tuple[
+        int, ...
+    ]  # デコーダに渡すトークン列（トークナイザが使えない場合は空）
+    token_count: int  # トークン数（トークナイザが使えない場合は概算値）
+    token_budget: int  # 適用したトークン予算
+    words: Tuple[str, ...]  # 採用した語彙
+    dropped_words: Tuple[str, ...]  # 予算超過で外した語彙
+
+
+@lru_cache(maxsize=1)
+def _get_tokenizer():
+    """Whisperの多言語トークナイザを取得（使えない環境ではNone）"""
+    try:
+        from whisper.tokenizer import get_tokenizer
+    except ImportError:
+        logger.warning("Whisperトークナイザが使えないため、トークン数を概算します")
+        return None
+    return get_tokenizer(multilingual=True)
+
+
+def _encode_prompt(text: str) -> Tuple[Tuple[int, ...], int]:
+    """
+    プロンプトをトークン化する
+
+    Whisperは初期プロンプトの先頭に空白を付けてエンコードするため、
+    同じ形でトークン数を数える。
+
+    Returns:
+        Tuple[Tuple[int, ...], int]: (トークン列, トークン数)
+    """
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        # 日本語は1文字あたり概ね1〜2トークンのため、UTF-8バイト数の半分で多めに見積もる
+        return (), len((" " + text.strip()).encode("utf-8")) // 2 + 1
+    tokens = tuple(tokenizer.encode(" " + text.strip()))
+    return tokens, len(tokens)
+
+
+def _prioritized_words(vocabulary_limit: int) -> List[str]:
+    """優先度の高いカテゴリから重複なしで語彙を取り出す"""
+    words: List[str] = []
+    for category in sorted(
+        ALL_VOCABULARY_CATEGORIES,
+        key=lambda c: list(PromptPriority).index(c.priority),
+    ):
+        for word in category.words:
+            if len(words) >= vocabulary_limit:
+                return words
+            if word not in words:
+                words.append(word)
+    return words
+
+
+def _build_prompt_text(words: List[str], with_context: bool) -> str:
+    """文脈文と語彙からプロンプト文字列を組み立てる"""
+    vocabulary_text = "、".join(words) + "。" if words else ""
+    return (_PROMPT_CONTEXT if with_context else "") + vocabulary_text
+
+
+@lru_cache(maxsize=None)
+def compile_whisper_prompt(
+    optimization_level: str = "balanced",
+    token_budget: Optional[int] = None,
+) -> CompiledPrompt:
+    """
+    トークン予算に収めた初期プロンプトをコンパイルする（レベルごとにキャッシュ）
+
+    generate_whisper_promptの指示文はデコーダのプロンプト上限を超えて
+    切り捨てられるうえ、毎回トークン化し直すコストがかかる。
+    ここでは語彙の優先度順に予算内に収まる分だけを採用し、
+    結果をレベルごとに1度だけ作って使い回す。
+
+    Args:
+        optimization_level: 最適化レベル（"speed" / "balanced" / "precision"）
+        token_budget: トークン予算（未指定ならWHISPER_PROMPT_TOKEN_BUDGET）
+
+    Returns:
+        CompiledPrompt: コンパイル済みプロンプト
+    """
+    budget = min(
+        token_budget if token_budget is not None else DEFAULT_PROMPT_TOKEN_BUDGET,
+        WHISPER_MAX_PROMPT_TOKENS,
+    )
+    vocabulary_limit = _VOCABULARY_LIMITS.get(
+        optimization_level, _VOCABULARY_LIMITS["balanced"]
+    )
+    candidates = _prioritized_words(vocabulary_limit)
+    critical_words = set(CRITICAL_VOCABULARY.words)
+
+    # 最重要語彙 → 文脈文 → それ以外の語彙の順に、予算に収まるものだけ採用する
+    words: List[str] = []
+    dropped: List[str] = []
+    with_context = False
+    for word in [w for w in candidates if w in critical_words]:
+        if _encode_prompt(_build_prompt_text(words + [word], False))[1] <= budget:
+            words.append(word)
+        else:
+            dropped.append(word)
+    if _encode_prompt(_build_prompt_text(words, True))[1] <= budget:
+        with_context = True
+    for word in [w for w in candidates if w not in critical_words]:
+        if (
+            _encode_prompt(_build_prompt_text(words + [word], with_context))[1]
+            <= budget
+        ):
+            words.append(word)
+        else:
+            dropped.append(word)
+
+    text = _build_prompt_text(words, with_context)
+    tokens, token_count = _encode_prompt(text)
+    if tokens:
+        _COMPILED_PROMPT_TOKENS[text] = tokens
+    if dropped:
+        logger.info(
+            "初期プロンプトの語彙を予算超過で除外: level=%s, budget=%s, dropped=%s",
+            optimization_level,
+            budget,
+            dropped,
+        )
+    return CompiledPrompt(
+        optimization_level=optimization_level,
+        text=text,
+        tokens=tokens,
+        token_count=token_count,
+        token_budget=budget,
+        words=tuple(words),
+        dropped_words=tuple(dropped),
+    )
+
+
+def compiled_prompt_tokens(text: Optional[str]) -> Optional[Tuple[int, ...]]:
+    """
+    コンパイル済みプロンプトのトークン列を返す
+
+    推論バックエンドはこのトークン列をそのままデコーダのプロンプトに渡し、
+    同じプロンプトを呼び出しごとにトークン化し直さない。
+
+    Returns:
+        Optional[Tuple[int, ...]]: コンパイル済みのプロンプトならトークン列、
+            それ以外（任意の文字列・トークナイザが使えない場合）はNone
+    """
+    if not text:
+        return None
+    return _COMPILED_PROMPT_TOKENS.get(text)
+
+
 def generate_whisper_prompt(optimization_level: str = "balanced") -> str:
     """
     Whisper用の最適化された初期プロンプトを生成
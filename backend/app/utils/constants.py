@@ -14,6 +14,10 @@ SUPPORTED_LANGUAGES = {"ja", "en"}
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 S3_UPLOAD_FOLDER = "voice-uploads"
 S3_PRESIGNED_URL_EXPIRY = 3600
+# S3イベント通知の転送元を検証する共有トークン（未設定ならS3イベント通知は受け付けない）
+S3_EVENT_WEBHOOK_TOKEN = os.getenv("S3_EVENT_WEBHOOK_TOKEN")
+# 管理用API（Whisperモデルの切り替え）の共有トークン（未設定なら管理用APIは無効）
+WHISPER_ADMIN_TOKEN = os.getenv("WHISPER_ADMIN_TOKEN")
 
 # 感情強度のマッピング
 INTENSITY_MAPPING = {"low": 1, "medium": 2, "high": 3}
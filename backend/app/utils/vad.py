@@ -0,0 +1,199 @@
+"""
+エネルギーベースの音声区間検出（VAD）
+
+16kHzモノラルのfloat32配列をフレームごとの音量（dB）で判定し、
+発話区間を求める。Whisperに渡す前に長い無音を取り除くことで、
+子どもの発話に多い語尾や途中の間をエンコーダ・デコーダに通さずに済む。
+長い録音を並列認識するためのチャンク分割位置（無音の中央）もここで求める。
+処理はすべてNumPyのベクトル演算で行う。
+"""
+
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from app.utils.audio import WHISPER_SAMPLE_RATE
+
+# VAD設定（未設定時はデフォルト値を使用）
+VAD_ENABLED = os.getenv("WHISPER_VAD_ENABLED", "true").lower() == "true"
+# これより小さい音量のフレームは常に無音とみなす（dBFS）
+DEFAULT_THRESHOLD_DB = float(os.getenv("WHISPER_VAD_THRESHOLD_DB", "-45"))
+# 背景ノイズ（音量の下位10%）からこれだけ大きければ発話とみなす（dB）
+DEFAULT_NOISE_MARGIN_DB = 6.0
+FRAME_SECONDS = 0.03
+# これより短い無音は発話の一部として残す（息継ぎ・言いよどみ）
+MIN_SILENCE_SECONDS = float(os.getenv("WHISPER_VAD_MIN_SILENCE_SECONDS", "0.6"))
+# これより短い発話はノイズとして捨てる
+MIN_SPEECH_SECONDS = 0.1
+# 発話区間の前後に付ける余白（語頭・語尾の子音を切らないため）
+SPEECH_PAD_SECONDS = 0.2
+# 区間をつなぐときに挟む無音（Whisperが区切りを認識できるように残す）
+JOIN_GAP_SECONDS = 0.3
+
+SpeechRegion = Tuple[int, int]  # (開始サンプル, 終了サンプル)
+# (詰めた後の開始秒, 元の音声での開始秒, 長さ秒)
+TimelinePiece = Tuple[float, float, float]
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """真偽値配列のTrueが連続する区間の開始・終了インデックス"""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    diff = np.diff(padded)
+    return np.flatnonzero(diff == 1), np.flatnonzero(diff == -1)
+
+
+def frame_levels_db(
+    audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE
+) -> np.ndarray:
+    """フレームごとのRMS音量（dBFS）"""
+    frame = int(FRAME_SECONDS * sample_rate)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = audio[: n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def detect_speech_regions(
+    audio: np.ndarray,
+    sample_rate: int = WHISPER_SAMPLE_RATE,
+    *,
+    threshold_db: float = DEFAULT_THRESHOLD_DB,
+    min_silence_seconds: float = MIN_SILENCE_SECONDS,
+) -> List[SpeechRegion]:
+    """
+    発話区間を検出する
+
+    Args:
+        audio: 16kHzモノラルのfloat32音声配列
+        sample_rate: サンプリングレート
+        threshold_db: 無音とみなす音量の下限（dBFS）
+        min_silence_seconds: 区間を分ける最短の無音長
+
+    Returns:
+        List[SpeechRegion]: 発話区間（サンプル位置）のリスト。発話がなければ空
+    """
+    levels = frame_levels_db(audio, sample_rate)
+    if len(levels) == 0:
+        return []
+
+    noise_floor, loud = np.percentile(levels, [10, 90])
+    if loud - noise_floor >= DEFAULT_NOISE_MARGIN_DB:
+        threshold = max(threshold_db, float(noise_floor) + DEFAULT_NOISE_MARGIN_DB)
+    else:
+        # 音量の差がほとんどない（全体が発話、または全体が無音）場合は、
+        # 背景ノイズを推定できないため絶対値の下限だけで判定する
+        threshold = threshold_db
+    starts, ends = _runs(levels > threshold)
+    if len(starts) == 0:
+        return []
+
+    # 短い無音をはさんだ発話どうしは1つの区間にまとめる
+    min_silence = int(min_silence_seconds / FRAME_SECONDS)
+    keep_gap = (starts[1:] - ends[:-1]) >= min_silence
+    starts = np.concatenate((starts[:1], starts[1:][keep_gap]))
+    ends = np.concatenate((ends[:-1][keep_gap], ends[-1:]))
+
+    # 短すぎる発話（クリック音など）を捨てる
+    long_enough = (ends - starts) >= int(MIN_SPEECH_SECONDS / FRAME_SECONDS)
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    frame = int(FRAME_SECONDS * sample_rate)
+    pad = int(SPEECH_PAD_SECONDS * sample_rate)
+    regions: List[SpeechRegion] = []
+    for s, e in zip(starts * frame - pad, ends * frame + pad):
+        s, e = max(0, int(s)), min(len(audio), int(e))
+        if regions and s <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], e)
+        else:
+            regions.append((s, e))
+    return regions
+
+
+def trim_to_speech(
+    audio: np.ndarray,
+    regions: List[SpeechRegion],
+    sample_rate: int = WHISPER_SAMPLE_RATE,
+) -> Tuple[np.ndarray, List[TimelinePiece]]:
+    """
+    発話区間だけを短い無音でつないだ音声を作る
+
+    Returns:
+        Tuple[np.ndarray, List[TimelinePiece]]: 詰めた音声と、
+            詰めた後の時刻を元の時刻に戻すための対応表
+    """
+    gap = np.zeros(int(JOIN_GAP_SECONDS * sample_rate), dtype=np.float32)
+    pieces: List[np.ndarray] = []
+    timeline: List[TimelinePiece] = []
+    position = 0
+    for i, (s, e) in enumerate(regions):
+        if i:
+            pieces.append(gap)
+            position += len(gap)
+        timeline.append(
+            (position / sample_rate, s / sample_rate, (e - s) / sample_rate)
+        )
+        pieces.append(audio[s:e])
+        position += e - s
+    if not pieces:
+        return np.empty(0, dtype=np.float32), []
+    return np.concatenate(pieces).astype(np.float32, copy=False), timeline
+
+
+def to_original_time(t: float, timeline: List[TimelinePiece]) -> float:
+    """詰めた音声上の時刻を元の音声上の時刻に戻す"""
+    if not timeline:
+        return t
+    trimmed_starts = np.fromiter((p[0] for p in timeline), dtype=np.float64)
+    # つなぎの無音に落ちた時刻は直前の区間の末尾に寄せる
+    i = max(0, int(np.searchsorted(trimmed_starts, t, side="right")) - 1)
+    trimmed_start, original_start, length = timeline[i]
+    return original_start + min(max(t - trimmed_start, 0.0), length)
+
+
+def split_at_silences(
+    audio: np.ndarray,
+    target_seconds: float,
+    sample_rate: int = WHISPER_SAMPLE_RATE,
+) -> List[SpeechRegion]:
+    """
+    長い音声を無音の位置で目標長前後のチャンクに分割する
+
+    目標長の0.5〜1.5倍の範囲にある無音の中央で区切り、該当する無音が
+    なければ目標長の位置で区切る。チャンクは隙間なく音声全体を覆う。
+
+    Args:
+        audio: 16kHzモノラルのfloat32音声配列
+        target_seconds: チャンクの目標長（秒）
+        sample_rate: サンプリングレート
+
+    Returns:
+        List[SpeechRegion]: チャンク（サンプル位置）のリスト
+    """
+    total = len(audio)
+    target = int(target_seconds * sample_rate)
+    if total <= target * 1.5:
+        return [(0, total)]
+
+    # 区切り候補は短めの無音も含めて探す（発話の間の息継ぎ程度でもよい）
+    regions = detect_speech_regions(audio, sample_rate, min_silence_seconds=0.3)
+    cut_candidates = np.array(
+        [(e + s) // 2 for (_, e), (s, _) in zip(regions[:-1], regions[1:])],
+        dtype=np.int64,
+    )
+
+    chunks: List[SpeechRegion] = []
+    start = 0
+    while total - start > target * 1.5:
+        lo, hi = start + target // 2, start + target * 3 // 2
+        in_range = cut_candidates[(cut_candidates >= lo) & (cut_candidates <= hi)]
+        if len(in_range):
+            cut = int(in_range[np.argmin(np.abs(in_range - (start + target)))])
+        else:
+            cut = start + target
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, total))
+    return chunks
@@ -0,0 +1,111 @@
+"""
+保存済み音声の文字起こしを一括で再処理するCLI
+
+Whisperのモデルやプロンプトを変えたあとに、既存の記録（EmotionLog）の
+voice_note とテキストファイルを新しい設定で作り直す。
+中断しても、もう一度実行すればチェックポイントの続きから再開する。
+
+使い方:
+    docker compose exec backend python backfill_transcriptions.py --workers 1
+    docker compose exec backend python backfill_transcriptions.py --dry-run --limit 20
+    docker compose exec backend python backfill_transcriptions.py --model small --reset
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="保存済み音声の文字起こしを再処理する")
+    parser.add_argument("--model", help="Whisperモデル（既定: WHISPER_MODEL_SIZE）")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="認識ワーカーのプロセス数（既定: 1。稼働中のAPIと同じホストでは少なめに）",
+    )
+    parser.add_argument("--batch-size", type=int, help="1回に読む行数")
+    parser.add_argument(
+        "--writes-per-second", type=float, help="1秒あたりの書き込み件数の上限"
+    )
+    parser.add_argument("--checkpoint", help="チェックポイントファイルのパス")
+    parser.add_argument("--language", default="ja", choices=["ja", "en"])
+    parser.add_argument("--limit", type=int, help="今回処理する最大件数")
+    parser.add_argument(
+        "--reset", action="store_true", help="チェックポイントを無視して最初から処理"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="認識だけ行い、DBとS3は更新しない"
+    )
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> None:
+    """メイン関数"""
+    if not os.getenv("DATABASE_URL"):
+        print("❌ DATABASE_URLが設定されていません")
+        return
+
+    # ワーカー数とモデルはWhisperServiceの読み込み時に決まるため、先に環境変数へ設定する
+    os.environ["WHISPER_WORKERS"] = str(args.workers)
+    if args.model:
+        os.environ["WHISPER_MODEL_SIZE"] = args.model
+
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.services.s3 import S3Service
+    from app.services.transcription_backfill import (
+        BACKFILL_BATCH_SIZE,
+        BACKFILL_CHECKPOINT_PATH,
+        BACKFILL_WRITES_PER_SECOND,
+        TranscriptionBackfill,
+    )
+    from app.services.whisper import WhisperService
+
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    whisper_service = WhisperService()
+    s3_service = S3Service()
+
+    async def write_text(s3_key: str, text: str) -> None:
+        await asyncio.to_thread(s3_service.put_text_object, s3_key, text)
+
+    backfill = TranscriptionBackfill(
+        session_factory,
+        whisper_service,
+        write_text=write_text,
+        checkpoint_path=args.checkpoint or BACKFILL_CHECKPOINT_PATH,
+        batch_size=args.batch_size or BACKFILL_BATCH_SIZE,
+        writes_per_second=(
+            args.writes_per_second
+            if args.writes_per_second is not None
+            else BACKFILL_WRITES_PER_SECOND
+        ),
+        language=args.language,
+        dry_run=args.dry_run,
+    )
+    try:
+        await whisper_service.warm_up()
+        checkpoint = await backfill.run(reset=args.reset, limit=args.limit)
+        print(
+            f"✅ 再処理: {checkpoint.processed}件, 更新: {checkpoint.updated}件, "
+            f"失敗: {checkpoint.failed}件"
+            + ("" if checkpoint.finished else "（続きは再実行で再開）")
+        )
+    except Exception as e:
+        print(f"❌ 再処理中にエラーが発生しました: {e}")
+        raise
+    finally:
+        whisper_service.shutdown()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parse_args()))
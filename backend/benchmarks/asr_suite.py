@@ -0,0 +1,429 @@
+"""
+音声認識（WhisperService）のベンチマークスイート
+
+長さの異なる音声コーパスを、S3の代わりにメモリ上のスタブから
+WhisperService.transcribe_async に流し、構成ごとに次を計測する。
+
+- RTF（処理時間 ÷ 音声長）と、クリップごとの処理時間の P50 / P95 / P99
+- 段階ごとの処理時間（ダウンロード（スタブ）・FFmpeg・モデル）
+- ピークメモリ（APIプロセスと、ワーカー・FFmpegの子プロセスそれぞれの最大RSS）
+
+構成はモデルサイズ × 初期プロンプトの有無 × 前処理（FFmpegフィルタ・VAD）の有無
+× ワーカー数の組み合わせで、構成ごとに新しいプロセスで実行する
+（設定は環境変数で読み込まれるため）。結果はJSONで保存し、
+--baseline で以前の結果と比べて回帰を確認できる。
+
+段階ごとの時間を分けて測るため、S3のストリーミングデコードと
+音声認識結果キャッシュは無効にして実行する。
+
+使い方（backendディレクトリで実行）:
+    python -m benchmarks.asr_suite --models base small --workers 1 2 \\
+        --json result.json --baseline previous.json
+    # 実際の録音を使う場合
+    python -m benchmarks.asr_suite --files sample1.webm sample2.wav
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+import wave
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.audio import WHISPER_SAMPLE_RATE
+
+# 生成コーパスの既定の長さ（秒）
+DEFAULT_CLIP_SECONDS = (3.0, 10.0, 30.0, 90.0)
+# 回帰とみなす悪化の割合
+REGRESSION_THRESHOLD = 0.10
+
+Corpus = List[Tuple[str, bytes, float]]  # (S3キー, 音声データ, 長さ秒)
+
+
+# -------------------------------------------------
+# コーパス
+# -------------------------------------------------
+def synthesize_speech_like(seconds: float, seed: int = 0) -> np.ndarray:
+    """
+    発話に似た合成音声を作る
+
+    基本周波数と倍音を持つ短い音節を、単語間・文間の無音をはさんで並べる。
+    認識結果の正しさではなく、長さと発話・無音の比率を揃えるためのもの。
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * WHISPER_SAMPLE_RATE)
+    audio = np.zeros(total, dtype=np.float32)
+    pos = int(rng.uniform(0.2, 0.5) * WHISPER_SAMPLE_RATE)
+    while pos < total:
+        # 1単語 = 2〜5音節
+        for _ in range(rng.integers(2, 6)):
+            n = int(rng.uniform(0.12, 0.25) * WHISPER_SAMPLE_RATE)
+            if pos + n > total:
+                break
+            t = np.arange(n) / WHISPER_SAMPLE_RATE
+            f0 = rng.uniform(180, 320)  # 子どもの声の高さ
+            syllable = sum(
+                np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6)
+            ) * np.hanning(n)
+            audio[pos : pos + n] += (0.2 * syllable).astype(np.float32)
+            pos += n
+        # 単語間は短い間、ときどき長い間（文の区切り）
+        pause = rng.uniform(0.8, 1.5) if rng.random() < 0.2 else rng.uniform(0.1, 0.3)
+        pos += int(pause * WHISPER_SAMPLE_RATE)
+    audio += rng.normal(0.0, 0.002, total).astype(np.float32)
+    return np.clip(audio, -1.0, 1.0)
+
+
+def encode_wav(audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE) -> bytes:
+    """float32配列を16bit PCMのWAVにする"""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes((audio * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def build_corpus(
+    clip_seconds: List[float], files: Optional[List[str]] = None
+) -> Corpus:
+    """ファイル指定があればそれを、なければ合成音声のコーパスを作る"""
+    if files:
+        import whisper
+
+        corpus = []
+        for path in files:
+            with open(path, "rb") as f:
+                data = f.read()
+            seconds = len(whisper.load_audio(path)) / WHISPER_SAMPLE_RATE
+            corpus.append((f"bench/{os.path.basename(path)}", data, seconds))
+        return corpus
+    return [
+        (
+            f"bench/synth_{seconds:g}s.wav",
+            encode_wav(synthesize_speech_like(seconds, seed=i)),
+            seconds,
+        )
+        for i, seconds in enumerate(clip_seconds)
+    ]
+
+
+# -------------------------------------------------
+# S3スタブ
+# -------------------------------------------------
+class _StubBody:
+    def __init__(self, data: bytes) -> None:
+        self._buf = io.BytesIO(data)
+
+    def read(self) -> bytes:
+        return self._buf.read()
+
+    def iter_chunks(self, chunk_size: int):
+        while chunk := self._buf.read(chunk_size):
+            yield chunk
+
+    def close(self) -> None:
+        self._buf.close()
+
+
+class StubS3Client:
+    """
+    get_object だけを持つS3クライアントのスタブ
+
+    download_mbps を指定すると、その帯域での転送時間だけ待ってから返す。
+    """
+
+    def __init__(self, objects: Dict[str, bytes], download_mbps: float = 0.0):
+        self.objects = objects
+        self.download_mbps = download_mbps
+        self.seconds: Dict[str, float] = {}
+
+    def get_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        data = self.objects[Key]
+        if self.download_mbps > 0:
+            time.sleep(len(data) * 8 / (self.download_mbps * 1e6))
+        self.seconds[Key] = time.perf_counter() - t0
+        return {"Body": _StubBody(data), "ETag": f'"{hashlib.md5(data).hexdigest()}"'}
+
+
+# -------------------------------------------------
+# 計測（構成ごとに子プロセスで実行）
+# -------------------------------------------------
+def _config_env(config: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "WHISPER_MODEL_SIZE": config["model"],
+        "WHISPER_WORKERS": str(config["workers"]),
+        "WHISPER_AUTO_PROMPT": "true" if config["prompt"] else "false",
+        "WHISPER_AUDIO_PREPROCESS": "true" if config["preprocess"] else "false",
+        "WHISPER_VAD_ENABLED": "true" if config["preprocess"] else "false",
+        "WHISPER_AUTOTUNE": "false",
+        # 段階ごとに測るため、転送とデコードを重ねない
+        "S3_STREAM_DECODE": "false",
+        "TRANSCRIBE_CACHE_ENABLED": "false",
+        "S3_BUCKET_NAME": os.getenv("S3_BUCKET_NAME") or "benchmark-stub",
+    }
+
+
+def _set_env(env: Dict[str, str]) -> None:
+    os.environ.update(env)
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def _run_config(
+    config: Dict[str, Any], corpus: Corpus, repeat: int, download_mbps: float
+) -> Dict[str, Any]:
+    from app.services import whisper as whisper_module
+    from app.services.s3_async import AsyncS3Downloader
+    from app.services.whisper import WhisperService
+
+    stub = StubS3Client({key: data for key, data, _ in corpus}, download_mbps)
+    service = WhisperService()
+    service._s3 = AsyncS3Downloader(stub, service.bucket_name)
+
+    # FFmpegとモデルの処理時間をクリップごとに記録する
+    stage: Dict[str, float] = {}
+    decode = whisper_module._decode_for_model
+
+    def timed_decode(*args: Any) -> np.ndarray:
+        t0 = time.perf_counter()
+        try:
+            return decode(*args)
+        finally:
+            stage["ffmpeg"] = time.perf_counter() - t0
+
+    transcribe_chunked = service._transcribe_chunked
+
+    async def timed_transcribe(*args: Any) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        try:
+            return await transcribe_chunked(*args)
+        finally:
+            stage["model"] = time.perf_counter() - t0
+
+    whisper_module._decode_for_model = timed_decode
+    service._transcribe_chunked = timed_transcribe
+
+    t0 = time.perf_counter()
+    await service.warm_up()
+    warm_up_seconds = time.perf_counter() - t0
+
+    rows = []
+    for i in range(repeat):
+        for key, _, seconds in corpus:
+            stage.clear()
+            t0 = time.perf_counter()
+            result = await service.transcribe_async(key, language="ja")
+            elapsed = time.perf_counter() - t0
+            rows.append(
+                {
+                    "file": key,
+                    "round": i,
+                    "audio_seconds": round(seconds, 2),
+                    "latency_seconds": elapsed,
+                    "rtf": elapsed / seconds if seconds else None,
+                    "download_seconds": stub.seconds.get(key, 0.0),
+                    "ffmpeg_seconds": stage.get("ffmpeg", 0.0),
+                    "model_seconds": stage.get("model", 0.0),
+                    "text": result.get("text", ""),
+                }
+            )
+
+    service._pool.shutdown(wait=True)
+    latencies = [r["latency_seconds"] for r in rows]
+    total_audio = sum(r["audio_seconds"] for r in rows)
+
+    def stage_total(name: str) -> float:
+        return round(sum(r[f"{name}_seconds"] for r in rows), 3)
+
+    return {
+        **config,
+        "clips": len(rows),
+        "warm_up_seconds": round(warm_up_seconds, 2),
+        "rtf": round(sum(latencies) / total_audio, 4) if total_audio else None,
+        "latency_p50_seconds": round(percentile(latencies, 50), 3),
+        "latency_p95_seconds": round(percentile(latencies, 95), 3),
+        "latency_p99_seconds": round(percentile(latencies, 99), 3),
+        "stage_seconds": {
+            "download": stage_total("download"),
+            "ffmpeg": stage_total("ffmpeg"),
+            "model": stage_total("model"),
+        },
+        # Linuxのru_maxrssはKB単位（子プロセスは終了済みのものの最大値）
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "peak_rss_children_mb": round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1
+        ),
+        "files": [
+            {
+                **r,
+                "latency_seconds": round(r["latency_seconds"], 3),
+                "rtf": round(r["rtf"], 4) if r["rtf"] is not None else None,
+                "download_seconds": round(r["download_seconds"], 4),
+                "ffmpeg_seconds": round(r["ffmpeg_seconds"], 3),
+                "model_seconds": round(r["model_seconds"], 3),
+            }
+            for r in rows
+        ],
+    }
+
+
+def _measure_config(
+    config: Dict[str, Any], corpus: Corpus, repeat: int, download_mbps: float
+) -> Dict[str, Any]:
+    return asyncio.run(_run_config(config, corpus, repeat, download_mbps))
+
+
+# -------------------------------------------------
+# 結果の表示・比較
+# -------------------------------------------------
+def config_key(r: Dict[str, Any]) -> str:
+    return (
+        f"{r['model']}/prompt={'on' if r['prompt'] else 'off'}"
+        f"/pre={'on' if r['preprocess'] else 'off'}/w={r['workers']}"
+    )
+
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    print(
+        f"{'config':<34}{'RTF':>8}{'P50':>8}{'P95':>8}{'P99':>8}"
+        f"{'ffmpeg':>9}{'model':>9}{'RSS(MB)':>9}{'RSS子(MB)':>10}"
+    )
+    for r in results:
+        stages = r["stage_seconds"]
+        print(
+            f"{config_key(r):<34}{r['rtf'] or 0:>8.3f}"
+            f"{r['latency_p50_seconds']:>8.2f}{r['latency_p95_seconds']:>8.2f}"
+            f"{r['latency_p99_seconds']:>8.2f}{stages['ffmpeg']:>9.2f}"
+            f"{stages['model']:>9.2f}{r['peak_rss_mb']:>9.0f}"
+            f"{r['peak_rss_children_mb']:>10.0f}"
+        )
+
+
+def compare_with_baseline(
+    results: List[Dict[str, Any]], baseline: List[Dict[str, Any]]
+) -> List[str]:
+    """
+    以前の結果と比べ、RTFとP95が閾値以上悪化した構成を返す
+
+    Returns:
+        List[str]: 回帰の説明（なければ空）
+    """
+    previous = {config_key(r): r for r in baseline}
+    regressions = []
+    for r in results:
+        base = previous.get(config_key(r))
+        if base is None:
+            continue
+        for metric in ("rtf", "latency_p95_seconds"):
+            old, new = base.get(metric), r.get(metric)
+            if old and new and new > old * (1 + REGRESSION_THRESHOLD):
+                regressions.append(
+                    f"{config_key(r)}: {metric} {old} -> {new} (+{new / old - 1:.0%})"
+                )
+    return regressions
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Whisper音声認識のベンチマーク")
+    parser.add_argument("--models", nargs="+", default=["base"], help="モデル名")
+    parser.add_argument(
+        "--workers", nargs="+", type=int, default=[1], help="ワーカー数（0=スレッド）"
+    )
+    parser.add_argument(
+        "--prompt",
+        nargs="+",
+        choices=("on", "off"),
+        default=["on", "off"],
+        help="初期プロンプトの自動適用",
+    )
+    parser.add_argument(
+        "--preprocess",
+        nargs="+",
+        choices=("on", "off"),
+        default=["on", "off"],
+        help="前処理（FFmpegフィルタ・VAD）",
+    )
+    parser.add_argument(
+        "--clip-seconds",
+        nargs="+",
+        type=float,
+        default=list(DEFAULT_CLIP_SECONDS),
+        help="生成コーパスの音声の長さ（秒）",
+    )
+    parser.add_argument("--files", nargs="+", help="生成コーパスの代わりに使う音声")
+    parser.add_argument("--repeat", type=int, default=3, help="コーパスの繰り返し回数")
+    parser.add_argument(
+        "--download-mbps",
+        type=float,
+        default=0.0,
+        help="スタブのダウンロード帯域（Mbps、0なら待たない）",
+    )
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    parser.add_argument("--baseline", help="比較する以前の結果JSON")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.clip_seconds, args.files)
+    configs = [
+        {"model": m, "prompt": p == "on", "preprocess": pre == "on", "workers": w}
+        for m, p, pre, w in itertools.product(
+            args.models, args.prompt, args.preprocess, args.workers
+        )
+    ]
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for config in configs:
+        # 環境変数は読み込み時に固定されるため、構成ごとに新しいプロセスで計測
+        with ctx.Pool(1, initializer=_set_env, initargs=(_config_env(config),)) as p:
+            results.append(
+                p.apply(
+                    _measure_config, (config, corpus, args.repeat, args.download_mbps)
+                )
+            )
+        print(f"完了: {config_key(results[-1])}", file=sys.stderr)
+
+    _print_table(results)
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "corpus": [{"file": key, "audio_seconds": s} for key, _, s in corpus],
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(results, json.load(f)["results"])
+        for line in regressions:
+            print(f"回帰: {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
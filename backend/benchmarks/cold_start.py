@@ -0,0 +1,118 @@
+"""
+Whisperモデルの起動時間ベンチマーク
+
+チェックポイントからの通常の読み込み（whisper.load_model）と、
+変換済み重みキャッシュからのmmap読み込みを比べる。
+ページキャッシュやimportの影響を揃えるため、毎回新しいプロセスで計測し、
+読み込み時間・初回推論時間・ピークメモリ（最大RSS）を表示する。
+
+使い方（backendディレクトリで実行）:
+    python -m benchmarks.cold_start --model small --repeat 3 --json result.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.utils.audio import WHISPER_SAMPLE_RATE
+
+METHODS = ("load_model", "mmap_cache")
+
+
+def _measure_load(method: str, model_name: str) -> Dict[str, Any]:
+    """1つの方法でモデルを読み込み、1秒の無音で初回推論する（子プロセスで実行）"""
+    import whisper
+
+    from app.services.whisper_backends import load_weight_cache, weight_cache_path
+
+    t0 = time.perf_counter()
+    if method == "mmap_cache":
+        model = load_weight_cache(weight_cache_path(model_name))
+    else:
+        model = whisper.load_model(model_name, device="cpu")
+    load_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    model.transcribe(
+        np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), language="ja", fp16=False
+    )
+    first_inference_seconds = time.perf_counter() - t0
+
+    return {
+        "method": method,
+        "model": model_name,
+        "load_seconds": load_seconds,
+        "first_inference_seconds": first_inference_seconds,
+        # Linuxのru_maxrssはKB単位
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _prepare_cache(model_name: str) -> str:
+    """変換済み重みキャッシュがなければ作る（子プロセスで実行）"""
+    import whisper
+
+    from app.services.whisper_backends import save_weight_cache, weight_cache_path
+
+    path = weight_cache_path(model_name)
+    if not os.path.exists(path):
+        save_weight_cache(whisper.load_model(model_name, device="cpu"), path)
+    return path
+
+
+def _summarize(method: str, runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def median(key: str) -> float:
+        return round(statistics.median(r[key] for r in runs), 3)
+
+    return {
+        "method": method,
+        "runs": len(runs),
+        "load_seconds": median("load_seconds"),
+        "first_inference_seconds": median("first_inference_seconds"),
+        "peak_rss_mb": round(max(r["peak_rss_mb"] for r in runs), 1),
+    }
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Whisperモデルの起動時間の比較")
+    parser.add_argument("--model", default="base", help="モデル名（既定: base）")
+    parser.add_argument("--repeat", type=int, default=3, help="方法ごとの計測回数")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        cache_path = pool.apply(_prepare_cache, (args.model,))
+    print(f"重みキャッシュ: {cache_path}")
+
+    results = []
+    for method in METHODS:
+        runs = []
+        for _ in range(args.repeat):
+            # 毎回新しいプロセスで読み込む（ワーカー起動時と同じ条件）
+            with ctx.Pool(1) as pool:
+                runs.append(pool.apply(_measure_load, (method, args.model)))
+        results.append(_summarize(method, runs))
+
+    print(f"{'method':<14}{'load(s)':>10}{'1st infer(s)':>14}{'peak RSS(MB)':>15}")
+    for r in results:
+        print(
+            f"{r['method']:<14}{r['load_seconds']:>10.3f}"
+            f"{r['first_inference_seconds']:>14.3f}{r['peak_rss_mb']:>15.1f}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
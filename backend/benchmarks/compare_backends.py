@@ -0,0 +1,119 @@
+"""
+Whisper推論バックエンドの比較ベンチマーク
+
+同じ音声ファイル群を各バックエンドで認識し、RTF（処理時間 ÷ 音声長）と
+ピークメモリ（最大RSS）を並べて表示する。メモリを正しく測るため、
+バックエンドごとに別プロセスで実行する。
+
+使い方（backendディレクトリで実行）:
+    python -m benchmarks.compare_backends sample1.webm sample2.wav \\
+        --model base --backends openai faster-whisper --json result.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Any, Dict, List
+
+from app.services.whisper_backends import SUPPORTED_BACKENDS, load_backend
+from app.utils.audio import WHISPER_SAMPLE_RATE
+
+
+def _measure_backend(
+    backend: str, model_name: str, files: List[str], language: str
+) -> Dict[str, Any]:
+    """1つのバックエンドで全ファイルを認識して計測する（子プロセスで実行）"""
+    import whisper
+
+    t0 = time.perf_counter()
+    model = load_backend(model_name, backend)
+    load_seconds = time.perf_counter() - t0
+
+    rows = []
+    for path in files:
+        # デコード時間はバックエンドに依存しないため計測対象から外す
+        audio = whisper.load_audio(path)
+        audio_seconds = len(audio) / WHISPER_SAMPLE_RATE
+        t0 = time.perf_counter()
+        result = model.transcribe(
+            audio, language=language, initial_prompt=None, temperature=0.0, fp16=False
+        )
+        elapsed = time.perf_counter() - t0
+        rows.append(
+            {
+                "file": path,
+                "audio_seconds": round(audio_seconds, 2),
+                "elapsed_seconds": round(elapsed, 3),
+                "rtf": round(elapsed / audio_seconds, 4) if audio_seconds else None,
+                "text": result.get("text", ""),
+            }
+        )
+
+    total_audio = sum(r["audio_seconds"] for r in rows)
+    total_elapsed = sum(r["elapsed_seconds"] for r in rows)
+    return {
+        "backend": backend,
+        "model": model_name,
+        "load_seconds": round(load_seconds, 2),
+        # Linuxのru_maxrssはKB単位
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "rtf": round(total_elapsed / total_audio, 4) if total_audio else None,
+        "files": rows,
+    }
+
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'backend':<16}{'RTF':>10}{'peak RSS(MB)':>15}{'load(s)':>10}")
+    for r in results:
+        print(
+            f"{r['backend']:<16}{r['rtf'] or 0:>10.4f}"
+            f"{r['peak_rss_mb']:>15.1f}{r['load_seconds']:>10.2f}"
+        )
+    # テキストの差分を確認できるよう、ファイルごとの認識結果も出す
+    for i, row in enumerate(results[0]["files"] if results else []):
+        print(f"\n# {row['file']}")
+        for r in results:
+            print(f"  [{r['backend']}] {r['files'][i]['text']}")
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Whisperバックエンドの比較")
+    parser.add_argument("files", nargs="+", help="比較に使う音声ファイル")
+    parser.add_argument("--model", default="base", help="モデル名（既定: base）")
+    parser.add_argument("--language", default="ja", help="認識言語（既定: ja）")
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=list(SUPPORTED_BACKENDS),
+        choices=SUPPORTED_BACKENDS,
+        help="比較するバックエンド",
+    )
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    args = parser.parse_args(argv)
+
+    # バックエンドごとに新しいプロセスで計測（メモリ計測を混ぜないため）
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in args.backends:
+        with ctx.Pool(1) as pool:
+            results.append(
+                pool.apply(
+                    _measure_backend,
+                    (backend, args.model, args.files, args.language),
+                )
+            )
+
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
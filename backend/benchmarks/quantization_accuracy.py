@@ -0,0 +1,108 @@
+"""
+動的int8量子化の精度比較
+
+参照用の音声クリップを float32 モデルと動的int8量子化モデルの両方で認識し、
+文字誤り率（CER）・平均ログ確率・処理時間の差を表示する。
+音声ファイルと同じ名前の .txt（例: clip01.wav → clip01.txt）があれば
+それを正解文として使い、なければ float32 モデルの結果を正解とみなす。
+
+使い方（backendディレクトリで実行）:
+    python -m benchmarks.quantization_accuracy clips/*.wav --model base --json result.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services.whisper_backends import OpenAIWhisperBackend
+
+
+def character_error_rate(reference: str, hypothesis: str) -> float:
+    """文字誤り率（編集距離 ÷ 正解文の文字数）。空白は無視する"""
+    ref = "".join(reference.split())
+    hyp = "".join(hypothesis.split())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, rc in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, hc in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (rc != hc))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def _read_reference(audio_path: str) -> Optional[str]:
+    txt_path = os.path.splitext(audio_path)[0] + ".txt"
+    if not os.path.exists(txt_path):
+        return None
+    with open(txt_path, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def _run(backend: OpenAIWhisperBackend, audio, language: str) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    result = backend.transcribe(
+        audio, language=language, initial_prompt=None, temperature=0.0, fp16=False
+    )
+    elapsed = time.perf_counter() - t0
+    logprobs = [s["avg_logprob"] for s in result.get("segments", [])]
+    return {
+        "text": result.get("text", "").strip(),
+        "avg_logprob": sum(logprobs) / len(logprobs) if logprobs else None,
+        "elapsed_seconds": elapsed,
+    }
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="動的int8量子化の精度比較")
+    parser.add_argument("files", nargs="+", help="参照用の音声クリップ")
+    parser.add_argument("--model", default="base", help="モデル名（既定: base）")
+    parser.add_argument("--language", default="ja", help="認識言語（既定: ja）")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    args = parser.parse_args(argv)
+
+    import whisper
+
+    float_backend = OpenAIWhisperBackend(args.model, quantize=False).load()
+    int8_backend = OpenAIWhisperBackend(args.model, quantize=True).load()
+
+    rows = []
+    for path in args.files:
+        audio = whisper.load_audio(path)
+        fp32 = _run(float_backend, audio, args.language)
+        int8 = _run(int8_backend, audio, args.language)
+        reference = _read_reference(path)
+        ref_text = reference if reference is not None else fp32["text"]
+        row = {
+            "file": path,
+            "reference": "file" if reference is not None else "float32",
+            "cer_float32": round(character_error_rate(ref_text, fp32["text"]), 4),
+            "cer_int8": round(character_error_rate(ref_text, int8["text"]), 4),
+            "avg_logprob_float32": fp32["avg_logprob"],
+            "avg_logprob_int8": int8["avg_logprob"],
+            "speedup": round(fp32["elapsed_seconds"] / int8["elapsed_seconds"], 2),
+            "text_float32": fp32["text"],
+            "text_int8": int8["text"],
+        }
+        rows.append(row)
+        print(
+            f"{path}: CER {row['cer_float32']:.4f} -> {row['cer_int8']:.4f} "
+            f"(delta {row['cer_int8'] - row['cer_float32']:+.4f}), "
+            f"speedup x{row['speedup']}"
+        )
+
+    if rows:
+        mean_delta = sum(r["cer_int8"] - r["cer_float32"] for r in rows) / len(rows)
+        print(f"\n平均CER差分（int8 - float32）: {mean_delta:+.4f}（{len(rows)}件）")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
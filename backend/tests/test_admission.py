@@ -0,0 +1,174 @@
+"""
+音声認識の受付制御のテスト
+
+テスト対象:
+- 同時実行数の上限と待ち行列
+- 推定待ち時間による429判定（Retry-After）
+- 枠を確保しない事前確認（precheck）
+- AIMDによる同時実行数の調整
+- 優先クラスを調べた後、受付待ちの前にDB接続を返すこと
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+from app.api.v1.endpoints import voice
+from app.services.admission import AdmissionController, TranscriptionOverloadedError
+from app.services.fair_scheduler import PriorityClass
+
+
+class TestAdmissionController:
+    """受付制御のテストクラス"""
+
+    def test_waits_for_free_slot_within_limit(self):
+        """上限を超えた分は枠が空くまで待ってから実行される"""
+        controller = AdmissionController(
+            1, deadline_seconds=5.0, target_latency_seconds=1.0
+        )
+        order = []
+
+        async def job(name: str):
+            async with controller.slot():
+                order.append(f"start:{name}")
+                await asyncio.sleep(0.01)
+                order.append(f"end:{name}")
+
+        async def main():
+            await asyncio.gather(job("a"), job("b"))
+
+        asyncio.run(main())
+
+        assert order == ["start:a", "end:a", "start:b", "end:b"]
+        assert controller.in_flight == 0
+        assert controller.admitted == 2
+
+    def test_rejects_when_estimated_wait_exceeds_deadline(self):
+        """推定待ち時間が期限を超えるとRetry-After付きで断る"""
+        # 1件あたり3秒の見込みで、期限5秒なら待てるのは1件まで
+        controller = AdmissionController(
+            1, deadline_seconds=5.0, target_latency_seconds=3.0
+        )
+
+        async def main():
+            release = asyncio.Event()
+
+            async def hold():
+                async with controller.slot():
+                    await release.wait()
+
+            running = asyncio.create_task(hold())
+            waiting = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            assert controller.waiting == 1
+
+            with pytest.raises(TranscriptionOverloadedError) as exc_info:
+                async with controller.slot():
+                    pass
+            release.set()
+            await asyncio.gather(running, waiting)
+            return exc_info.value
+
+        error = asyncio.run(main())
+
+        assert error.retry_after == 6
+        assert controller.rejected == 1
+
+    def test_rejects_when_queue_is_full(self):
+        """待ち行列が上限に達すると断る"""
+        controller = AdmissionController(
+            1, max_waiting=0, deadline_seconds=60.0, target_latency_seconds=1.0
+        )
+
+        async def main():
+            async with controller.slot():
+                with pytest.raises(TranscriptionOverloadedError):
+                    async with controller.slot():
+                        pass
+
+        asyncio.run(main())
+
+    def test_precheck_does_not_take_slot(self):
+        """事前確認は枠を確保せず、並んでも断られる状態のときだけ断る"""
+        controller = AdmissionController(1, max_waiting=0)
+
+        controller.precheck()
+        assert controller.in_flight == 0
+
+        async def main():
+            async with controller.slot():
+                with pytest.raises(TranscriptionOverloadedError):
+                    controller.precheck()
+
+        asyncio.run(main())
+
+        assert controller.in_flight == 0
+        assert controller.rejected == 1
+
+    def test_aimd_increases_and_decreases_limit(self):
+        """目標以内なら上限を少しずつ上げ、超えたら乗算で下げる"""
+        controller = AdmissionController(2, max_limit=8, target_latency_seconds=1.0)
+
+        # 目標以内の処理がおおむね上限の件数ぶん終わるごとに1増える
+        for _ in range(3):
+            controller._started += 1
+            controller._observe(0.1, controller._started)
+        assert controller.limit == 3
+
+        controller._started += 1
+        controller._observe(2.0, controller._started)
+        assert controller.limit == 2  # 3.2 * 0.7 = 2.3
+
+        # 縮小前に始まっていた処理の遅延では二重に下げない
+        controller._observe(2.0, controller._started)
+        assert controller.limit == 2
+
+    def test_failed_work_releases_slot(self):
+        """処理が失敗しても枠は解放される"""
+        controller = AdmissionController(1)
+
+        async def main():
+            with pytest.raises(RuntimeError):
+                async with controller.slot():
+                    raise RuntimeError("boom")
+
+        asyncio.run(main())
+
+        assert controller.in_flight == 0
+
+
+class _FakeResult:
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class _FakeSession:
+    """executeとcloseの呼び出しを記録するAsyncSessionの代わり"""
+
+    def __init__(self, is_paid: bool) -> None:
+        self.is_paid = is_paid
+        self.calls = []
+
+    async def execute(self, stmt):
+        self.calls.append("execute")
+        return _FakeResult(self.is_paid)
+
+    async def close(self):
+        self.calls.append("close")
+
+
+class TestTranscribePriority:
+    """音声認識の優先クラス判定のテストクラス"""
+
+    def test_connection_is_released_after_lookup(self):
+        """プランを調べたらすぐセッションを閉じ、接続を持ったまま待たない"""
+        session = _FakeSession(is_paid=True)
+
+        priority = asyncio.run(voice._transcribe_priority(session, uuid.uuid4()))
+
+        assert priority is PriorityClass.PAID
+        assert session.calls == ["execute", "close"]
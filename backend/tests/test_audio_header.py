@@ -0,0 +1,233 @@
+"""
+音声ヘッダ解析と入力上限のテスト
+
+テスト対象:
+- WAV / WebM / MP4 のヘッダからの長さの取得
+- プランごとの上限による切り詰め・拒否の判定
+- moovが末尾にあるMP4の一時ファイル経由のデコード
+"""
+
+import io
+import shutil
+import struct
+import subprocess
+import wave
+
+import numpy as np
+import pytest
+
+from app.services import whisper as whisper_module
+from app.services.fair_scheduler import PriorityClass
+from app.services.transcription_limits import (
+    AudioLimitExceededError,
+    TranscriptionLimits,
+    limits_for_priority,
+)
+from app.utils.audio_header import AudioHeader, probe_audio_header
+
+
+def _wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buf.getvalue()
+
+
+def _ebml(element_id: bytes, payload: bytes, unknown_size: bool = False) -> bytes:
+    # サイズは8バイトのvintで書く（0x01 + 7バイト）
+    size = (1 << 56) - 1 if unknown_size else len(payload)
+    return element_id + bytes([0x01]) + size.to_bytes(7, "big") + payload
+
+
+def _webm(duration_ms=None, block_times=()) -> bytes:
+    """MediaRecorder風のWebM（Durationなし・サイズ不明のSegment/Cluster）"""
+    info = _ebml(b"\x2a\xd7\xb1", (1_000_000).to_bytes(3, "big"))
+    if duration_ms is not None:
+        info += _ebml(b"\x44\x89", struct.pack(">d", duration_ms))
+    cluster = _ebml(b"\xe7", (0).to_bytes(2, "big"))
+    for t in block_times:
+        # トラック番号1 + 相対時刻 + フラグ + ダミーのフレーム
+        cluster += _ebml(b"\xa3", b"\x81" + struct.pack(">hB", t, 0x80) + b"\x00" * 8)
+    segment = _ebml(b"\x15\x49\xa9\x66", info) + _ebml(
+        b"\x1f\x43\xb6\x75", cluster, unknown_size=True
+    )
+    return _ebml(b"\x1a\x45\xdf\xa3", b"\x42\x82\x84webm") + _ebml(
+        b"\x18\x53\x80\x67", segment, unknown_size=True
+    )
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _m4a(seconds: float, timescale: int = 44100, mdat: bytes = b"") -> bytes:
+    """mdatを渡すとmoovより前に置く（faststartでないファイル）"""
+    mvhd = _box(b"mvhd", b"\x00\x00\x00\x00" + struct.pack(">IIII", 0, 0, timescale, 0))
+    mvhd = mvhd[:-4] + struct.pack(">I", int(seconds * timescale))
+    media = _box(b"mdat", mdat) if mdat else b""
+    return _box(b"ftyp", b"M4A \x00\x00\x00\x00") + media + _box(b"moov", mvhd)
+
+
+class TestAudioHeader:
+    """音声ヘッダ解析のテストクラス"""
+
+    def test_wav_duration_from_data_chunk(self):
+        """WAVはバイトレートとdataチャンクのサイズから長さを求める"""
+        header = probe_audio_header(_wav(2.5))
+
+        assert header.container == "wav"
+        assert header.duration_seconds == pytest.approx(2.5)
+
+    def test_webm_duration_element(self):
+        """WebMはSegmentInfoのDurationを使う"""
+        header = probe_audio_header(_webm(duration_ms=12_500.0), complete=False)
+
+        assert header.container == "webm"
+        assert header.duration_seconds == pytest.approx(12.5)
+
+    def test_webm_without_duration_uses_last_block(self):
+        """Durationがなければ、ファイル全体の最後のブロック時刻を使う"""
+        data = _webm(block_times=(0, 20, 9_980))
+
+        assert probe_audio_header(data).duration_seconds == pytest.approx(9.98)
+        # 途中までのデータでは推定しない
+        assert probe_audio_header(data, complete=False).duration_seconds is None
+
+    def test_m4a_duration_from_mvhd(self):
+        """M4Aはmoov/mvhdのdurationとtimescaleから長さを求める"""
+        header = probe_audio_header(_m4a(42.0))
+
+        assert header.container == "mp4"
+        assert header.duration_seconds == pytest.approx(42.0)
+
+    def test_m4a_moov_after_mdat(self):
+        """moovがmdatより後ろにあることは、先頭のチャンクだけでも分かる"""
+        data = _m4a(42.0, mdat=b"\x00" * 1000)
+
+        assert probe_audio_header(data).moov_after_mdat
+        assert probe_audio_header(data).duration_seconds == pytest.approx(42.0)
+        assert probe_audio_header(data[:64], complete=False).moov_after_mdat
+        assert not probe_audio_header(_m4a(42.0)).moov_after_mdat
+
+    def test_unknown_or_broken_input(self):
+        """未対応形式や壊れたヘッダは長さ不明として扱う"""
+        assert probe_audio_header(b"ID3\x04garbage").duration_seconds is None
+        assert probe_audio_header(_wav(1.0)[:20]).duration_seconds is None
+
+
+class TestTranscriptionLimits:
+    """入力上限のテストクラス"""
+
+    def test_truncate_mode_allows_long_audio(self):
+        """切り詰めモードでは上限の長さまでデコードする"""
+        limits = TranscriptionLimits(max_seconds=60, truncate=True)
+
+        assert limits.check_header(AudioHeader("wav", 120.0))
+        assert not limits.check_header(AudioHeader("wav", 30.0))
+        assert limits.decode_seconds == 60
+
+    def test_reject_mode_raises_before_decode(self):
+        """拒否モードではヘッダの長さが上限を超えたら例外"""
+        limits = TranscriptionLimits(max_seconds=60, truncate=False)
+
+        with pytest.raises(AudioLimitExceededError) as e:
+            limits.check_header(AudioHeader("webm", 600.0))
+        assert e.value.error_code == "AUDIO_TOO_LONG"
+        # 長さ不明ならデコード結果で判定する（上限より長めにデコード）
+        assert not limits.check_header(AudioHeader("unknown", None))
+        assert limits.decode_seconds > 60
+        with pytest.raises(AudioLimitExceededError):
+            limits.check_decoded(limits.decode_seconds)
+
+    def test_size_limit(self):
+        """サイズが上限を超えたら例外"""
+        limits = TranscriptionLimits(max_bytes=1_000)
+
+        limits.check_size(1_000)
+        with pytest.raises(AudioLimitExceededError) as e:
+            limits.check_size(1_001)
+        assert e.value.error_code == "AUDIO_TOO_LARGE"
+
+    def test_paid_plan_has_higher_limits(self):
+        """有料プランは無料・トライアルより長い音声を受け付ける"""
+        paid = limits_for_priority(PriorityClass.PAID)
+        standard = limits_for_priority(PriorityClass.STANDARD)
+
+        assert paid.max_seconds > standard.max_seconds
+        assert paid.max_bytes > standard.max_bytes
+
+
+class TestMp4Decode:
+    """moovが末尾にあるMP4のデコードのテストクラス"""
+
+    def _record_decodes(self, monkeypatch, pipe_fails: bool):
+        calls = []
+
+        def decode(data, *, normalize, max_seconds, seekable=False):
+            calls.append(seekable)
+            if pipe_fails and not seekable:
+                raise subprocess.CalledProcessError(1, "ffmpeg", stderr=b"moov")
+            return np.zeros(16000, np.float32)
+
+        monkeypatch.setattr(whisper_module, "decode_audio_bytes", decode)
+        return calls
+
+    def test_moov_after_mdat_uses_temp_file(self, monkeypatch):
+        """moovがmdatより後ろなら、パイプを試さずに一時ファイルから読む"""
+        calls = self._record_decodes(monkeypatch, pipe_fails=False)
+
+        whisper_module._decode_for_model(_m4a(1.0, mdat=b"\x00" * 100))
+
+        assert calls == [True]
+
+    def test_mp4_pipe_failure_retries_with_temp_file(self, monkeypatch):
+        """MP4をパイプでデコードできなければ一時ファイルでやり直す"""
+        calls = self._record_decodes(monkeypatch, pipe_fails=True)
+
+        whisper_module._decode_for_model(_m4a(1.0))
+
+        assert calls == [False, True]
+
+    def test_other_formats_do_not_use_temp_file(self, monkeypatch):
+        """MP4以外はパイプのみ（失敗すればデコードエラー）"""
+        calls = self._record_decodes(monkeypatch, pipe_fails=True)
+
+        with pytest.raises(whisper_module.WhisperTranscriptionError):
+            whisper_module._decode_for_model(_wav(1.0))
+
+        assert calls == [False, False]  # 前処理ありとなしで1回ずつ
+
+    @pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpegが必要")
+    def test_decode_real_mp4_with_moov_at_end(self, tmp_path):
+        """faststartでないM4Aも、一括・ストリーミングのどちらでもデコードできる"""
+        path = tmp_path / "moov_at_end.m4a"
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-loglevel",
+                "error",
+                "-f",
+                "lavfi",
+                "-i",
+                "sine=frequency=440:duration=2",
+                "-c:a",
+                "aac",
+                str(path),
+            ],
+            check=True,
+        )
+        data = path.read_bytes()
+        assert probe_audio_header(data[:4096], complete=False).moov_after_mdat
+
+        audio = whisper_module._decode_for_model_plain(data)
+        streamed, received = whisper_module._decode_stream_for_model(
+            [data[i : i + 4096] for i in range(0, len(data), 4096)]
+        )
+
+        assert len(audio) / 16000 == pytest.approx(2.0, abs=0.1)
+        assert len(streamed) / 16000 == pytest.approx(2.0, abs=0.1)
+        assert received == len(data)
@@ -0,0 +1,56 @@
+"""
+推論ワーカー配置のテスト
+
+テスト対象:
+- 論理CPUの物理コアへのまとめ
+- ワーカーへのコアの割り当てとスレッド数
+"""
+
+from app.services import cpu_topology
+from app.services.cpu_topology import physical_cores, plan_placement
+
+
+def _write_topology(root, cpu: int, package: int, core: int) -> None:
+    topology = root / f"cpu{cpu}" / "topology"
+    topology.mkdir(parents=True)
+    (topology / "physical_package_id").write_text(f"{package}\n")
+    (topology / "core_id").write_text(f"{core}\n")
+
+
+class TestCpuTopology:
+    """推論ワーカー配置のテストクラス"""
+
+    def test_groups_smt_siblings_into_physical_cores(self, tmp_path, monkeypatch):
+        """同じ物理コアのSMTスレッドは1つのコアにまとめる"""
+        # 2コア4スレッド（cpu0/cpu2 と cpu1/cpu3 が兄弟）
+        for cpu in range(4):
+            _write_topology(tmp_path, cpu, package=0, core=cpu % 2)
+        monkeypatch.setattr(cpu_topology, "_SYS_CPU_DIR", str(tmp_path))
+
+        assert physical_cores([0, 1, 2, 3]) == [(0, 2), (1, 3)]
+
+    def test_missing_topology_treats_each_cpu_as_core(self, tmp_path, monkeypatch):
+        """トポロジー情報がなければ論理CPU1つを1コアとみなす"""
+        monkeypatch.setattr(cpu_topology, "_SYS_CPU_DIR", str(tmp_path))
+
+        assert physical_cores([0, 1]) == [(0,), (1,)]
+
+    def test_partitions_cores_without_overlap(self):
+        """ワーカーごとに重ならない物理コアを割り当て、スレッド数はコア数"""
+        cores = [(0, 4), (1, 5), (2, 6), (3, 7)]
+
+        placement = plan_placement(2, cores=cores)
+
+        assert placement.torch_threads == 2
+        assert placement.core_sets == ((0, 4, 1, 5), (2, 6, 3, 7))
+
+    def test_more_workers_than_cores_reuses_cores(self):
+        """ワーカー数がコア数より多い場合はコアを使い回す"""
+        placement = plan_placement(3, cores=[(0,), (1,)])
+
+        assert placement.torch_threads == 1
+        assert placement.core_sets == ((0,), (1,), (0,))
+
+    def test_explicit_thread_count_is_kept(self):
+        """スレッド数を指定した場合はそれを使う"""
+        assert plan_placement(2, 3, cores=[(0,), (1,)]).torch_threads == 3
@@ -0,0 +1,92 @@
+"""
+音声認識の公平スケジューラのテスト
+
+テスト対象:
+- ユーザーごとのラウンドロビン
+- 優先クラス間の重み付きラウンドロビン
+- 待ち行列の上限とクラスごとの待ち時間統計
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.fair_scheduler import (
+    FairScheduler,
+    PriorityClass,
+    priority_for_subscription,
+)
+
+
+def _drain(scheduler: FairScheduler) -> list:
+    items = []
+    while not scheduler.empty():
+        items.append(scheduler.pop_nowait())
+    return items
+
+
+class TestFairScheduler:
+    """公平スケジューラのテストクラス"""
+
+    def test_round_robin_between_users(self):
+        """まとめて投入したユーザーがいても、他のユーザーと交互に取り出す"""
+        scheduler = FairScheduler()
+        for i in range(4):
+            scheduler.put_nowait(f"bulk-{i}", user_key="bulk")
+        scheduler.put_nowait("other-0", user_key="other")
+
+        assert _drain(scheduler) == ["bulk-0", "other-0", "bulk-1", "bulk-2", "bulk-3"]
+
+    def test_paid_class_is_weighted_but_standard_is_not_starved(self):
+        """有料プランを重みぶん多く取り出し、無料プランも必ず処理する"""
+        scheduler = FairScheduler(
+            weights={PriorityClass.PAID: 3, PriorityClass.STANDARD: 1}
+        )
+        for i in range(6):
+            scheduler.put_nowait(
+                f"p{i}", user_key=f"paid-{i}", priority=PriorityClass.PAID
+            )
+            scheduler.put_nowait(f"s{i}", user_key=f"free-{i}")
+
+        first_eight = _drain(scheduler)[:8]
+
+        assert sum(item.startswith("p") for item in first_eight) == 6
+        assert sum(item.startswith("s") for item in first_eight) == 2
+
+    def test_put_raises_when_full(self):
+        """上限に達したら投入できない"""
+        scheduler = FairScheduler(maxsize=1)
+        scheduler.put_nowait("a")
+
+        with pytest.raises(asyncio.QueueFull):
+            scheduler.put_nowait("b")
+
+    def test_get_waits_for_item_and_records_wait(self):
+        """get()は投入を待って取り出し、クラスごとの待ち時間を記録する"""
+        scheduler = FairScheduler()
+
+        async def main():
+            getter = asyncio.create_task(scheduler.get())
+            await asyncio.sleep(0)
+            scheduler.put_nowait("job", user_key="u", priority=PriorityClass.PAID)
+            return await getter
+
+        assert asyncio.run(main()) == "job"
+        stats = scheduler.snapshot()
+        assert stats["paid"]["dequeued"] == 1
+        assert stats["standard"]["dequeued"] == 0
+
+    def test_discard_removes_pending_item(self):
+        """取り出し前の要素を取り除ける"""
+        scheduler = FairScheduler()
+        item = object()
+        scheduler.put_nowait(item, user_key="u")
+
+        assert scheduler.discard(item)
+        assert scheduler.empty()
+        assert not scheduler.discard(item)
+
+    def test_priority_for_subscription(self):
+        """有料プランかどうかで優先クラスが決まる"""
+        assert priority_for_subscription(True) is PriorityClass.PAID
+        assert priority_for_subscription(False) is PriorityClass.STANDARD
@@ -0,0 +1,247 @@
+"""
+非同期S3ダウンロードのテスト
+
+テスト対象:
+- GetObjectのETagの記憶（HEADリクエストの省略）
+- 記憶件数の上限（古いキーから忘れる）
+- 本文を読む前のサイズ確認と、ストリーミング読み込みの途中終了
+- 同時実行枠を待つ間のキャンセルでも本文を閉じる
+- 受信しながらのデコード（FFmpegの標準エラーが多い場合も詰まらない）
+"""
+
+import asyncio
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from app.services.s3_async import AsyncS3Downloader
+from app.utils import audio as audio_module
+from app.utils.audio import decode_audio_stream
+
+
+class _FakeBody:
+    """StreamingBodyの代わり（読み込みと close を記録する）"""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.read_bytes = 0
+        self.closed = False
+
+    def read(self) -> bytes:
+        self.read_bytes = len(self.data)
+        return self.data
+
+    def iter_chunks(self, chunk_size: int):
+        for i in range(0, len(self.data), chunk_size):
+            chunk = self.data[i : i + chunk_size]
+            self.read_bytes += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _FakeS3Client:
+    """get_objectの呼び出しを記録するboto3クライアントの代わり"""
+
+    def __init__(self, objects: dict) -> None:
+        self.objects = objects
+        self.calls = []
+        self.bodies = []
+
+    def get_object(self, Bucket, Key):
+        self.calls.append(("get_object", Key))
+        if Key not in self.objects:
+            raise FileNotFoundError(Key)
+        data = self.objects[Key]
+        body = _FakeBody(data)
+        self.bodies.append(body)
+        return {"Body": body, "ETag": f'"etag-{Key}"', "ContentLength": len(data)}
+
+    def head_object(self, Bucket, Key):
+        self.calls.append(("head_object", Key))
+        raise AssertionError("HEADは呼ばない")
+
+
+def _downloader(objects: dict, **kwargs) -> AsyncS3Downloader:
+    return AsyncS3Downloader(_FakeS3Client(objects), "bucket", **kwargs)
+
+
+class TestAsyncS3Downloader:
+    """非同期S3ダウンローダーのテストクラス"""
+
+    def test_get_object_bytes_remembers_etag(self):
+        """ダウンロード時のETagを覚え、以降はHEADなしで参照できる"""
+        downloader = _downloader({"a.webm": b"abc"})
+
+        assert downloader.known_etag("a.webm") is None
+        data, etag = asyncio.run(downloader.get_object_bytes("a.webm"))
+
+        assert data == b"abc"
+        assert etag == '"etag-a.webm"'
+        assert downloader.known_etag("a.webm") == etag
+        assert downloader.s3_client.calls == [("get_object", "a.webm")]
+        downloader.shutdown()
+
+    def test_etag_memo_is_bounded(self):
+        """記憶件数を超えたら最も古く使われたキーから忘れる"""
+        downloader = _downloader({"a": b"1", "b": b"2", "c": b"3"}, etag_memo_size=2)
+
+        async def main():
+            await downloader.get_object_bytes("a")
+            await downloader.get_object_bytes("b")
+            downloader.known_etag("a")  # aを最近使ったことにする
+            await downloader.get_object_bytes("c")
+
+        asyncio.run(main())
+
+        assert downloader.known_etag("a") is not None
+        assert downloader.known_etag("b") is None
+        assert downloader.known_etag("c") is not None
+        downloader.shutdown()
+
+    def test_failed_download_is_not_remembered(self):
+        """ダウンロードに失敗したキーのETagは記憶しない"""
+        downloader = _downloader({})
+
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(downloader.get_object_bytes("missing.webm"))
+        assert downloader.known_etag("missing.webm") is None
+        downloader.shutdown()
+
+
+class _TooLargeError(Exception):
+    pass
+
+
+def _reject_over(limit: int):
+    def check(size: int) -> None:
+        if size > limit:
+            raise _TooLargeError(size)
+
+    return check
+
+
+class TestAsyncS3Streaming:
+    """S3本文のストリーミング読み込みのテストクラス"""
+
+    def test_open_object_does_not_read_body(self):
+        """開いた時点では本文を読まず、ETagは記憶する"""
+        downloader = _downloader({"a.webm": b"x" * 10})
+
+        body, etag = asyncio.run(downloader.open_object("a.webm"))
+
+        assert body.read_bytes == 0
+        assert not body.closed
+        assert downloader.known_etag("a.webm") == etag
+        downloader.shutdown()
+
+    def test_size_check_closes_body_before_reading(self):
+        """サイズが上限を超えたら本文を読まずに閉じる"""
+        downloader = _downloader({"big.webm": b"x" * 100})
+
+        with pytest.raises(_TooLargeError):
+            asyncio.run(downloader.open_object("big.webm", check_size=_reject_over(10)))
+        with pytest.raises(_TooLargeError):
+            asyncio.run(
+                downloader.get_object_bytes("big.webm", check_size=_reject_over(10))
+            )
+
+        bodies = downloader.s3_client.bodies
+        assert [b.closed for b in bodies] == [True, True]
+        assert [b.read_bytes for b in bodies] == [0, 0]
+        downloader.shutdown()
+
+    def test_consume_closes_body_when_consumer_stops_early(self):
+        """consumerが途中で読むのをやめても、例外で終わっても本文を閉じる"""
+        downloader = _downloader({"a.webm": b"x" * 100})
+
+        def first_chunk(chunks):
+            return next(iter(chunks))
+
+        def failing(chunks):
+            next(iter(chunks))
+            raise RuntimeError("decode failed")
+
+        async def main():
+            body, _ = await downloader.open_object("a.webm")
+            first = await downloader.consume_object(body, first_chunk, chunk_size=10)
+            failing_body, _ = await downloader.open_object("a.webm")
+            with pytest.raises(RuntimeError):
+                await downloader.consume_object(failing_body, failing, chunk_size=10)
+            return body, first, failing_body
+
+        body, first, failing_body = asyncio.run(main())
+
+        assert first == b"x" * 10
+        assert body.read_bytes == 10
+        assert body.closed
+        assert failing_body.closed
+        downloader.shutdown()
+
+    def test_consume_closes_body_when_cancelled_while_waiting(self):
+        """同時実行枠を待つ間にキャンセルされても本文を閉じ、consumerは呼ばない"""
+        downloader = _downloader({"a.webm": b"x" * 100}, max_concurrency=1)
+        calls = []
+
+        async def main():
+            body, _ = await downloader.open_object("a.webm")
+            async with downloader._semaphore:
+                task = asyncio.create_task(
+                    downloader.consume_object(body, calls.append, chunk_size=10)
+                )
+                await asyncio.sleep(0)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+            return body
+
+        body = asyncio.run(main())
+
+        assert body.closed
+        assert body.read_bytes == 0
+        assert calls == []
+        downloader.shutdown()
+
+
+class TestDecodeAudioStream:
+    """受信しながらのデコードのテストクラス"""
+
+    def test_large_stderr_does_not_block_decode(self, monkeypatch):
+        """標準エラーにパイプの容量を超える出力があっても最後まで読める"""
+        # FFmpegの代わりに、標準エラーへ大量に書いてから入力をそのまま出力する
+        script = (
+            "import sys; sys.stderr.write('w' * (1 << 20)); sys.stderr.flush(); "
+            "sys.stdout.buffer.write(sys.stdin.buffer.read())"
+        )
+        monkeypatch.setattr(
+            audio_module,
+            "_ffmpeg_decode_cmd",
+            lambda *args, **kwargs: [sys.executable, "-c", script],
+        )
+        pcm = np.arange(1000, dtype=np.float32)
+        raw = pcm.tobytes()
+        chunks = [raw[i : i + 512] for i in range(0, len(raw), 512)]
+
+        decoded = decode_audio_stream(chunks)
+
+        np.testing.assert_array_equal(decoded, pcm)
+
+    def test_failure_reports_stderr_tail(self, monkeypatch):
+        """1サンプルもデコードできなければ、標準エラーの末尾を付けて失敗する"""
+        script = (
+            "import sys; sys.stderr.write('e' * 100000 + 'invalid data'); sys.exit(1)"
+        )
+        monkeypatch.setattr(
+            audio_module,
+            "_ffmpeg_decode_cmd",
+            lambda *args, **kwargs: [sys.executable, "-c", script],
+        )
+
+        with pytest.raises(subprocess.CalledProcessError) as e:
+            decode_audio_stream([b"broken"])
+
+        assert e.value.stderr.endswith(b"invalid data")
+        assert len(e.value.stderr) <= audio_module._STDERR_TAIL_BYTES
@@ -0,0 +1,244 @@
+"""
+同じ音声の同時リクエストの合流（シングルフライト）のテスト
+
+テスト対象:
+- 同時に届いた同じキーの処理を1回にまとめる
+- 例外・キャンセルの扱い
+- プロセス間ロックの利用（受付制御の枠を得てから、期限の残りまで待つ）
+"""
+
+import asyncio
+import contextlib
+import time
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import voice
+from app.services.admission import AdmissionController
+from app.services.fair_scheduler import PriorityClass
+from app.services.single_flight import SingleFlight, advisory_lock_key, flight_key
+
+
+class TestSingleFlight:
+    """シングルフライトのテストクラス"""
+
+    def test_concurrent_duplicates_share_one_call(self):
+        """同じキーの同時呼び出しは1回だけ実行し、同じ結果を返す"""
+        calls = []
+
+        async def main():
+            flights = SingleFlight()
+            release = asyncio.Event()
+
+            async def work():
+                calls.append(1)
+                await release.wait()
+                return {"text": "hello"}
+
+            key = flight_key("audio/a.webm", "base", "ja", None)
+            waiters = [asyncio.create_task(flights.do(key, work)) for _ in range(3)]
+            other = asyncio.create_task(flights.do(flight_key("audio/b.webm"), work))
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*waiters, other)
+            return flights, results
+
+        flights, results = asyncio.run(main())
+
+        assert len(calls) == 2  # a.webm と b.webm で1回ずつ
+        assert all(r == {"text": "hello"} for r in results)
+        assert flights.stats()["followers"] == 2
+        assert flights.in_flight() == 0
+
+    def test_exception_is_shared_and_not_cached(self):
+        """失敗は待っている全員に返し、次の呼び出しでは処理をやり直す"""
+
+        async def main():
+            flights = SingleFlight()
+            attempts = []
+
+            async def work():
+                attempts.append(1)
+                await asyncio.sleep(0)
+                if len(attempts) == 1:
+                    raise RuntimeError("boom")
+                return "ok"
+
+            first = asyncio.gather(
+                flights.do("k", work), flights.do("k", work), return_exceptions=True
+            )
+            errors = await first
+            retried = await flights.do("k", work)
+            return errors, retried
+
+        errors, retried = asyncio.run(main())
+
+        assert all(isinstance(e, RuntimeError) for e in errors)
+        assert retried == "ok"
+
+    def test_leader_cancellation_does_not_cancel_followers(self):
+        """先に来たリクエストが切断されても、後から合流した側は結果を受け取る"""
+
+        async def main():
+            flights = SingleFlight()
+            release = asyncio.Event()
+
+            async def work():
+                await release.wait()
+                return "done"
+
+            leader = asyncio.create_task(flights.do("k", work))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flights.do("k", work))
+            await asyncio.sleep(0)
+            leader.cancel()
+            release.set()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await follower
+
+        assert asyncio.run(main()) == "done"
+
+    def test_lock_is_taken_inside_the_call(self):
+        """プロセス間ロックはdo()では取らず、処理本体がlock()で取る"""
+        locked = []
+
+        @contextlib.asynccontextmanager
+        async def lock(key, *, timeout_seconds):
+            locked.append((key, timeout_seconds))
+            yield
+
+        async def main():
+            flights = SingleFlight(lock_factory=lock)
+            before_lock = []
+
+            async def work():
+                # 受付制御の枠を待つ間などはロックを持たない
+                before_lock.append(list(locked))
+                async with flights.lock("k", timeout_seconds=2.5):
+                    await asyncio.sleep(0)
+                    return "ok"
+
+            results = await asyncio.gather(flights.do("k", work), flights.do("k", work))
+            return results, before_lock
+
+        results, before_lock = asyncio.run(main())
+
+        assert results == ["ok", "ok"]
+        assert before_lock == [[]]
+        assert locked == [("k", 2.5)]
+
+    def test_lock_gives_up_after_timeout(self):
+        """ロック（DB接続の取り出しを含む）が取れなければ期限でやめて処理を続ける"""
+        exited = []
+
+        @contextlib.asynccontextmanager
+        async def blocking_lock(key, *, timeout_seconds):
+            try:
+                await asyncio.Event().wait()  # 接続プールが空かない
+                yield
+            finally:
+                exited.append(key)
+
+        async def main():
+            flights = SingleFlight(lock_factory=blocking_lock)
+            async with flights.lock("k", timeout_seconds=0.05):
+                return "ok"
+
+        assert asyncio.run(main()) == "ok"
+        assert exited == ["k"]  # 待っていた取得は取り消す
+
+    def test_lock_without_factory_is_noop(self):
+        """プロセス間ロックを使わない設定では何もしない"""
+
+        async def main():
+            async with SingleFlight().lock("k", timeout_seconds=1.0):
+                return "ok"
+
+        assert asyncio.run(main()) == "ok"
+
+    def test_advisory_lock_key_is_stable_63bit(self):
+        """アドバイザリロックのキーは同じ入力で同じ値、bigintの正の範囲に収まる"""
+        key = flight_key("audio/a.webm", "base", "ja", None)
+
+        assert advisory_lock_key(key) == advisory_lock_key(key)
+        assert 0 <= advisory_lock_key(key) < 2**63
+        assert advisory_lock_key(key) != advisory_lock_key(key + "x")
+
+
+class _FakeWhisperService:
+    """音声認識APIが使う属性だけを持つWhisperServiceの代わり"""
+
+    model_identity = "base"
+
+    def __init__(self, admission: AdmissionController, events: list) -> None:
+        self.admission = admission
+        self.events = events
+
+    async def transcribe_async(self, *, audio_file_path, language, limits):
+        self.events.append(("transcribe", self.admission.in_flight))
+        return {"text": "ok", "language": language}
+
+
+class TestTranscribeEndpointLock:
+    """音声認識APIでのプロセス間ロックのテストクラス"""
+
+    def _post(self, monkeypatch, service, lock):
+        async def priority(db, user_id):
+            return PriorityClass.STANDARD
+
+        monkeypatch.setattr(voice, "_transcribe_flights", SingleFlight(lock))
+        monkeypatch.setattr(voice.TranscriptionJobManagerHolder, "_instance", None)
+        monkeypatch.setattr(voice, "_transcribe_priority", priority)
+        app = FastAPI()
+        app.include_router(voice.router)
+        app.dependency_overrides[voice.get_db] = lambda: None
+        app.dependency_overrides[voice.get_whisper_service] = lambda: service
+
+        with TestClient(app) as client:
+            return client.post(
+                "/voice/transcribe",
+                json={"user_id": str(uuid.uuid4()), "audio_file_path": "a.webm"},
+            )
+
+    def test_lock_is_taken_after_slot_within_deadline(self, monkeypatch):
+        """ロックは枠を得てから取り、待つのは受付制御の期限の残りまで"""
+        events = []
+        admission = AdmissionController(1, deadline_seconds=3.0)
+
+        @contextlib.asynccontextmanager
+        async def lock(key, *, timeout_seconds):
+            events.append(("lock", admission.in_flight, timeout_seconds))
+            yield
+
+        service = _FakeWhisperService(admission, events)
+        response = self._post(monkeypatch, service, lock)
+
+        assert response.status_code == 200
+        (_, lock_in_flight, timeout), transcribe = events
+        assert lock_in_flight == 1  # 枠を得た後
+        assert 0 < timeout <= 3.0
+        assert transcribe == ("transcribe", 1)
+        assert admission.in_flight == 0
+
+    def test_blocked_lock_does_not_outlast_deadline(self, monkeypatch):
+        """ロックの取得が詰まっても、受付制御の期限内に認識を始めて返す"""
+        events = []
+        admission = AdmissionController(1, deadline_seconds=0.2)
+
+        @contextlib.asynccontextmanager
+        async def blocking_lock(key, *, timeout_seconds):
+            await asyncio.Event().wait()  # 接続プールの空き待ちが終わらない
+            yield
+
+        service = _FakeWhisperService(admission, events)
+        started = time.monotonic()
+        response = self._post(monkeypatch, service, blocking_lock)
+        elapsed = time.monotonic() - started
+
+        assert response.status_code == 200
+        assert events == [("transcribe", 1)]
+        assert elapsed < 1.0
@@ -0,0 +1,156 @@
+"""
+文字起こしの一括再処理（バックフィル）のテスト
+
+テスト対象:
+- チェックポイントからの再開
+- 変わった結果だけの書き込みと行単位の失敗
+- 書き込みの間引き
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.transcription_backfill import (
+    BackfillCheckpoint,
+    BackfillRow,
+    TranscriptionBackfill,
+    WriteThrottle,
+)
+
+
+class _FakeWhisperService:
+    """一括認識の代わり（キーごとの結果を返す）"""
+
+    model_identity = "small"
+
+    def __init__(self, texts: dict) -> None:
+        self.texts = texts
+        self.calls = []
+
+    async def transcribe_batch_async(self, keys, *, language, limits=None):
+        self.calls.append(list(keys))
+        for key in keys:
+            text = self.texts[key]
+            yield key, RuntimeError(text) if text is None else {"text": text}
+
+
+class _InMemoryBackfill(TranscriptionBackfill):
+    """DBの代わりにリストの行を読み書きする"""
+
+    def __init__(self, rows, whisper_service, **kwargs) -> None:
+        super().__init__(None, whisper_service, writes_per_second=0, **kwargs)
+        self.rows = sorted(rows, key=lambda r: r.id)
+        self.updates = {}
+
+    async def fetch_rows(self, after_id):
+        rows = [r for r in self.rows if after_id is None or r.id > after_id]
+        return rows[: self.batch_size]
+
+    async def update_row(self, row, text):
+        self.updates[row.id] = text
+
+
+def _rows(n: int):
+    return [
+        BackfillRow(f"{i:02d}", f"audio/{i}.webm", f"text/{i}.txt", "old")
+        for i in range(n)
+    ]
+
+
+class TestTranscriptionBackfill:
+    """バックフィルのテストクラス"""
+
+    def test_resumes_from_checkpoint(self, tmp_path):
+        """中断した場合は最後に保存したIDの続きから処理する"""
+        path = str(tmp_path / "checkpoint.json")
+        rows = _rows(5)
+        service = _FakeWhisperService({r.audio_file_path: "new" for r in rows})
+
+        first = _InMemoryBackfill(rows, service, checkpoint_path=path, batch_size=2)
+        checkpoint = asyncio.run(first.run(limit=2))
+        assert not checkpoint.finished
+        assert BackfillCheckpoint.load(path).last_id == "01"
+
+        second = _InMemoryBackfill(rows, service, checkpoint_path=path, batch_size=2)
+        checkpoint = asyncio.run(second.run())
+
+        assert set(second.updates) == {"02", "03", "04"}
+        assert checkpoint.processed == 5
+        assert checkpoint.finished
+
+    def test_checkpoint_of_other_model_is_rejected(self, tmp_path):
+        """別のモデルで途中まで実行したチェックポイントでは再開しない"""
+        path = str(tmp_path / "checkpoint.json")
+        BackfillCheckpoint(model="base", last_id="01").save(path)
+        backfill = _InMemoryBackfill(
+            _rows(1), _FakeWhisperService({}), checkpoint_path=path
+        )
+
+        with pytest.raises(ValueError):
+            backfill.load_checkpoint()
+        assert backfill.load_checkpoint(reset=True).last_id is None
+
+    def test_writes_only_changed_text(self, tmp_path):
+        """結果が変わった行だけ書き込み、失敗した行は記録して続行する"""
+        rows = [
+            BackfillRow("a", "audio/a.webm", "text/a.txt", "same"),
+            BackfillRow("b", "audio/b.webm", "text/b.txt", "old"),
+            BackfillRow("c", "audio/c.webm", None, "old"),
+            BackfillRow("d", "audio/b.webm", "text/d.txt", "old"),
+        ]
+        service = _FakeWhisperService(
+            {"audio/a.webm": "same", "audio/b.webm": "new", "audio/c.webm": None}
+        )
+        written = {}
+
+        async def write_text(key, text):
+            written[key] = text
+
+        backfill = _InMemoryBackfill(
+            rows,
+            service,
+            write_text=write_text,
+            checkpoint_path=str(tmp_path / "checkpoint.json"),
+        )
+        checkpoint = asyncio.run(backfill.run())
+
+        assert backfill.updates == {"b": "new", "d": "new"}
+        assert written == {"text/b.txt": "new", "text/d.txt": "new"}
+        assert checkpoint.failed_ids == ["c"]
+        # 同じ音声を参照する行は1回だけ認識する
+        assert sorted(service.calls[0]) == [
+            "audio/a.webm",
+            "audio/b.webm",
+            "audio/c.webm",
+        ]
+
+    def test_dry_run_does_not_write(self, tmp_path):
+        """ドライランでは書き込みもチェックポイントの保存もしない"""
+        path = tmp_path / "checkpoint.json"
+        rows = _rows(2)
+        backfill = _InMemoryBackfill(
+            rows,
+            _FakeWhisperService({r.audio_file_path: "new" for r in rows}),
+            checkpoint_path=str(path),
+            dry_run=True,
+        )
+
+        checkpoint = asyncio.run(backfill.run())
+
+        assert checkpoint.processed == 2
+        assert backfill.updates == {}
+        assert not path.exists()
+
+    def test_write_throttle(self):
+        """書き込みは毎秒の上限を超えない間隔で行う"""
+
+        async def main():
+            throttle = WriteThrottle(per_second=50)
+            started = time.monotonic()
+            for _ in range(4):
+                await throttle.wait()
+            return time.monotonic() - started
+
+        assert asyncio.run(main()) >= 3 / 50 * 0.9
@@ -0,0 +1,217 @@
+"""
+音声認識結果キャッシュのテスト
+
+テスト対象:
+- キャッシュキーの生成
+- プロセス内LRUの上限管理
+- 2段キャッシュの参照順・永続側ヒットの昇格・エラー時の扱い・統計
+- ETagが分かっていればダウンロードせずにキャッシュの結果を返す
+- デコードへ渡す前にキャンセルされてもS3の本文を閉じる
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.transcription_cache import (
+    MemoryLRUCache,
+    TranscriptionCache,
+    make_cache_key,
+)
+from app.services import whisper as whisper_module
+from app.services.whisper import WhisperService
+
+
+class TestTranscriptionCache:
+    """音声認識結果キャッシュのテストクラス"""
+
+    def test_cache_key_changes_with_inputs(self):
+        """ETag・モデル・言語・プロンプトのどれかが変わればキーが変わる"""
+        base = make_cache_key('"abc"', "base", "ja", "ママ")
+
+        assert len(base) == 64
+        assert base == make_cache_key("abc", "base", "ja", "ママ")
+        assert base != make_cache_key('"abd"', "base", "ja", "ママ")
+        assert base != make_cache_key('"abc"', "small", "ja", "ママ")
+        assert base != make_cache_key('"abc"', "base", "en", "ママ")
+        assert base != make_cache_key('"abc"', "base", "ja", "パパ")
+
+    def test_lru_evicts_least_recently_used(self):
+        """件数上限を超えたら最も古く使われたものから削除される"""
+        cache = MemoryLRUCache(max_entries=2, max_bytes=1000)
+        cache.put("a", {"text": "a"}, 10)
+        cache.put("b", {"text": "b"}, 10)
+        assert cache.get("a") == {"text": "a"}
+
+        cache.put("c", {"text": "c"}, 10)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"text": "a"}
+        assert cache.get("c") == {"text": "c"}
+        assert cache.evictions == 1
+
+    def test_lru_respects_byte_budget(self):
+        """バイト数上限を超えないように削除される"""
+        cache = MemoryLRUCache(max_entries=10, max_bytes=25)
+        cache.put("a", {"text": "a"}, 10)
+        cache.put("b", {"text": "b"}, 10)
+        cache.put("c", {"text": "c"}, 10)
+
+        assert len(cache) == 2
+        assert cache.total_bytes == 20
+        assert cache.get("a") is None
+
+        # 1件で上限を超えるものは保存しない
+        cache.put("big", {"text": "x"}, 100)
+        assert cache.get("big") is None
+
+
+class _FakeStore:
+    """PersistentTranscriptionStoreの代わり（呼び出しを記録し、失敗も再現する）"""
+
+    def __init__(self, entries=None, failing: bool = False) -> None:
+        self.entries = dict(entries or {})
+        self.failing = failing
+        self.gets = []
+        self.puts = []
+
+    async def get(self, cache_key):
+        self.gets.append(cache_key)
+        if self.failing:
+            raise ConnectionError("db down")
+        return self.entries.get(cache_key)
+
+    async def put(self, cache_key, result, **kwargs):
+        self.puts.append(cache_key)
+        if self.failing:
+            raise ConnectionError("db down")
+        self.entries[cache_key] = result
+
+
+def _put(cache: TranscriptionCache, key: str, result: dict) -> None:
+    asyncio.run(
+        cache.put(
+            key, result, s3_key="a.webm", etag="e", model_name="base", language="ja"
+        )
+    )
+
+
+class TestTwoTierCache:
+    """2段キャッシュのテストクラス"""
+
+    def test_memory_is_checked_before_persistent(self):
+        """プロセス内にあれば永続側は参照しない"""
+        store = _FakeStore()
+        cache = TranscriptionCache(persistent=store, use_persistent=True)
+        _put(cache, "k", {"text": "hello"})
+
+        assert asyncio.run(cache.get("k")) == {"text": "hello"}
+        assert store.gets == []
+        assert store.puts == ["k"]
+        assert cache.stats.memory_hits == 1
+
+    def test_persistent_hit_is_promoted_to_memory(self):
+        """永続側でヒットしたらプロセス内にも載せ、次からは永続側を参照しない"""
+        store = _FakeStore({"k": {"text": "stored"}})
+        cache = TranscriptionCache(persistent=store, use_persistent=True)
+
+        first = asyncio.run(cache.get("k"))
+        second = asyncio.run(cache.get("k"))
+
+        assert first == second == {"text": "stored"}
+        assert store.gets == ["k"]
+        assert cache.stats.persistent_hits == 1
+        assert cache.stats.memory_hits == 1
+        assert len(cache.memory) == 1
+
+    def test_store_errors_are_treated_as_miss(self):
+        """永続側のエラーはミスとして扱い、保存はプロセス内だけで続ける"""
+        store = _FakeStore(failing=True)
+        cache = TranscriptionCache(persistent=store, use_persistent=True)
+
+        assert asyncio.run(cache.get("k")) is None
+        _put(cache, "k", {"text": "hello"})
+
+        assert cache.stats.misses == 1
+        assert cache.stats.errors == 2
+        assert asyncio.run(cache.get("k")) == {"text": "hello"}
+
+    def test_hit_and_miss_counters(self):
+        """ヒット・ミスを数え、ヒット率を統計に含める"""
+        cache = TranscriptionCache(use_persistent=False)
+        _put(cache, "k", {"text": "hello"})
+
+        async def main():
+            await cache.get("k")
+            await cache.get("missing")
+            await cache.get("k")
+            await cache.get("missing")
+
+        asyncio.run(main())
+        snapshot = cache.snapshot()
+
+        assert snapshot["memory_hits"] == 2
+        assert snapshot["misses"] == 2
+        assert snapshot["hit_ratio"] == 0.5
+        assert snapshot["persistent_enabled"] is False
+
+
+class _KnownEtagDownloader:
+    """ETagを覚えているAsyncS3Downloaderの代わり（ダウンロードすると失敗する）"""
+
+    def known_etag(self, s3_key):
+        return '"etag-a"'
+
+    async def open_object(self, *args, **kwargs):
+        raise AssertionError("ダウンロードしない")
+
+    async def get_object_bytes(self, *args, **kwargs):
+        raise AssertionError("ダウンロードしない")
+
+
+class TestPrepareAudioCache:
+    """ダウンロード前のキャッシュ確認のテストクラス"""
+
+    def test_known_etag_returns_cached_result_without_download(self):
+        """ETagが分かっていてキャッシュにあれば、S3から取得せずに結果を返す"""
+        cache = TranscriptionCache(use_persistent=False)
+        key = make_cache_key('"etag-a"', "base", "ja", None)
+        _put(cache, key, {"text": "cached"})
+        service = SimpleNamespace(_s3=_KnownEtagDownloader(), _cache=cache)
+
+        prepared = asyncio.run(
+            WhisperService._prepare_audio(service, "a.webm", "base", "ja", None, None)
+        )
+
+        assert prepared.cached == {"text": "cached"}
+        assert prepared.audio is None
+        assert cache.stats.memory_hits == 1
+
+    def test_cancel_before_decode_closes_body(self, monkeypatch):
+        """GetObject後のキャッシュ確認中にキャンセルされても本文を閉じる"""
+        monkeypatch.setattr(whisper_module, "STREAM_DECODE_ENABLED", True)
+        body = SimpleNamespace(closed=False)
+        body.close = lambda: setattr(body, "closed", True)
+
+        class _Downloader:
+            def known_etag(self, s3_key):
+                return None
+
+            async def open_object(self, s3_key, check_size=None):
+                return body, '"etag-a"'
+
+        class _CancelledCache:
+            async def get(self, cache_key):
+                raise asyncio.CancelledError()
+
+        service = SimpleNamespace(_s3=_Downloader(), _cache=_CancelledCache())
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(
+                WhisperService._prepare_audio(
+                    service, "a.webm", "base", "ja", None, None
+                )
+            )
+
+        assert body.closed
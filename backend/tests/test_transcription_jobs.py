@@ -0,0 +1,396 @@
+"""
+音声認識ジョブ管理のテスト
+
+テスト対象:
+- ジョブの状態遷移（queued→running→succeeded/failed）と期限切れ
+- ジョブ取得APIの存在しないIDと、他のユーザーのジョブの扱い
+- 同じ音声のジョブを1つにまとめる（ユーザー・入力上限が違えばまとめない）
+- 停止時のキュー待ちジョブの扱い
+- 投機実行の結果を後からのリクエストで使う（join）
+- 混雑時は投機実行を見送る
+- S3イベント通知の受信（トークン未設定・不一致は受け付けない）
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import voice
+from app.api.v1.endpoints.voice import get_transcribe_job, get_transcribe_job_result
+from app.services.fair_scheduler import PriorityClass
+from app.services.transcription_jobs import (
+    TranscriptionJobManager,
+    TranscriptionJobStatus,
+    TranscriptionQueueFullError,
+)
+
+
+class _FakeWhisperService:
+    """transcribe_asyncの呼び出しを記録するWhisperServiceの代わり"""
+
+    concurrency = 1
+
+    def __init__(self, failing=()) -> None:
+        self.calls = []
+        self.failing = set(failing)
+        self.release = asyncio.Event()
+
+    async def transcribe_async(self, audio_file_path, *, language, limits=None):
+        self.calls.append(audio_file_path)
+        await self.release.wait()
+        if audio_file_path in self.failing:
+            raise RuntimeError("decode failed")
+        return {"text": f"text:{audio_file_path}", "language": language}
+
+
+class TestJobLifecycle:
+    """ジョブの状態遷移のテストクラス"""
+
+    def test_job_runs_to_success(self):
+        """投入したジョブはqueued→running→succeededと進み、結果を持つ"""
+
+        async def main():
+            service = _FakeWhisperService()
+            manager = TranscriptionJobManager(service)
+            job = await manager.submit("a.webm")
+            statuses = [job.status]
+            await asyncio.sleep(0)  # ランナーが取り出して実行を始める
+            statuses.append(job.status)
+            service.release.set()
+            finished = await manager.wait(job.job_id, timeout=1.0)
+            await manager.shutdown()
+            return statuses, finished
+
+        statuses, job = asyncio.run(main())
+
+        assert statuses == [
+            TranscriptionJobStatus.QUEUED,
+            TranscriptionJobStatus.RUNNING,
+        ]
+        assert job.status is TranscriptionJobStatus.SUCCEEDED
+        assert job.result["text"] == "text:a.webm"
+        assert job.finished_at is not None
+
+    def test_failed_job_keeps_error_and_runner_continues(self):
+        """失敗したジョブはfailedとエラー内容を持ち、次のジョブは実行される"""
+
+        async def main():
+            service = _FakeWhisperService(failing=["bad.webm"])
+            manager = TranscriptionJobManager(service)
+            bad = await manager.submit("bad.webm")
+            good = await manager.submit("good.webm")
+            service.release.set()
+            await manager.wait(bad.job_id, timeout=1.0)
+            await manager.wait(good.job_id, timeout=1.0)
+            await manager.shutdown()
+            return bad, good
+
+        bad, good = asyncio.run(main())
+
+        assert bad.status is TranscriptionJobStatus.FAILED
+        assert bad.error == "RuntimeError: decode failed"
+        assert good.status is TranscriptionJobStatus.SUCCEEDED
+
+    def test_wait_times_out_with_unfinished_job(self):
+        """待機しても終わらなければ未完了のまま返し、結果APIは202にする"""
+
+        user_id = uuid.uuid4()
+
+        async def main():
+            manager = TranscriptionJobManager(_FakeWhisperService())
+            job = await manager.submit("a.webm", user_id=str(user_id))
+            response = Response()
+            body = await get_transcribe_job_result(
+                job.job_id, response, user_id=user_id, wait=0.01, job_manager=manager
+            )
+            await manager.shutdown()
+            return body, response
+
+        body, response = asyncio.run(main())
+
+        assert response.status_code == 202
+        assert body.status == TranscriptionJobStatus.RUNNING.value
+        assert body.result is None
+
+    def test_expired_job_is_pruned(self):
+        """TTLを過ぎた終了済みジョブは次の投入時に削除される"""
+
+        async def main():
+            service = _FakeWhisperService()
+            service.release.set()
+            manager = TranscriptionJobManager(service, ttl_seconds=60)
+            job = await manager.submit("a.webm")
+            await manager.wait(job.job_id, timeout=1.0)
+            job.finished_at = datetime.now(timezone.utc) - timedelta(seconds=61)
+            await manager.submit("b.webm")
+            await manager.shutdown()
+            return manager, job
+
+        manager, job = asyncio.run(main())
+
+        assert manager.get(job.job_id) is None
+        assert manager.find("a.webm", "ja") is None
+
+    def test_unknown_job_id_returns_404(self):
+        """存在しないジョブIDは状態取得・結果取得とも404"""
+        manager = TranscriptionJobManager(_FakeWhisperService())
+
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(
+                get_transcribe_job("missing", user_id=uuid.uuid4(), job_manager=manager)
+            )
+        assert e.value.status_code == 404
+
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(
+                get_transcribe_job_result(
+                    "missing",
+                    Response(),
+                    user_id=uuid.uuid4(),
+                    wait=0.0,
+                    job_manager=manager,
+                )
+            )
+        assert e.value.status_code == 404
+
+    def test_other_users_job_returns_404(self):
+        """投入したユーザー以外には、状態も結果も返さない"""
+        owner, other = uuid.uuid4(), uuid.uuid4()
+
+        async def main():
+            manager = TranscriptionJobManager(_FakeWhisperService())
+            job = await manager.submit("a.webm", user_id=str(owner))
+            own = await get_transcribe_job(
+                job.job_id, user_id=owner, job_manager=manager
+            )
+            errors = []
+            for call in (
+                get_transcribe_job(job.job_id, user_id=other, job_manager=manager),
+                get_transcribe_job_result(
+                    job.job_id,
+                    Response(),
+                    user_id=other,
+                    wait=0.0,
+                    job_manager=manager,
+                ),
+            ):
+                with pytest.raises(HTTPException) as e:
+                    await call
+                errors.append(e.value.status_code)
+            await manager.shutdown()
+            return job, own, errors
+
+        job, own, errors = asyncio.run(main())
+
+        assert own.job_id == job.job_id
+        assert errors == [404, 404]
+
+    def test_shutdown_fails_queued_jobs(self):
+        """停止時のキュー待ちジョブは失敗にして待ち手を起こし、以降は受け付けない"""
+
+        async def main():
+            manager = TranscriptionJobManager(_FakeWhisperService())
+            await manager.submit("busy.webm")
+            await asyncio.sleep(0)  # 1本だけのランナーが埋まる
+            queued = await manager.submit("a.webm", speculative=True)
+            waiter = asyncio.create_task(manager.wait(queued.job_id, timeout=1.0))
+            await asyncio.sleep(0)
+            await manager.shutdown()
+            await waiter
+            joined = await manager.join("a.webm", "ja")
+            with pytest.raises(TranscriptionQueueFullError):
+                await manager.submit("b.webm")
+            return queued, joined
+
+        queued, joined = asyncio.run(main())
+
+        assert queued.status is TranscriptionJobStatus.FAILED
+        assert queued.error == "shutdown"
+        assert joined is None
+
+
+class TestSpeculativeJobs:
+    """投機実行ジョブのテストクラス"""
+
+    def test_submit_reuses_job_for_same_audio(self):
+        """同じS3キーと言語のジョブは新しく投入しない"""
+
+        async def main():
+            manager = TranscriptionJobManager(_FakeWhisperService())
+            first = await manager.submit("a.webm", speculative=True)
+            second = await manager.submit("a.webm")
+            other_language = await manager.submit("a.webm", language="en")
+            await manager.shutdown()
+            return first, second, other_language
+
+        first, second, other_language = asyncio.run(main())
+
+        assert second is first
+        assert other_language is not first
+
+    def test_jobs_are_not_shared_across_users_or_limits(self):
+        """ユーザーや入力上限（優先クラス）が違えば、別のジョブにする"""
+
+        async def main():
+            service = _FakeWhisperService()
+            manager = TranscriptionJobManager(service)
+            standard = await manager.submit("a.webm", user_id="u1", speculative=True)
+            other_user = await manager.submit("a.webm", user_id="u2")
+            paid = await manager.submit(
+                "a.webm", user_id="u1", priority=PriorityClass.PAID
+            )
+            # 切り詰め済みの可能性がある結果を、上限の違う呼び出し元に返さない
+            found = manager.find(
+                "a.webm", "ja", user_id="u1", priority=PriorityClass.PAID
+            )
+            await manager.shutdown()
+            return standard, other_user, paid, found
+
+        standard, other_user, paid, found = asyncio.run(main())
+
+        assert other_user is not standard
+        assert paid is not standard
+        assert found is paid
+
+    def test_join_waits_for_running_job(self):
+        """実行中の投機ジョブがあれば、その結果を待って返す"""
+
+        async def main():
+            service = _FakeWhisperService()
+            manager = TranscriptionJobManager(service)
+            job = await manager.submit("a.webm", speculative=True)
+            await asyncio.sleep(0)  # ランナーが取り出して実行を始める
+            assert job.status is TranscriptionJobStatus.RUNNING
+            joined = asyncio.create_task(manager.join("a.webm", "ja"))
+            await asyncio.sleep(0)
+            service.release.set()
+            result = await joined
+            stats = manager.stats()
+            await manager.shutdown()
+            return service, result, stats
+
+        service, result, stats = asyncio.run(main())
+
+        assert result["text"] == "text:a.webm"
+        assert service.calls == ["a.webm"]  # 二重に認識しない
+        assert stats["speculative"] == {"submitted": 1, "joined": 1}
+
+    def test_join_runs_queued_job_inline(self):
+        """キュー待ちの投機ジョブは、呼び出し元のタスクでそのまま実行する"""
+
+        async def main():
+            service = _FakeWhisperService()
+            manager = TranscriptionJobManager(service)
+            await manager.submit("busy.webm")
+            await asyncio.sleep(0)  # 1本だけのランナーが埋まる
+            job = await manager.submit("a.webm", speculative=True)
+            entered = []
+
+            def slot():
+                entered.append(True)
+                return asyncio.Lock()
+
+            service.release.set()
+            result = await manager.join("a.webm", "ja", slot=slot)
+            await manager.shutdown()
+            return job, result, entered
+
+        job, result, entered = asyncio.run(main())
+
+        assert result["text"] == "text:a.webm"
+        assert job.status is TranscriptionJobStatus.SUCCEEDED
+        assert entered == [True]
+
+    def test_join_keeps_job_queued_when_slot_is_refused(self):
+        """枠を得られずに例外になっても、ジョブはキューに残りランナーが実行する"""
+
+        class _Overloaded(Exception):
+            pass
+
+        def slot():
+            raise _Overloaded()
+
+        async def main():
+            service = _FakeWhisperService()
+            manager = TranscriptionJobManager(service)
+            await manager.submit("busy.webm")
+            await asyncio.sleep(0)  # 1本だけのランナーが埋まる
+            job = await manager.submit("a.webm", speculative=True)
+            with pytest.raises(_Overloaded):
+                await manager.join("a.webm", "ja", slot=slot)
+            queued = manager.queued_count
+            service.release.set()
+            await asyncio.wait_for(job.done_event.wait(), timeout=1.0)
+            result = await manager.join("a.webm", "ja")
+            await manager.shutdown()
+            return job, queued, result
+
+        job, queued, result = asyncio.run(main())
+
+        assert queued == 1
+        assert job.status is TranscriptionJobStatus.SUCCEEDED
+        assert result["text"] == "text:a.webm"
+
+    def test_join_without_job_returns_none(self):
+        """同じ音声のジョブがなければNone（通常どおり処理する）"""
+        manager = TranscriptionJobManager(_FakeWhisperService())
+
+        assert asyncio.run(manager.join("a.webm", "ja")) is None
+
+    def test_speculative_is_skipped_when_busy(self):
+        """キュー待ちが多いときは投機実行を見送る"""
+
+        async def main():
+            manager = TranscriptionJobManager(
+                _FakeWhisperService(), max_speculative_queued=1
+            )
+            await manager.submit("running.webm")
+            await asyncio.sleep(0)
+            await manager.submit("queued.webm")
+            try:
+                with pytest.raises(TranscriptionQueueFullError):
+                    await manager.submit("a.webm", speculative=True)
+            finally:
+                await manager.shutdown()
+
+        asyncio.run(main())
+
+
+class TestS3EventWebhook:
+    """S3イベント通知受信のテストクラス"""
+
+    def _post(self, monkeypatch, token, headers):
+        monkeypatch.setattr(voice, "S3_EVENT_WEBHOOK_TOKEN", token)
+        app = FastAPI()
+        app.include_router(voice.router)
+        app.dependency_overrides[voice.get_db] = lambda: None
+        app.dependency_overrides[voice.get_job_manager] = lambda: (
+            TranscriptionJobManager(_FakeWhisperService())
+        )
+        with TestClient(app) as client:
+            return client.post(
+                "/voice/s3-events", json={"Records": []}, headers=headers
+            )
+
+    def test_rejected_when_token_is_not_configured(self, monkeypatch):
+        """トークンが未設定なら、ヘッダに関係なく受け付けない"""
+        response = self._post(monkeypatch, None, {"X-Webhook-Token": ""})
+
+        assert response.status_code == 403
+
+    def test_rejected_with_wrong_token(self, monkeypatch):
+        """トークンが一致しなければ401"""
+        response = self._post(monkeypatch, "secret", {"X-Webhook-Token": "wrong"})
+
+        assert response.status_code == 401
+
+    def test_accepted_with_matching_token(self, monkeypatch):
+        """トークンが一致すれば受け付ける"""
+        response = self._post(monkeypatch, "secret", {"X-Webhook-Token": "secret"})
+
+        assert response.status_code == 200
+        assert response.json()["scheduled"] == 0
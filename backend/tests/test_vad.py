@@ -0,0 +1,95 @@
+"""
+音声区間検出（VAD）のテスト
+
+テスト対象:
+- 発話区間の検出
+- 無音の除去と時刻の対応付け
+- 長い音声のチャンク分割
+"""
+
+import numpy as np
+
+from app.utils.vad import (
+    detect_speech_regions,
+    split_at_silences,
+    to_original_time,
+    trim_to_speech,
+)
+
+SR = 16000
+
+
+def _tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+class TestVad:
+    """音声区間検出のテストクラス"""
+
+    def test_silence_has_no_speech(self):
+        """無音だけの音声では発話区間がない"""
+        assert detect_speech_regions(_silence(3.0)) == []
+
+    def test_steady_speech_level_is_all_speech(self):
+        """全体が同じ音量で静かな部分がない音声は、全体を発話とみなす"""
+        audio = _tone(3.0)
+
+        assert detect_speech_regions(audio) == [(0, len(audio))]
+
+    def test_detects_regions_separated_by_long_silence(self):
+        """長い無音で区切られた発話は別の区間になる"""
+        audio = np.concatenate(
+            [_silence(1.0), _tone(1.0), _silence(2.0), _tone(0.5), _silence(1.0)]
+        )
+
+        regions = detect_speech_regions(audio)
+
+        assert len(regions) == 2
+        assert abs(regions[0][0] / SR - 0.8) < 0.1
+        assert abs(regions[1][1] / SR - 4.7) < 0.1
+
+    def test_short_pause_stays_in_one_region(self):
+        """短い間（息継ぎ）は同じ区間に含める"""
+        audio = np.concatenate([_tone(1.0), _silence(0.3), _tone(1.0)])
+
+        assert len(detect_speech_regions(audio)) == 1
+
+    def test_trim_shortens_audio_and_maps_time_back(self):
+        """無音を詰めた音声の時刻を元の時刻に戻せる"""
+        audio = np.concatenate([_silence(2.0), _tone(1.0), _silence(3.0), _tone(1.0)])
+        regions = detect_speech_regions(audio)
+
+        trimmed, timeline = trim_to_speech(audio, regions)
+
+        assert len(trimmed) < len(audio) / 2
+        second_start = timeline[1][0]
+        assert (
+            abs(
+                to_original_time(second_start + 0.5, timeline)
+                - (regions[1][0] / SR + 0.5)
+            )
+            < 1e-6
+        )
+
+    def test_split_cuts_at_silences_and_covers_audio(self):
+        """チャンクは無音の位置で区切られ、音声全体を隙間なく覆う"""
+        # 8秒の発話と1秒の無音を交互に並べた約45秒の音声
+        audio = np.concatenate([np.concatenate([_tone(8.0), _silence(1.0)])] * 5)
+
+        chunks = split_at_silences(audio, target_seconds=10.0)
+
+        assert chunks[0][0] == 0
+        assert chunks[-1][1] == len(audio)
+        assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+        for _, end in chunks[:-1]:
+            # 区切り位置は無音（9秒周期の8〜9秒）の中にある
+            assert 8.0 <= (end / SR) % 9.0 <= 9.0
+
+    def test_short_audio_is_not_split(self):
+        """目標長に近い長さの音声は分割しない"""
+        assert split_at_silences(_tone(12.0), target_seconds=10.0) == [(0, 12 * SR)]
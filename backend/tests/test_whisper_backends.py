@@ -0,0 +1,163 @@
+"""
+Whisper推論バックエンドのテスト
+
+テスト対象:
+- 変換済み重みキャッシュ（初回に保存し、次回はチェックポイントを読まない）
+- 重みキャッシュの保存と読み込みの往復（torch・whisperがある場合のみ）
+- 動的int8量子化の切り替え（識別子・読み込み経路・Linear層の置き換え）
+"""
+
+import sys
+import types
+
+import pytest
+
+from app.services import whisper_backends
+from app.services.whisper_backends import OpenAIWhisperBackend
+
+
+@pytest.fixture
+def fake_whisper(monkeypatch):
+    """チェックポイントの読み込みを記録するwhisperモジュールの代わり"""
+    module = types.ModuleType("whisper")
+    module.__version__ = "test"
+    module.loaded = []
+
+    def load_model(model_name, device=None):
+        module.loaded.append(model_name)
+        return {"model": model_name, "source": "checkpoint"}
+
+    module.load_model = load_model
+    monkeypatch.setitem(sys.modules, "whisper", module)
+    return module
+
+
+@pytest.fixture
+def weight_cache(monkeypatch, tmp_path):
+    """重みキャッシュをtmp_pathに置き、保存・読み込みを記録する"""
+    calls = {"save": [], "load": []}
+
+    def save(model, path):
+        calls["save"].append(path)
+        with open(path, "w") as f:
+            f.write(model["model"])
+
+    def load(path):
+        calls["load"].append(path)
+        with open(path) as f:
+            data = f.read()
+        if not data:
+            raise EOFError("empty cache")
+        return {"model": data, "source": "mmap"}
+
+    monkeypatch.setattr(whisper_backends, "WEIGHT_CACHE_ENABLED", True)
+    monkeypatch.setattr(whisper_backends, "WEIGHT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(whisper_backends, "save_weight_cache", save)
+    monkeypatch.setattr(whisper_backends, "load_weight_cache", load)
+    return calls
+
+
+class TestWeightCache:
+    """変換済み重みキャッシュのテストクラス"""
+
+    def test_second_load_uses_cache(self, fake_whisper, weight_cache):
+        """初回はチェックポイントから読んで保存し、次回はキャッシュから読む"""
+        first = OpenAIWhisperBackend("base", quantize=False).load()
+        second = OpenAIWhisperBackend("base", quantize=False).load()
+
+        assert first.model["source"] == "checkpoint"
+        assert second.model == {"model": "base", "source": "mmap"}
+        assert fake_whisper.loaded == ["base"]
+        assert weight_cache["save"] == [whisper_backends.weight_cache_path("base")]
+        assert weight_cache["load"] == [whisper_backends.weight_cache_path("base")]
+
+    def test_broken_cache_falls_back_to_checkpoint(self, fake_whisper, weight_cache):
+        """キャッシュが読めない場合はチェックポイントから読み直して保存し直す"""
+        path = whisper_backends.weight_cache_path("base")
+        open(path, "w").close()
+
+        backend = OpenAIWhisperBackend("base", quantize=False).load()
+
+        assert backend.model["source"] == "checkpoint"
+        assert fake_whisper.loaded == ["base"]
+        assert weight_cache["save"] == [path]
+
+    def test_round_trip_keeps_weights_and_buffers(self, tmp_path):
+        """保存したキャッシュから同じ重みと非永続バッファのモデルを組み立てる"""
+        torch = pytest.importorskip("torch")
+        pytest.importorskip("whisper")
+        from whisper.model import ModelDimensions, Whisper
+
+        dims = ModelDimensions(
+            n_mels=80,
+            n_audio_ctx=8,
+            n_audio_state=16,
+            n_audio_head=2,
+            n_audio_layer=1,
+            n_vocab=64,
+            n_text_ctx=8,
+            n_text_state=16,
+            n_text_head=2,
+            n_text_layer=1,
+        )
+        model = Whisper(dims)
+        path = str(tmp_path / "tiny.pt")
+
+        whisper_backends.save_weight_cache(model, path)
+        loaded = whisper_backends.load_weight_cache(path)
+
+        assert loaded.dims == dims
+        expected = model.state_dict()
+        for name, value in loaded.state_dict().items():
+            assert torch.equal(value, expected[name]), name
+        assert torch.equal(
+            loaded.alignment_heads.to_dense(), model.alignment_heads.to_dense()
+        )
+
+
+class TestDynamicQuantize:
+    """動的int8量子化の切り替えのテストクラス"""
+
+    def test_identity_separates_quantized_model(self):
+        """量子化したモデルは別の識別子になり、キャッシュキーを共有しない"""
+        plain = OpenAIWhisperBackend("base", quantize=False)
+        quantized = OpenAIWhisperBackend("base", quantize=True)
+
+        assert plain.identity == "base"
+        assert quantized.identity == "openai:dynamic-int8:base"
+
+    def test_load_switches_to_quantized_path(
+        self, fake_whisper, weight_cache, monkeypatch
+    ):
+        """量子化が有効なら量子化済みモデルを読み、重みキャッシュは使わない"""
+        monkeypatch.setattr(
+            OpenAIWhisperBackend, "_load_quantized", lambda self: "quantized"
+        )
+
+        quantized = OpenAIWhisperBackend("base", quantize=True).load()
+        plain = OpenAIWhisperBackend("base", quantize=False).load()
+
+        assert quantized.model == "quantized"
+        assert plain.model["source"] == "checkpoint"
+        assert weight_cache["save"] == [whisper_backends.weight_cache_path("base")]
+
+    def test_quantize_replaces_linear_subclasses(self):
+        """nn.Linearのサブクラスも含めてLinear層をint8の動的量子化層に置き換える"""
+        torch = pytest.importorskip("torch")
+
+        class _Linear(torch.nn.Linear):
+            """openai-whisperのLinear（dtype変換を足したサブクラス）の代わり"""
+
+        model = torch.nn.Sequential(
+            _Linear(8, 8), torch.nn.LayerNorm(8), torch.nn.Linear(8, 4)
+        )
+        x = torch.randn(2, 8)
+        expected = model(x)
+
+        quantized = whisper_backends.quantize_linear_layers(model)
+
+        dynamic_linear = torch.ao.nn.quantized.dynamic.Linear
+        assert isinstance(quantized[0], dynamic_linear)
+        assert isinstance(quantized[1], torch.nn.LayerNorm)
+        assert isinstance(quantized[2], dynamic_linear)
+        assert torch.allclose(quantized(x), expected, atol=0.1)
@@ -0,0 +1,250 @@
+"""
+一括音声認識のテスト
+
+テスト対象:
+- ワーカーの空き状況に応じた短い音声のまとめ方
+- 長い音声の分割並列認識への振り分け
+- キー単位の失敗とキャッシュ済み結果の扱い
+- 1本ずつの認識と一括認識で同じしきい値を使うこと
+- 一括認識APIの受付制御（枠はストリームの中で確保し、必ず解放する）
+"""
+
+import asyncio
+import contextlib
+import json
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import voice
+from app.services.admission import AdmissionController
+from app.services.fair_scheduler import PriorityClass
+from app.services import whisper as whisper_module
+from app.services.whisper import WhisperService, _PreparedAudio
+from app.services.whisper_backends import WhisperBackend
+from app.utils.audio import WHISPER_SAMPLE_RATE
+
+
+class _FakePool:
+    """ワーカープールの代わり（バッチの中身を記録し、releaseまで待つ）"""
+
+    def __init__(self) -> None:
+        self.batches = []
+        self.release = asyncio.Event()
+
+    async def run(self, fn, model_name, audios, initial_prompt, language):
+        self.batches.append(len(audios))
+        await self.release.wait()
+        return [{"text": f"len:{len(a)}", "segments": []} for a in audios]
+
+
+class _FakeService:
+    """transcribe_batch_asyncが使う属性だけを持つWhisperServiceの代わり"""
+
+    model_name = "base"
+    model_identity = "base"
+
+    def __init__(self, concurrency: int, seconds: dict, cached=(), failing=()):
+        self._pool = _FakePool()
+        self._pool.concurrency = concurrency
+        self.seconds = seconds
+        self.cached = set(cached)
+        self.failing = set(failing)
+        self.chunked = []
+
+    @contextlib.contextmanager
+    def _use_generation(self):
+        yield SimpleNamespace(
+            model_name=self.model_name,
+            model_identity=self.model_identity,
+            pool=self._pool,
+        )
+
+    async def _prepare_audio(self, key, model_identity, language, prompt, limits):
+        await asyncio.sleep(0)
+        if key in self.failing:
+            raise RuntimeError("download failed")
+        if key in self.cached:
+            return _PreparedAudio(key, None, {"text": "cached"}, None, None, False)
+        audio = np.zeros(int(self.seconds[key] * WHISPER_SAMPLE_RATE), np.float32)
+        return _PreparedAudio(key, audio, None, None, None, False)
+
+    async def _store_result(self, prepared, result, model_identity, language):
+        return result
+
+    async def _transcribe_chunked(self, audio, model_name, prompt, language, *, pool):
+        self.chunked.append(len(audio))
+        return {"text": "chunked", "segments": []}
+
+
+def _collect(service, keys):
+    async def release_later():
+        # 全件の準備が終わってから推論を進める（最初のバッチはその間ワーカーを占有）
+        await asyncio.sleep(0.05)
+        service._pool.release.set()
+
+    async def main():
+        releaser = asyncio.create_task(release_later())
+        results = {}
+        async for key, result in WhisperService.transcribe_batch_async(
+            service, keys, language="ja"
+        ):
+            results[key] = result
+        await releaser
+        return results
+
+    return asyncio.run(main())
+
+
+class TestTranscribeBatch:
+    """一括音声認識のテストクラス"""
+
+    def test_short_clips_are_packed_while_worker_busy(self):
+        """ワーカーが埋まっている間に準備できた短い音声は1回にまとめる"""
+        keys = [f"a{i}.webm" for i in range(5)]
+        service = _FakeService(1, {k: 3.0 for k in keys}, cached=["cached.webm"])
+
+        results = _collect(service, keys + ["cached.webm"])
+
+        assert set(results) == set(keys) | {"cached.webm"}
+        # 最初の1本はすぐに流し、待っている間の4本をまとめる
+        assert service._pool.batches == [1, 4]
+        assert results["cached.webm"] == {"text": "cached"}
+
+    def test_batch_size_is_capped(self, monkeypatch):
+        """1回にまとめる本数はBATCH_SIZEまで"""
+        monkeypatch.setattr(whisper_module, "BATCH_SIZE", 2)
+        keys = [f"a{i}.webm" for i in range(5)]
+        service = _FakeService(1, {k: 3.0 for k in keys})
+
+        _collect(service, keys)
+
+        assert service._pool.batches == [1, 2, 2]
+
+    def test_long_clip_uses_chunked_path(self):
+        """BATCH_MAX_CLIP_SECONDSを超える音声は分割並列認識で処理する"""
+        long_seconds = whisper_module.BATCH_MAX_CLIP_SECONDS + 10
+        service = _FakeService(2, {"short.webm": 3.0, "long.webm": long_seconds})
+
+        results = _collect(service, ["long.webm", "short.webm"])
+
+        assert results["long.webm"]["text"] == "chunked"
+        assert service.chunked == [int(long_seconds * WHISPER_SAMPLE_RATE)]
+        assert service._pool.batches == [1]
+
+    def test_failure_does_not_stop_other_keys(self):
+        """1件の失敗は例外として返し、他の件は続行する"""
+        service = _FakeService(
+            1, {"ok.webm": 3.0, "ok2.webm": 3.0}, failing=["bad.webm"]
+        )
+
+        results = _collect(service, ["bad.webm", "ok.webm", "ok2.webm", "ok.webm"])
+
+        assert isinstance(results["bad.webm"], RuntimeError)
+        assert results["ok.webm"]["text"] == f"len:{3 * WHISPER_SAMPLE_RATE}"
+        assert len(results) == 3  # 重複したキーは1回だけ処理する
+
+
+class _RecordingBackend(WhisperBackend):
+    """渡されたしきい値を記録する推論バックエンドの代わり"""
+
+    def __init__(self) -> None:
+        super().__init__("base")
+        self.thresholds = []
+
+    def transcribe(self, audio, *, thresholds, **kwargs):
+        self.thresholds.append(thresholds)
+        return {"text": "", "segments": []}
+
+
+class TestDecodeThresholds:
+    """認識結果を採用するしきい値のテストクラス"""
+
+    def test_single_and_batch_use_same_thresholds(self, monkeypatch):
+        """1本ずつの認識と一括認識のどちらもDEFAULT_THRESHOLDSを使う"""
+        backend = _RecordingBackend()
+        monkeypatch.setattr(whisper_module, "_get_process_model", lambda *a: backend)
+        monkeypatch.setattr(whisper_module, "VAD_ENABLED", False)
+        audio = np.zeros(WHISPER_SAMPLE_RATE, np.float32)
+
+        whisper_module._run_model(backend, audio, "ja", None)
+        whisper_module._transcribe_batch_in_worker("base", [audio, audio])
+
+        assert backend.thresholds == [whisper_module.DEFAULT_THRESHOLDS] * 3
+
+
+class _FakeBatchService:
+    """一括認識APIが使う属性だけを持つWhisperServiceの代わり"""
+
+    def __init__(self, admission: AdmissionController) -> None:
+        self.admission = admission
+        self.in_flight_seen = []
+
+    async def transcribe_batch_async(self, keys, *, language, limits):
+        for key in dict.fromkeys(keys):
+            self.in_flight_seen.append(self.admission.in_flight)
+            yield key, {"text": key, "language": language}
+
+
+class TestTranscribeBatchEndpoint:
+    """一括音声認識APIのテストクラス"""
+
+    def _post(self, monkeypatch, service, keys):
+        async def priority(db, user_id):
+            return PriorityClass.STANDARD
+
+        monkeypatch.setattr(voice, "_transcribe_priority", priority)
+        app = FastAPI()
+        app.include_router(voice.router)
+        app.dependency_overrides[voice.get_db] = lambda: None
+        app.dependency_overrides[voice.get_whisper_service] = lambda: service
+        with TestClient(app) as client:
+            return client.post(
+                "/voice/transcribe/batch",
+                json={"user_id": str(uuid.uuid4()), "audio_file_paths": keys},
+            )
+
+    def test_slot_is_held_while_streaming_and_released(self, monkeypatch):
+        """枠はストリームの間だけ確保し、送り終えたら解放する"""
+        admission = AdmissionController(1)
+        service = _FakeBatchService(admission)
+
+        response = self._post(monkeypatch, service, ["a.webm", "b.webm"])
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert response.status_code == 200
+        assert [line["result"]["text"] for line in lines] == ["a.webm", "b.webm"]
+        assert service.in_flight_seen == [1, 1]
+        assert admission.in_flight == 0
+        assert admission.admitted == 1
+
+    def test_overloaded_before_streaming_returns_429(self, monkeypatch):
+        """応答を始める前に混雑が分かれば429を返し、枠は確保しない"""
+        admission = AdmissionController(1, max_waiting=0)
+        admission._in_flight = 1  # 他のリクエストが実行中
+
+        response = self._post(monkeypatch, _FakeBatchService(admission), ["a.webm"])
+
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+        assert admission.in_flight == 1
+        assert admission.admitted == 0
+
+    def test_overloaded_after_precheck_fails_every_key(self, monkeypatch):
+        """ストリームの中で枠を断られたら、全件を失敗の行として返す"""
+        admission = AdmissionController(1, max_waiting=0)
+        admission._in_flight = 1
+        monkeypatch.setattr(admission, "precheck", lambda: None)
+        service = _FakeBatchService(admission)
+
+        response = self._post(monkeypatch, service, ["a.webm", "b.webm", "a.webm"])
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert response.status_code == 200
+        assert [line["audio_file_path"] for line in lines] == ["a.webm", "b.webm"]
+        assert not any(line["success"] for line in lines)
+        assert service.in_flight_seen == []
+        assert admission.in_flight == 1
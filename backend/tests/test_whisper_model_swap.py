@@ -0,0 +1,163 @@
+"""
+Whisperモデルの無停止切り替えのテスト
+
+テスト対象:
+- 切り替え後の新しいリクエストの振り分け
+- 旧モデルで処理中のリクエストを待ってからの停止
+- 準備に失敗した場合・許可されていないモデルの扱い
+- 終了時の切り替え中止とワーカーの停止
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services import whisper as whisper_module
+from app.services.whisper import (
+    WhisperModelSwapError,
+    WhisperService,
+    _ModelGeneration,
+)
+
+
+class _FakePool:
+    """WhisperWorkerPoolの代わり（実行したモデルと停止を記録する）"""
+
+    def __init__(self, model_name, num_workers=2, torch_threads=None) -> None:
+        self.model_name = model_name
+        self.num_workers = num_workers
+        self.torch_threads = torch_threads
+        self.uses_processes = True
+        self.concurrency = num_workers
+        self.release = asyncio.Event()
+        self.release.set()
+        self.shutdown_calls = []
+
+    async def run(self, fn, model_name, *args):
+        await self.release.wait()
+        return {"text": model_name}
+
+    async def warm_up(self):
+        return [1]
+
+    def shutdown(self, wait=True):
+        self.shutdown_calls.append(wait)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """ワーカーを起動せずに、切り替えに必要な状態だけを持つWhisperService"""
+    monkeypatch.setattr(whisper_module, "WhisperWorkerPool", _FakePool)
+    monkeypatch.setattr(whisper_module, "ALLOWED_MODELS", ("base", "small"))
+    svc = object.__new__(WhisperService)
+    svc._generation = _ModelGeneration("base", "base", _FakePool("base"))
+    svc._swap_task = None
+    svc._swap_status = {"state": "idle"}
+    svc.swaps = 0
+    return svc
+
+
+class TestModelSwap:
+    """モデル切り替えのテストクラス"""
+
+    def test_in_flight_request_finishes_on_old_model(self, service):
+        """切り替え前に始まったリクエストは旧モデルで終え、その後に旧ワーカーを止める"""
+        old_pool = service._pool
+        audio = np.zeros(16000, np.float32)
+
+        async def main():
+            old_pool.release.clear()
+            in_flight = asyncio.create_task(service.transcribe_array_async(audio))
+            await asyncio.sleep(0)
+            swap = asyncio.create_task(service.swap_model("small"))
+            await asyncio.sleep(0.01)
+            # 新しいリクエストはすぐに新しいモデルで処理される
+            new_result = await service.transcribe_array_async(audio)
+            assert service.model_swap_status()["state"] == "draining"
+            assert old_pool.shutdown_calls == []
+            old_pool.release.set()
+            return await in_flight, new_result, await swap
+
+        old_result, new_result, swapped = asyncio.run(main())
+
+        assert swapped
+        assert old_result == {"text": "base"}
+        assert new_result == {"text": "small"}
+        assert old_pool.shutdown_calls == [True]
+        assert service.model_name == "small"
+        assert service.model_swap_status()["state"] == "completed"
+
+    def test_failed_warm_up_keeps_old_model(self, service, monkeypatch):
+        """新しいモデルの準備に失敗したら旧モデルのまま処理を続ける"""
+
+        class _FailingPool(_FakePool):
+            async def warm_up(self):
+                raise RuntimeError("load failed")
+
+        monkeypatch.setattr(whisper_module, "WhisperWorkerPool", _FailingPool)
+
+        swapped = asyncio.run(service.swap_model("small"))
+
+        assert not swapped
+        assert service.model_name == "base"
+        status = service.model_swap_status()
+        assert status["state"] == "failed"
+        assert "load failed" in status["error"]
+
+    def test_start_model_swap_validation(self, service):
+        """許可されていないモデルや、切り替え中の再要求は受け付けない"""
+
+        async def main():
+            with pytest.raises(WhisperModelSwapError) as e:
+                service.start_model_swap("large")
+            assert e.value.error_code == "WHISPER_MODEL_NOT_ALLOWED"
+
+            # 現在と同じモデルなら何もしない
+            assert service.start_model_swap("base")["state"] == "idle"
+
+            assert service.start_model_swap("small")["state"] == "warming"
+            with pytest.raises(WhisperModelSwapError) as e:
+                service.start_model_swap("small")
+            assert e.value.error_code == "WHISPER_MODEL_SWAP_IN_PROGRESS"
+            await service._swap_task
+
+        asyncio.run(main())
+
+        assert service.model_name == "small"
+        assert service.swaps == 1
+
+    def test_aclose_cancels_swap_and_stops_workers(self, service, monkeypatch):
+        """終了時は準備中の切り替えを止め、新旧どちらのワーカーも残さない"""
+        created = []
+
+        class _SlowPool(_FakePool):
+            def __init__(self, *args, **kwargs) -> None:
+                super().__init__(*args, **kwargs)
+                created.append(self)
+
+            async def warm_up(self):
+                await asyncio.sleep(60)
+
+        class _FakeS3:
+            def __init__(self) -> None:
+                self.shutdown_calls = []
+
+            def shutdown(self, wait=True):
+                self.shutdown_calls.append(wait)
+
+        monkeypatch.setattr(whisper_module, "WhisperWorkerPool", _SlowPool)
+        service._s3 = _FakeS3()
+        old_pool = service._pool
+
+        async def main():
+            service.start_model_swap("small")
+            await asyncio.sleep(0.01)
+            await service.aclose()
+
+        asyncio.run(main())
+
+        assert created[0].shutdown_calls == [False]
+        assert old_pool.shutdown_calls == [True]
+        assert service._s3.shutdown_calls == [True]
+        assert service.model_name == "base"
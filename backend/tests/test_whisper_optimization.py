@@ -3,10 +3,18 @@ Whisper音声認識の最小限テスト
 
 テスト対象:
 - プロンプト生成
+- プロンプトのコンパイル（トークン予算）
 - 基本的な音声認識
 """
 
-from app.utils.child_vocabulary import generate_whisper_prompt
+from app.services.whisper_backends import _decoder_prompt
+from app.utils import child_vocabulary
+from app.utils.child_vocabulary import (
+    WHISPER_MAX_PROMPT_TOKENS,
+    compile_whisper_prompt,
+    compiled_prompt_tokens,
+    generate_whisper_prompt,
+)
 
 
 class TestWhisperBasic:
@@ -32,3 +40,43 @@ class TestWhisperBasic:
 
         for term in basic_terms:
             assert term in prompt, f"プロンプトに'{term}'が含まれていません"
+
+    def test_compiled_prompt_fits_token_budget(self):
+        """コンパイル済みプロンプトがトークン予算に収まるかテスト"""
+        for level in ["speed", "balanced", "precision"]:
+            compiled = compile_whisper_prompt(level)
+
+            assert compiled.token_count <= compiled.token_budget
+            assert compiled.token_budget <= WHISPER_MAX_PROMPT_TOKENS
+            assert "ママ" in compiled.text
+
+    def test_compiled_prompt_keeps_high_priority_words(self):
+        """予算が小さい場合に優先度の高い語彙から残るかテスト"""
+        compiled = compile_whisper_prompt("precision", token_budget=30)
+
+        assert compiled.words[:2] == ("ママ", "パパ")
+        assert compiled.dropped_words
+        assert compiled.token_count <= 30
+
+    def test_compiled_prompt_is_cached(self):
+        """同じレベルのプロンプトが使い回されるかテスト"""
+        assert compile_whisper_prompt("speed") is compile_whisper_prompt("speed")
+
+    def test_compiled_prompt_tokens_are_reused(self):
+        """コンパイル済みプロンプトはキャッシュしたトークン列を返すかテスト"""
+        compiled = compile_whisper_prompt("balanced")
+
+        # トークナイザが使えない環境ではトークン列は空で、文字列を使う
+        assert compiled_prompt_tokens(compiled.text) == (compiled.tokens or None)
+        assert compiled_prompt_tokens("任意のプロンプト") is None
+        assert compiled_prompt_tokens(None) is None
+
+    def test_decoder_receives_cached_tokens(self, monkeypatch):
+        """デコーダにはコンパイル済みのトークン列を渡し、任意の文字列はそのまま渡すかテスト"""
+        monkeypatch.setitem(
+            child_vocabulary._COMPILED_PROMPT_TOKENS, "ママと遊んだ。", (1, 2, 3)
+        )
+
+        assert _decoder_prompt("ママと遊んだ。") == [1, 2, 3]
+        assert _decoder_prompt("任意のプロンプト") == "任意のプロンプト"
+        assert _decoder_prompt(None) is None
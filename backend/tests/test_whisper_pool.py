@@ -0,0 +1,139 @@
+"""
+Whisper推論ワーカープールのテスト
+
+テスト対象:
+- スレッドモード（WHISPER_WORKERS=0）での実行・ウォームアップ・停止
+- ウォームアップ完了までのレディネス（/voice/ready）
+"""
+
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import voice
+from app.services import whisper_pool
+from app.services.whisper import WhisperService, _ModelGeneration
+from app.services.whisper_backends import WhisperBackend
+from app.services.whisper_pool import WhisperWorkerPool
+from app.services.whisper_registry import WhisperModelRegistry
+from app.utils.audio import WHISPER_SAMPLE_RATE
+
+
+class _FakeBackend(WhisperBackend):
+    """推論の呼び出しを記録するテスト用バックエンド"""
+
+    def __init__(self, model_name: str) -> None:
+        super().__init__(model_name)
+        self.calls = []
+
+    def transcribe(self, audio, **kwargs):
+        self.calls.append((len(audio), kwargs["language"]))
+        return {"text": ""}
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    """torchを使わずに、プロセス内のモデルをテスト用バックエンドに差し替える"""
+    backends = []
+
+    def loader(model_name: str):
+        backends.append(_FakeBackend(model_name))
+        return backends[-1]
+
+    monkeypatch.setattr(whisper_pool, "_configure_torch_threads", lambda n: None)
+    monkeypatch.setattr(whisper_pool, "_process_registry", WhisperModelRegistry(loader))
+    return backends
+
+
+class TestThreadModePool:
+    """スレッドモードのワーカープールのテストクラス"""
+
+    def test_run_executes_on_worker_thread(self, loaded):
+        """関数はイベントループとは別のスレッドで実行される"""
+        pool = WhisperWorkerPool("base", num_workers=0)
+
+        async def main():
+            return await pool.run(lambda x: (threading.get_ident(), x * 2), 21)
+
+        ident, value = asyncio.run(main())
+        pool.shutdown()
+
+        assert not pool.uses_processes
+        assert pool.concurrency == whisper_pool.DEFAULT_THREAD_WORKERS
+        assert value == 42
+        assert ident != threading.get_ident()
+
+    def test_warm_up_loads_shared_model_once(self, loaded):
+        """ウォームアップでモデルを1つだけ読み込み、ダミー音声で1回推論する"""
+        pool = WhisperWorkerPool("base", num_workers=0)
+
+        pids = asyncio.run(pool.warm_up())
+        pool.shutdown()
+
+        assert pids == [os.getpid()]
+        assert [b.model_name for b in loaded] == ["base"]
+        assert loaded[0].calls == [(WHISPER_SAMPLE_RATE, "ja")]
+        assert whisper_pool.is_process_model_loaded("base")
+
+    def test_shutdown_rejects_new_work(self, loaded):
+        """停止後は新しい処理を受け付けない"""
+        pool = WhisperWorkerPool("base", num_workers=0)
+        pool.shutdown()
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(pool.run(np.zeros, 1))
+
+
+class TestReadiness:
+    """ウォームアップとレディネスのテストクラス"""
+
+    def _service(self, pool) -> WhisperService:
+        """ワーカープールとモデルだけを持つWhisperService（S3には接続しない）"""
+        svc = object.__new__(WhisperService)
+        svc._generation = _ModelGeneration("base", "base", pool)
+        svc._ready = False
+        return svc
+
+    def test_ready_after_warm_up(self, loaded, monkeypatch):
+        """ウォームアップ前は503、完了後は200を返す"""
+        pool = WhisperWorkerPool("base", num_workers=0)
+        service = self._service(pool)
+        monkeypatch.setattr(voice.WhisperServiceManager, "_instance", service)
+        app = FastAPI()
+        app.include_router(voice.router)
+
+        with TestClient(app) as client:
+            before = client.get("/voice/ready")
+            asyncio.run(service.warm_up())
+            after = client.get("/voice/ready")
+        pool.shutdown()
+
+        assert before.status_code == 503
+        assert before.json() == {"ready": False}
+        assert after.status_code == 200
+        assert after.json() == {"ready": True}
+        assert loaded[0].calls == [(WHISPER_SAMPLE_RATE, "ja")]
+
+    def test_failed_warm_up_stays_not_ready(self, monkeypatch):
+        """モデルの読み込みに失敗した場合はレディにならない"""
+
+        def loader(model_name: str):
+            raise RuntimeError("load failed")
+
+        monkeypatch.setattr(whisper_pool, "_configure_torch_threads", lambda n: None)
+        monkeypatch.setattr(
+            whisper_pool, "_process_registry", WhisperModelRegistry(loader)
+        )
+        pool = WhisperWorkerPool("base", num_workers=0)
+        service = self._service(pool)
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(service.warm_up())
+        pool.shutdown()
+
+        assert not service.is_ready
@@ -0,0 +1,104 @@
+"""
+Whisperモデルレジストリのテスト
+
+テスト対象:
+- 遅延読み込みとLRUによる解放
+- 同じモデルの同時読み込みの集約
+- リクエストで指定されたモデル名の検証
+"""
+
+import threading
+import time
+
+from app.services.whisper_backends import WhisperBackend
+from app.services.whisper_registry import WhisperModelRegistry, resolve_model_name
+
+MB = 1024 * 1024
+
+
+class _FakeBackend(WhisperBackend):
+    """モデルを持たないテスト用バックエンド（サイズは概算値になる）"""
+
+
+def _make_registry(budget_mb: int, delay: float = 0.0):
+    calls = []
+
+    def loader(model_name: str):
+        calls.append(model_name)
+        time.sleep(delay)
+        return _FakeBackend(model_name)
+
+    return WhisperModelRegistry(loader, memory_budget_bytes=budget_mb * MB), calls
+
+
+class TestWhisperModelRegistry:
+    """Whisperモデルレジストリのテストクラス"""
+
+    def test_loads_lazily_once(self):
+        """初回のみ読み込み、2回目以降は同じモデルを返す"""
+        registry, calls = _make_registry(budget_mb=1000)
+
+        first = registry.get("tiny")
+        second = registry.get("tiny")
+
+        assert first is second
+        assert calls == ["tiny"]
+        assert registry.is_loaded("tiny")
+
+    def test_evicts_least_recently_used_over_budget(self):
+        """メモリ予算を超えたら最も古く使われたモデルから解放する"""
+        # tiny≈150MB, base≈290MB
+        registry, _ = _make_registry(budget_mb=500)
+        registry.get("tiny")
+        registry.get("base")
+        registry.get("tiny")
+
+        registry.get("tiny.en")
+
+        assert registry.loaded_models() == ["tiny", "tiny.en"]
+        assert registry.evictions == 1
+
+    def test_pinned_model_is_not_evicted(self):
+        """固定したモデルは予算を超えても解放しない"""
+        registry, _ = _make_registry(budget_mb=300)
+        registry.get("base", pin=True)
+
+        registry.get("tiny")
+
+        assert registry.is_loaded("base")
+        assert registry.is_loaded("tiny")
+        registry.get("tiny.en")
+        assert registry.loaded_models() == ["base", "tiny.en"]
+
+    def test_release_unpins_and_drops_model(self):
+        """モデル切り替え後の旧モデルは固定を外して解放する"""
+        registry, _ = _make_registry(budget_mb=1000)
+        registry.get("base", pin=True)
+
+        assert registry.release("base")
+
+        assert not registry.is_loaded("base")
+        assert registry.snapshot()["pinned_models"] == []
+        assert not registry.release("base")
+
+    def test_concurrent_loads_are_serialized(self):
+        """同じモデルを同時に要求しても読み込みは1回だけ"""
+        registry, calls = _make_registry(budget_mb=1000, delay=0.05)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.get("small")))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert calls == ["small"]
+        assert len({id(r) for r in results}) == 1
+
+    def test_resolve_model_name_falls_back_to_default(self):
+        """未指定・許可外のモデルは既定モデルになる"""
+        assert resolve_model_name(None, "base") == "base"
+        assert resolve_model_name("small", "base") == "small"
+        assert resolve_model_name("large-v3", "base") == "base"
@@ -0,0 +1,166 @@
+"""
+ストリーミング音声認識のテスト
+
+テスト対象:
+- 途中結果・最終結果の計算と確定済みテキストの引き継ぎ
+- 1回に認識する長さが録音の長さに比例しないこと
+- WebSocketでの途中結果・最終結果・上限超過のやり取り
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import voice
+from app.services.whisper_stream import (
+    WINDOW_SECONDS,
+    StreamingTranscriptionSession,
+    StreamLimitExceededError,
+)
+from app.utils.audio import WHISPER_SAMPLE_RATE, IncrementalAudioDecoder
+
+
+class _PcmDecoder(IncrementalAudioDecoder):
+    """FFmpegの代わりに、チャンクをそのままfloat32 PCMとして扱うデコーダ"""
+
+    def feed(self, chunk: bytes) -> None:
+        with self._lock:
+            self._pcm.extend(chunk)
+
+    def close(self) -> int:
+        self._closed = True
+        return self.total_samples
+
+    def kill(self) -> None:
+        self._closed = True
+
+
+class _FakeWhisperService:
+    """認識した音声の長さを記録し、5秒ごとのセグメントを返す"""
+
+    def __init__(self) -> None:
+        self.lengths = []
+
+    async def transcribe_array_async(self, audio, *, language):
+        self.lengths.append(len(audio))
+        seconds = len(audio) / WHISPER_SAMPLE_RATE
+        starts = np.arange(0.0, seconds, 5.0)
+        segments = [
+            {"start": s, "end": min(s + 5.0, seconds), "text": "あ"} for s in starts
+        ]
+        return {
+            "success": True,
+            "text": "あ" * len(segments),
+            "language": language,
+            "segments": segments,
+            "avg_logprob": -0.2,
+        }
+
+
+def _seconds(seconds: float) -> bytes:
+    return np.zeros(int(seconds * WHISPER_SAMPLE_RATE), np.float32).tobytes()
+
+
+def _session(service, **kwargs) -> StreamingTranscriptionSession:
+    return StreamingTranscriptionSession(
+        service, partial_interval=0.0, decoder=_PcmDecoder(), **kwargs
+    )
+
+
+class TestStreamingSession:
+    """ストリーミング認識セッションのテストクラス"""
+
+    def test_partial_and_final(self):
+        """途中結果は受信済みの分を、最終結果はセグメントと長さを返す"""
+        service = _FakeWhisperService()
+        session = _session(service)
+
+        async def main():
+            assert await session.partial() is None  # まだ音声がない
+            session.add_chunk(_seconds(4))
+            partial = await session.partial()
+            session.add_chunk(_seconds(4))
+            return partial, await session.final()
+
+        partial, final = asyncio.run(main())
+
+        assert partial == {"text": "あ", "duration": 4.0}
+        assert final["text"] == "ああ"
+        assert final["duration"] == 8.0
+        assert [s["end"] for s in final["segments"]] == [5.0, 8.0]
+
+    def test_window_length_does_not_grow_with_stream(self):
+        """長い録音でも1回に認識するのは確定位置からの窓の長さまで"""
+        service = _FakeWhisperService()
+        session = _session(service)
+        window_samples = int(WINDOW_SECONDS * WHISPER_SAMPLE_RATE)
+
+        async def main():
+            for _ in range(40):
+                session.add_chunk(_seconds(3))
+                await session.partial()
+            return await session.final()
+
+        final = asyncio.run(main())
+
+        assert max(service.lengths) <= window_samples
+        assert final["duration"] == 120.0
+        # 確定した区間は最終結果のセグメントの時刻にも反映する
+        assert final["segments"][-1]["end"] == 120.0
+        # 確定済みのPCMは捨てている
+        assert session._decoder._offset == session._committed_samples
+
+    def test_limit_exceeded(self):
+        """上限を超えるチャンクは受け付けない"""
+        session = _session(_FakeWhisperService(), max_bytes=100)
+
+        session.add_chunk(b"\0" * 80)
+        with pytest.raises(StreamLimitExceededError):
+            session.add_chunk(b"\0" * 40)
+
+        assert session.received_bytes == 80
+
+
+class TestStreamingWebSocket:
+    """ストリーミング認識WebSocketのテストクラス"""
+
+    def _client(self, monkeypatch, **kwargs) -> TestClient:
+        service = _FakeWhisperService()
+        monkeypatch.setattr(voice, "get_whisper_service", lambda: service)
+        monkeypatch.setattr(
+            voice,
+            "StreamingTranscriptionSession",
+            lambda svc, language: _session(svc, language=language, **kwargs),
+        )
+        app = FastAPI()
+        app.include_router(voice.router)
+        return TestClient(app)
+
+    def test_partial_then_final(self, monkeypatch):
+        """チャンクごとに途中結果を返し、endで最終結果を返して閉じる"""
+        client = self._client(monkeypatch)
+
+        with client.websocket_connect("/voice/transcribe/stream") as ws:
+            ws.send_bytes(_seconds(6))
+            partial = ws.receive_json()
+            ws.send_json({"type": "end"})
+            final = ws.receive_json()
+
+        assert partial["type"] == "partial"
+        assert partial["text"] == "ああ"
+        assert final["type"] == "final"
+        assert final["text"] == "ああ"
+        assert final["duration"] == 6.0
+
+    def test_limit_exceeded_closes_with_error(self, monkeypatch):
+        """上限を超えたらエラーを送って切断する"""
+        client = self._client(monkeypatch, max_bytes=100)
+
+        with client.websocket_connect("/voice/transcribe/stream") as ws:
+            ws.send_bytes(b"\0" * 200)
+            message = ws.receive_json()
+
+        assert message["type"] == "error"